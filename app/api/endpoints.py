@@ -1,55 +1,337 @@
-from fastapi import APIRouter, Depends, Query, HTTPException, UploadFile, File
+from fastapi import APIRouter, Depends, Query, HTTPException, UploadFile, File, Request
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from sqlalchemy import func, select
-from typing import List, Optional
-from app.core.database import get_db
-from app.core.models import UnifiedData, ETLRun, ETLCheckpoint, CanonicalAsset
-from app.schemas.data import UnifiedDataRead, HealthStatus, ETLStats, CanonicalAssetRead
+from sqlalchemy import DateTime, func, literal, select, tuple_
+from typing import Any, Dict, List, Literal, Optional, Tuple
+from datetime import datetime
+from app.api.export import UNIFIED_DATA_COLUMNS, UNIFIED_DATA_FIELDS, MEDIA_TYPES, stream_export
+from app.core.cache import response_cache
+from app.core.serialization import as_dicts
+from app.core.config import settings
+from app.core.database import get_db, get_read_db, get_session_factory, run_db
+from app.core.models import UnifiedData, ETLRun, ETLCheckpoint, ETLSourceStatus, CanonicalAsset, AssetSnapshot
+from app.schemas.data import UnifiedDataRead, HealthStatus, ETLStats, ETLRunHistory, CanonicalAssetRead, JobStatus, PricePoint
+from app.core.jobs import Job, job_queue
+from app.core.prices import get_price_series
 from app.core.rate_limiter import rate_limiter
+from app.core.run_stats import get_summary, recent_runs
+from app.core.search import apply_full_text, ranked_ids, supports_full_text
 from app.ingestion.csv_source import CSVExtractor
-import shutil
+from app.ingestion.scheduler import etl_scheduler
+import base64
+import json
 import os
+import time
 import uuid
 
 router = APIRouter()
 
+# sort= value -> (column, default direction); created_at is the default ordering
+SORT_COLUMNS = {
+    "created_at": (UnifiedData.created_at, "desc"),
+    "price": (UnifiedData.price_usd, "desc"),
+    "market_cap": (UnifiedData.market_cap, "desc"),
+    "rank": (UnifiedData.rank, "asc"),
+}
+
+def encode_cursor(sort: str, order: str, value: Any, row_id: int) -> str:
+    """
+    Opaque cursor pinning the ordering it was issued for and the keyset
+    position (sort value, id) of the row it points past.
+    """
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    payload = {"sort": sort, "order": order, "value": value, "id": row_id}
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+def decode_cursor(cursor: str, sort: str, order: str) -> Tuple[Any, int]:
+    """The (sort value, id) position of `cursor`; 400 if invalid or issued for another ordering."""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        cursor_sort, cursor_order, value, row_id = payload["sort"], payload["order"], payload["value"], int(payload["id"])
+        if isinstance(SORT_COLUMNS[sort][0].type, DateTime):
+            value = datetime.fromisoformat(value)
+        elif isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise TypeError(value)
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if (cursor_sort, cursor_order) != (sort, order):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Cursor was issued for sort={cursor_sort}&order={cursor_order}, not sort={sort}&order={order}"
+        )
+    return value, row_id
+
+def seek_terms(db: Session, column, value) -> Tuple[Any, Any]:
+    """`column` and the bound `value`, made comparable in the database."""
+    bound = literal(value, column.type)
+    if isinstance(column.type, DateTime) and db.get_bind().dialect.name == "sqlite":
+        # SQLite keeps timestamps as text, formatted by whoever wrote them
+        # (CURRENT_TIMESTAMP drops the fraction); compare them normalized
+        return func.datetime(column), func.datetime(bound)
+    return column, bound
+
+class DataFilters:
+    """Filters shared by the /data endpoints; range bounds are inclusive."""
+
+    def __init__(
+        self,
+        source: Optional[str] = None,
+        canonical_id: Optional[int] = None,
+        symbol: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        min_market_cap: Optional[float] = None,
+        max_market_cap: Optional[float] = None,
+        min_rank: Optional[int] = None,
+        max_rank: Optional[int] = None
+    ):
+        self.source = source
+        self.canonical_id = canonical_id
+        self.symbol = symbol
+        self.ranges = [
+            (UnifiedData.price_usd, min_price, max_price),
+            (UnifiedData.market_cap, min_market_cap, max_market_cap),
+            (UnifiedData.rank, min_rank, max_rank),
+        ]
+
+    def apply(self, query):
+        if self.source:
+            query = query.filter(UnifiedData.source == self.source)
+
+        if self.canonical_id:
+            query = query.filter(UnifiedData.canonical_id == self.canonical_id)
+
+        if self.symbol:
+            query = query.filter(UnifiedData.symbol == self.symbol.upper())
+
+        for column, low, high in self.ranges:
+            if low is not None:
+                query = query.filter(column >= low)
+            if high is not None:
+                query = query.filter(column <= high)
+        return query
+
+def query_data(
+    db: Session,
+    headers: Dict[str, str],
+    filters: DataFilters,
+    skip: int,
+    limit: int,
+    search: Optional[str],
+    cursor: Optional[str],
+    sort: Optional[str],
+    order: Optional[str]
+) -> List[Dict]:
+    # Column tuples straight into dicts: no ORM instances, no per-row validation
+    query = filters.apply(db.query(*UNIFIED_DATA_COLUMNS))
+
+    if search:
+        if cursor:
+            raise HTTPException(status_code=400, detail="Search results are ranked; paginate them with skip/limit")
+        if sort:
+            raise HTTPException(status_code=400, detail="Search results are ranked and cannot be sorted")
+        if not supports_full_text(db):
+            # In-process inverted index fallback (e.g. SQLite)
+            page_ids = ranked_ids(db, query, search)[skip:skip + limit]
+            rows = {row.id: row for row in db.query(*UNIFIED_DATA_COLUMNS).filter(UnifiedData.id.in_(page_ids))}
+            return as_dicts(UNIFIED_DATA_FIELDS, (rows[row_id] for row_id in page_ids))
+        query = apply_full_text(query, search)
+
+    if sort:
+        # Rows without the value have no place in the ordering
+        query = query.filter(SORT_COLUMNS[sort][0].isnot(None))
+    sort = sort or "created_at"
+    sort_column, default_order = SORT_COLUMNS[sort]
+    order = order or default_order
+    descending = order == "desc"
+
+    keyset = (sort_column, UnifiedData.id)
+    query = query.order_by(*(column.desc() if descending else column.asc() for column in keyset))
+
+    if cursor:
+        # Seek past the position stored in the cursor, not the row's current
+        # values: an updated price or rank must not skip or repeat rows
+        value, row_id = decode_cursor(cursor, sort, order)
+        column, bound = seek_terms(db, sort_column, value)
+        position, boundary = tuple_(column, UnifiedData.id), tuple_(bound, literal(row_id))
+        query = query.filter(position < boundary if descending else position > boundary)
+    elif skip:
+        query = query.offset(skip)
+
+    rows = as_dicts(UNIFIED_DATA_FIELDS, query.limit(limit).all())
+    for row in rows:
+        row["cursor"] = encode_cursor(sort, order, row[sort_column.key], row["id"])
+
+    # An empty page keeps the caller's place, so tailing an ascending sort can poll again
+    next_cursor = rows[-1]["cursor"] if rows else cursor
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    return rows
+
 @router.get("/data", response_model=List[UnifiedDataRead], dependencies=[Depends(rate_limiter)])
-def get_data(
+async def get_data(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
-    source: Optional[str] = None,
-    canonical_id: Optional[int] = None,
     search: Optional[str] = None,
+    cursor: Optional[str] = None,
+    sort: Optional[Literal["price", "market_cap", "rank"]] = None,
+    order: Optional[Literal["asc", "desc"]] = None,
+    filters: DataFilters = Depends(),
+    db=Depends(get_read_db)
+):
+    """
+    Results are ordered newest first by (created_at, id). Every row carries an
+    opaque `cursor`, and the `X-Next-Cursor` header repeats the last one; pass
+    it back as `cursor` to continue after that row with a keyset seek instead
+    of `skip`, so deep pages cost the same as the first one. A cursor only
+    works with the `sort` and `order` it was issued for (400 otherwise).
+
+    `sort=price|market_cap|rank` orders by that column instead (price and
+    market cap descending, rank ascending, unless `order` says otherwise) and
+    skips rows without a value; cursors work the same way. `min_*`/`max_*`
+    filter on price, market cap and rank.
+
+    `search` runs a full-text query over title and description (every word
+    must match, prefixes allowed, e.g. `bit` or `btc`) and ranks the results.
+
+    Responses are cached until the next ETL run and carry an ETag; send it
+    back as `If-None-Match` to get a 304 while nothing has changed.
+    """
+    async def build(headers: Dict[str, str]) -> List[Dict]:
+        return await run_db(db, query_data, headers, filters, skip, limit, search, cursor, sort, order)
+
+    return await response_cache.respond(request, db, build)
+
+@router.get(
+    "/data/export",
+    dependencies=[Depends(rate_limiter)],
+    response_class=StreamingResponse,
+    responses={200: {"content": {media_type: {} for media_type in MEDIA_TYPES.values()}}}
+)
+def export_data(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    updated_since: Optional[datetime] = None,
+    gzip: bool = False,
+    filters: DataFilters = Depends(),
     db: Session = Depends(get_db)
 ):
-    query = db.query(UnifiedData)
-    
-    if source:
-        query = query.filter(UnifiedData.source == source)
-    
-    if canonical_id:
-        query = query.filter(UnifiedData.canonical_id == canonical_id)
-    
-    if search:
-        query = query.filter(UnifiedData.title.ilike(f"%{search}%") | UnifiedData.description.ilike(f"%{search}%"))
-    
-    return query.order_by(UnifiedData.created_at.desc()).offset(skip).limit(limit).all()
+    """
+    Streams every row matching the `/data` filters as NDJSON or CSV, read
+    through a server-side cursor. With `updated_since` only rows updated at
+    or after it are exported, oldest change first, so a sync can resume from
+    the last `updated_at` it saw. `gzip=true` compresses the stream on the fly.
+    """
+    query = filters.apply(db.query(*UNIFIED_DATA_COLUMNS))
+    if updated_since:
+        query = query.filter(UnifiedData.updated_at >= updated_since).order_by(UnifiedData.updated_at, UnifiedData.id)
+    else:
+        query = query.order_by(UnifiedData.id)
+
+    headers = {"Content-Disposition": f'attachment; filename="unified_data.{format}"'}
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(stream_export(query, format, gzip), media_type=MEDIA_TYPES[format], headers=headers)
+
+ASSET_COLUMNS = [CanonicalAsset.id, CanonicalAsset.symbol, CanonicalAsset.name, CanonicalAsset.created_at]
+ASSET_FIELDS = [column.key for column in ASSET_COLUMNS]
+SNAPSHOT_COLUMNS = [
+    AssetSnapshot.canonical_id,
+    AssetSnapshot.prices,
+    AssetSnapshot.source_count,
+    AssetSnapshot.median_price,
+    AssetSnapshot.min_price,
+    AssetSnapshot.max_price,
+    AssetSnapshot.spread_pct,
+    AssetSnapshot.freshest_at,
+    AssetSnapshot.stalest_at,
+]
+SNAPSHOT_FIELDS = [column.key for column in SNAPSHOT_COLUMNS[1:]]
+
+def query_assets(db: Session, embed_snapshot: bool) -> List[Dict]:
+    if not embed_snapshot:
+        return [dict(zip(ASSET_FIELDS, row), snapshot=None) for row in db.query(*ASSET_COLUMNS).order_by(CanonicalAsset.id)]
+
+    # One outer join instead of a /data?canonical_id= call per asset
+    results = []
+    width = len(ASSET_COLUMNS)
+    for row in db.query(*ASSET_COLUMNS, *SNAPSHOT_COLUMNS).outerjoin(
+        AssetSnapshot, AssetSnapshot.canonical_id == CanonicalAsset.id
+    ).order_by(CanonicalAsset.id):
+        asset = dict(zip(ASSET_FIELDS, row[:width]))
+        # canonical_id is NULL when the asset has no snapshot yet
+        asset["snapshot"] = dict(zip(SNAPSHOT_FIELDS, row[width + 1:])) if row[width] is not None else None
+        results.append(asset)
+    return results
 
 @router.get("/assets", response_model=List[CanonicalAssetRead])
-def get_assets(
-    db: Session = Depends(get_db)
+async def get_assets(
+    request: Request,
+    embed: Optional[Literal["snapshot"]] = None,
+    db=Depends(get_read_db)
 ):
-    return db.query(CanonicalAsset).all()
+    """
+    Canonical assets. `embed=snapshot` adds each asset's cross-source view:
+    the latest price per source, median, min/max, spread and freshness.
+    """
+    async def build(headers: Dict[str, str]) -> List[Dict]:
+        return await run_db(db, query_assets, embed == "snapshot")
 
-@router.get("/health", response_model=HealthStatus)
-def health_check(db: Session = Depends(get_db)):
+    return await response_cache.respond(request, db, build)
+
+def query_prices(
+    db: Session,
+    asset_id: int,
+    interval: str,
+    start: Optional[datetime],
+    end: Optional[datetime]
+) -> List[PricePoint]:
+    if db.get(CanonicalAsset, asset_id) is None:
+        raise HTTPException(status_code=404, detail="Asset not found")
+    return [PricePoint.model_validate(bucket) for bucket in get_price_series(db, asset_id, interval, start, end)]
+
+@router.get("/assets/{asset_id}/prices", response_model=List[PricePoint])
+async def get_asset_prices(
+    request: Request,
+    asset_id: int,
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    interval: Literal["1m", "1h", "1d"] = "1h",
+    db=Depends(get_read_db)
+):
+    """
+    OHLC price history of one canonical asset across all sources, read from
+    the precomputed rollup for `interval`. `from` is inclusive, `to` exclusive.
+    """
+    async def build(headers: Dict[str, str]) -> List[PricePoint]:
+        return await run_db(db, query_prices, asset_id, interval, start, end)
+
+    return await response_cache.respond(request, db, build)
+
+def query_health(db: Session) -> HealthStatus:
     try:
         # Check DB connectivity
         db.execute(func.now())
         db_connected = True
     except Exception:
         db_connected = False
-    
+
+    if not db_connected:
+        return HealthStatus(db_connected=False, last_etl_run=None, total_runs=0, success_runs=0, status="degraded")
+
+    # Counters maintained by BaseExtractor.run: one primary-key lookup
+    summary = get_summary(db)
+    return HealthStatus(
+        db_connected=True,
+        last_etl_run=summary.last_run_at,
+        total_runs=summary.total_runs,
+        success_runs=summary.success_runs,
+        status="healthy"
+    )
+
+def query_deep_health(db: Session) -> HealthStatus:
     # Get last ETL run
     last_run = db.query(ETLRun).order_by(ETLRun.started_at.desc()).first()
     
@@ -68,31 +350,83 @@ def health_check(db: Session = Depends(get_db)):
     ).distinct().count()
     
     return HealthStatus(
-        db_connected=db_connected,
+        db_connected=True,
         last_etl_run=last_run.ended_at if last_run else None,
         total_runs=total_runs,
         success_runs=success_runs,
-        status="healthy" if db_connected else "degraded"
+        status="healthy"
     )
 
-@router.post("/trigger")
-def trigger_etl():
-    import subprocess
-    import os
+@router.get("/health", response_model=HealthStatus)
+async def health_check(db=Depends(get_read_db)):
+    """Cheap health probe: a DB ping plus the run summary counters."""
+    return await run_db(db, query_health)
+
+@router.get("/health/live")
+async def liveness():
+    """Liveness probe: the process is up and serving; touches nothing else."""
+    return {"status": "alive"}
+
+@router.get("/health/ready", response_model=HealthStatus)
+async def readiness(request: Request, db=Depends(get_read_db)):
+    """
+    Readiness / deep health: recomputes the run statistics from etl_runs.
+    Fails with 503 when the database is unreachable; successful results are
+    cached for `HEALTH_DEEP_CACHE_SECONDS`.
+    """
+    async def build(headers: Dict[str, str]) -> HealthStatus:
+        try:
+            return await run_db(db, query_deep_health)
+        except Exception as e:
+            raise HTTPException(status_code=503, detail=f"Database unavailable: {e}")
+
+    return await response_cache.respond(request, db, build, ttl=settings.HEALTH_DEEP_CACHE_SECONDS)
+
+@router.post("/trigger", status_code=202)
+def trigger_etl(source: Optional[str] = None):
+    """
+    Queues an ETL run of every source, or only `source`, on the resident
+    scheduler. Sources already queued or running are coalesced into that run.
+    """
     try:
-        # Run the runner.py script in a separate process
-        import sys
-        script_path = os.path.join(os.getcwd(), "app", "ingestion", "runner.py")
-        subprocess.Popen([sys.executable, script_path])
-        return {"status": "triggered"}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        outcome = etl_scheduler.trigger([source] if source else None)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown source: {source}")
+    return {"status": "triggered", "sources": outcome}
 
-@router.post("/upload-csv")
+def ingest_csv(session_factory, file_path: str, batch_run_id: str, job: Job) -> Dict:
+    """
+    Background job body: loads an uploaded CSV on its own session, then deletes
+    the file. While another run holds the CSV source's lease the upload waits
+    for it; if it never frees up the job fails rather than dropping the file.
+    """
+    db = session_factory()
+    try:
+        extractor = CSVExtractor(db, file_path, run_id=batch_run_id)
+        extractor.progress = job.progress
+        deadline = time.monotonic() + settings.UPLOAD_LEASE_WAIT_SECONDS
+        while True:
+            result = extractor.run()
+            if result["status"] != "skipped":
+                return result
+            if time.monotonic() >= deadline:
+                raise RuntimeError(f"{extractor.source_name} stayed locked by another run; upload not ingested")
+            time.sleep(settings.UPLOAD_LEASE_RETRY_SECONDS)
+    finally:
+        db.close()
+        if os.path.exists(file_path):
+            os.remove(file_path)
+
+@router.post("/upload-csv", status_code=202)
 async def upload_csv(
     file: UploadFile = File(...),
-    db: Session = Depends(get_db)
+    session_factory=Depends(get_session_factory)
 ):
+    """
+    Writes the upload to disk chunk by chunk without blocking the event loop,
+    then queues its ingestion and returns right away. Poll `GET /jobs/{job_id}`
+    for progress and the final record counts.
+    """
     if not file.filename.endswith('.csv'):
         raise HTTPException(status_code=400, detail="Only CSV files are allowed")
     
@@ -100,53 +434,69 @@ async def upload_csv(
     temp_dir = "temp_uploads"
     os.makedirs(temp_dir, exist_ok=True)
     
-    file_path = os.path.join(temp_dir, f"{uuid.uuid4()}_{file.filename}")
+    file_path = os.path.join(temp_dir, f"{uuid.uuid4()}_{os.path.basename(file.filename)}")
     
     try:
-        # Save the uploaded file
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        
-        # Run extraction immediately
-        batch_run_id = f"manual_{uuid.uuid4().hex[:8]}"
-        extractor = CSVExtractor(db, file_path, run_id=batch_run_id)
-        results = extractor.run()
-        
-        # Cleanup
-        os.remove(file_path)
-        
-        return {
-            "status": "success",
-            "records_processed": results["records_processed"],
-            "run_id": batch_run_id
-        }
+        # File I/O happens on the threadpool; the loop only awaits each chunk
+        buffer = await run_in_threadpool(open, file_path, "wb")
+        try:
+            while chunk := await file.read(settings.UPLOAD_CHUNK_SIZE):
+                await run_in_threadpool(buffer.write, chunk)
+        finally:
+            await run_in_threadpool(buffer.close)
     except Exception as e:
         if os.path.exists(file_path):
             os.remove(file_path)
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/stats", response_model=List[ETLStats])
-def get_stats(db: Session = Depends(get_db)):
-    # Get the latest run for each source
-    latest_runs = db.query(
-        ETLRun.source,
-        func.max(ETLRun.started_at).label("max_started_at")
-    ).group_by(ETLRun.source).subquery()
-    
-    stats_query = db.query(ETLRun).join(
-        latest_runs,
-        (ETLRun.source == latest_runs.c.source) & (ETLRun.started_at == latest_runs.c.max_started_at)
-    )
-    
+    batch_run_id = f"manual_{uuid.uuid4().hex[:8]}"
+    job = job_queue.submit("csv_upload", lambda job: ingest_csv(session_factory, file_path, batch_run_id, job))
+    return {
+        "status": job.status,
+        "job_id": job.id,
+        "run_id": batch_run_id
+    }
+
+@router.get("/jobs/{job_id}", response_model=JobStatus)
+def get_job(job_id: str):
+    """Progress of a background job: rows read and written so far, throughput, and the result once done."""
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return JobStatus.model_validate(job)
+
+def query_stats(db: Session, history: int) -> List[ETLStats]:
     results = []
-    for run in stats_query.all():
+    for status in db.query(ETLSourceStatus).order_by(ETLSourceStatus.source).all():
         results.append(ETLStats(
-            source=run.source,
-            records_processed=run.records_processed,
-            status=run.status,
-            duration_ms=run.duration_ms or 0,
-            last_run_at=run.ended_at,
-            error_message=run.error_message
+            source=status.source,
+            records_processed=status.last_records_processed or 0,
+            status=status.last_status,
+            duration_ms=status.last_duration_ms or 0,
+            last_run_at=status.last_ended_at,
+            error_message=status.last_error_message,
+            records_inserted=status.last_records_inserted,
+            records_updated=status.last_records_updated,
+            records_unchanged=status.last_records_unchanged,
+            success_rate=status.success_rate,
+            p50_duration_ms=status.p50_duration_ms,
+            p95_duration_ms=status.p95_duration_ms,
+            history=[ETLRunHistory.model_validate(run) for run in recent_runs(db, status.source, history)] if history else None
         ))
     
     return results
+
+@router.get("/stats", response_model=List[ETLStats])
+async def get_stats(
+    request: Request,
+    history: int = Query(0, ge=0, le=100, description="Include this many most recent runs per source"),
+    db=Depends(get_read_db)
+):
+    """
+    Latest run per source with its rolling success rate and p50/p95 duration,
+    read from the `etl_source_status` projection.
+    """
+    async def build(headers: Dict[str, str]) -> List[ETLStats]:
+        return await run_db(db, query_stats, history)
+
+    return await response_cache.respond(request, db, build)
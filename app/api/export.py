@@ -0,0 +1,80 @@
+from sqlalchemy.orm import Query
+from datetime import datetime
+from typing import Iterable, Iterator
+from app.core.models import UnifiedData
+from app.core.serialization import dumps
+import csv
+import io
+import zlib
+
+# The columns of UnifiedDataRead, selected as tuples by /data and the export (CSV header order)
+UNIFIED_DATA_COLUMNS = [
+    UnifiedData.id,
+    UnifiedData.source,
+    UnifiedData.external_id,
+    UnifiedData.canonical_id,
+    UnifiedData.title,
+    UnifiedData.description,
+    UnifiedData.symbol,
+    UnifiedData.price_usd,
+    UnifiedData.market_cap,
+    UnifiedData.rank,
+    UnifiedData.data,
+    UnifiedData.created_at,
+    UnifiedData.updated_at,
+]
+UNIFIED_DATA_FIELDS = [column.key for column in UNIFIED_DATA_COLUMNS]
+
+# Rows fetched per round trip from the server-side cursor
+EXPORT_FETCH_SIZE = 1000
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+def ndjson_chunks(rows: Iterable[tuple]) -> Iterator[bytes]:
+    buffer = []
+    for row in rows:
+        buffer.append(dumps(dict(zip(UNIFIED_DATA_FIELDS, row))))
+        if len(buffer) >= EXPORT_FETCH_SIZE:
+            yield ("\n".join(buffer) + "\n").encode()
+            buffer = []
+    if buffer:
+        yield ("\n".join(buffer) + "\n").encode()
+
+def csv_chunks(rows: Iterable[tuple]) -> Iterator[bytes]:
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(UNIFIED_DATA_FIELDS)
+    for count, row in enumerate(rows, 1):
+        writer.writerow([
+            dumps(value) if isinstance(value, (dict, list))
+            else value.isoformat() if isinstance(value, datetime)
+            else value
+            for value in row
+        ])
+        if count % EXPORT_FETCH_SIZE == 0:
+            yield out.getvalue().encode()
+            out.seek(0)
+            out.truncate()
+    if out.tell():
+        yield out.getvalue().encode()
+
+def gzip_chunks(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Compresses a byte stream on the fly (gzip container)."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+def stream_export(query: Query, fmt: str, compress: bool) -> Iterator[bytes]:
+    """
+    Encodes `query` (selecting UNIFIED_DATA_COLUMNS) as NDJSON or CSV while it is
+    read with `yield_per`, so memory stays flat whatever the table size.
+    """
+    rows = query.yield_per(EXPORT_FETCH_SIZE)
+    chunks = ndjson_chunks(rows) if fmt == "ndjson" else csv_chunks(rows)
+    return gzip_chunks(chunks) if compress else chunks
@@ -0,0 +1,96 @@
+"""
+Rows/sec of the /data and /assets serialization, before and after the tuple
+fast path. Seeds a throwaway in-memory SQLite database:
+
+    python -m app.benchmarks.serialization [rows]
+"""
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.api.endpoints import DataFilters, query_assets, query_data
+from app.core.database import Base
+from app.core.models import AssetSnapshot, CanonicalAsset, UnifiedData
+from app.core.serialization import dumps
+from app.schemas.data import AssetSnapshotRead, CanonicalAssetRead, UnifiedDataRead
+from datetime import datetime, timezone
+import json
+import sys
+import time
+
+def seed(db, rows: int):
+    now = datetime.now(timezone.utc)
+    assets = [CanonicalAsset(symbol=f"A{i}", name=f"Asset {i}") for i in range(rows)]
+    db.add_all(assets)
+    db.flush()
+    db.add_all(AssetSnapshot(
+        canonical_id=asset.id,
+        prices={"coingecko": {"price": 1.0 + i, "ts": now.isoformat()}},
+        source_count=1,
+        median_price=1.0 + i,
+        freshest_at=now,
+        stalest_at=now
+    ) for i, asset in enumerate(assets))
+    db.add_all(UnifiedData(
+        source="bench",
+        external_id=f"b{i}",
+        canonical_id=assets[i].id,
+        title=f"Row {i}",
+        description="benchmark row",
+        symbol=f"A{i}",
+        price_usd=1.0 + i,
+        market_cap=1e9 + i,
+        rank=i,
+        data={"price_usd": 1.0 + i, "tags": ["x", "y"]},
+        created_at=now,
+        updated_at=now
+    ) for i in range(rows))
+    db.commit()
+
+def orm_data(db, rows: int) -> str:
+    results = db.query(UnifiedData).order_by(UnifiedData.created_at.desc(), UnifiedData.id.desc()).limit(rows).all()
+    return json.dumps(jsonable_encoder([UnifiedDataRead.model_validate(row) for row in results]), separators=(",", ":"))
+
+def orm_assets(db, rows: int) -> str:
+    results = []
+    for asset, snapshot in db.query(CanonicalAsset, AssetSnapshot).outerjoin(
+        AssetSnapshot, AssetSnapshot.canonical_id == CanonicalAsset.id
+    ).all():
+        read = CanonicalAssetRead.model_validate(asset)
+        read.snapshot = AssetSnapshotRead.model_validate(snapshot) if snapshot else None
+        results.append(read)
+    return json.dumps(jsonable_encoder(results), separators=(",", ":"))
+
+def fast_data(db, rows: int) -> str:
+    return dumps(query_data(db, {}, DataFilters(), 0, rows, None, None, None, None))
+
+def fast_assets(db, rows: int) -> str:
+    return dumps(query_assets(db, True))
+
+def rows_per_second(fn, session_factory, rows: int, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        # Fresh session each time so the ORM path can't reuse its identity map
+        db = session_factory()
+        try:
+            start = time.perf_counter()
+            fn(db, rows)
+            best = min(best, time.perf_counter() - start)
+        finally:
+            db.close()
+    return rows / best
+
+def main(rows: int = 1000, repeat: int = 5):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(bind=engine)
+    db = session_factory()
+    seed(db, rows)
+    db.close()
+
+    for name, before, after in [("/data", orm_data, fast_data), ("/assets?embed=snapshot", orm_assets, fast_assets)]:
+        slow = rows_per_second(before, session_factory, rows, repeat)
+        fast = rows_per_second(after, session_factory, rows, repeat)
+        print(f"{name:<24} orm+pydantic {slow:>10,.0f} rows/s   tuples+orjson {fast:>10,.0f} rows/s   x{fast / slow:.1f}")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
@@ -0,0 +1,214 @@
+from fastapi import Request, Response
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from urllib.parse import urlencode
+from app.core.config import settings
+from app.core.database import run_db
+from app.core.run_stats import committed_runs
+from app.core.serialization import dumps
+from starlette.concurrency import run_in_threadpool
+import hashlib
+import json
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Backend key holding the data version; bumping it orphans every cached response
+VERSION_KEY = "response_cache:version"
+
+class MemoryCacheBackend:
+    """
+    In-process backend: an LRU bounded by `max_entries`, with per-entry expiry.
+    Counters live outside the LRU so the data version is never evicted.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[Optional[float], Any]]" = OrderedDict()
+        self._counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            if key in self._counters:
+                return self._counters[key]
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+class RedisCacheBackend:
+    """
+    Shared backend for several API workers. Takes any redis-py compatible
+    client (`get`, `set(..., ex=)`, `incr`); values are stored as
+    JSON and the LRU bound is left to Redis' own `maxmemory-policy`.
+    """
+
+    # Every call is a network round trip: keep it off the event loop
+    blocking = True
+
+    def __init__(self, client, prefix: str = "kasparro:"):
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self.client.get(self.prefix + key)
+        return json.loads(value) if value is not None else None
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        self.client.set(self.prefix + key, json.dumps(value), ex=int(ttl) if ttl else None)
+
+    def incr(self, key: str) -> int:
+        return int(self.client.incr(self.prefix + key))
+
+    def clear(self):
+        # Orphan every entry rather than scanning the keyspace
+        self.incr(VERSION_KEY)
+
+class ResponseCache:
+    """
+    Caches serialized JSON responses of read endpoints, keyed by path plus
+    normalized query params and the current data version.
+
+    Data only changes when an ETL run commits, so entries are never deleted:
+    a new version simply stops addressing them and they age out through the
+    TTL/LRU. The version has two parts. The database part
+    (`etl_run_summary.total_runs`) changes with every committed run, whichever
+    process ran it, and each worker re-reads it at most every
+    `version_ttl_seconds`. The backend part is bumped by `bump_version()` after
+    a run commits in this process (or any process, with a shared backend), so
+    that invalidation is immediate. Every response carries an ETag; a
+    matching `If-None-Match` gets a bodiless 304.
+    """
+
+    def __init__(
+        self,
+        backend,
+        ttl_seconds: float,
+        enabled: bool = True,
+        version_ttl_seconds: float = 1.0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self.version_ttl_seconds = version_ttl_seconds
+        self.clock = clock
+        self._data_version: Optional[int] = None
+        self._data_version_read_at = 0.0
+
+    def version(self) -> int:
+        return int(self.backend.get(VERSION_KEY) or 0)
+
+    async def data_version(self, db) -> int:
+        """The committed-runs count, read through `db` at most every `version_ttl_seconds`."""
+        now = self.clock()
+        if self._data_version is None or now - self._data_version_read_at >= self.version_ttl_seconds:
+            try:
+                self._data_version = await run_db(db, committed_runs)
+                self._data_version_read_at = now
+            except Exception as e:
+                # Keep serving under the last known version; the TTL still bounds staleness
+                logger.error(f"Failed to read the data version: {e}")
+        return self._data_version or 0
+
+    def bump_version(self):
+        try:
+            self.backend.incr(VERSION_KEY)
+        except Exception as e:
+            # A stale cache must never fail an ETL run; the TTL still bounds staleness
+            logger.error(f"Failed to invalidate response cache: {e}")
+
+    def clear(self):
+        self.backend.clear()
+        self._data_version = None
+
+    def key(self, request: Request, data_version: int = 0) -> str:
+        params = urlencode(sorted(request.query_params.multi_items()))
+        return f"v{data_version}.{self.version()}:{request.url.path}?{params}"
+
+    def _lookup(self, request: Request, data_version: int) -> Tuple[str, Optional[Dict[str, Any]]]:
+        key = self.key(request, data_version)
+        return key, self.backend.get(key)
+
+    async def _offload(self, fn: Callable, *args, **kwargs) -> Any:
+        """Runs a backend call on the threadpool if the backend blocks on I/O (Redis)."""
+        if getattr(self.backend, "blocking", False):
+            return await run_in_threadpool(fn, *args, **kwargs)
+        return fn(*args, **kwargs)
+
+    async def respond(
+        self,
+        request: Request,
+        db,
+        build: Callable[[Dict[str, str]], Awaitable[Any]],
+        ttl: Optional[float] = None
+    ) -> Response:
+        """
+        Serves `request` from the cache, awaiting `build(headers)` on a miss.
+        `build` returns the JSON-encodable payload (models, or plain dicts for
+        the fast path) and may add response headers to `headers`; both are
+        cached together, for `ttl` seconds if given. `db` is the request's
+        session, used to read the data version.
+        """
+        entry = None
+        key = None
+        if self.enabled:
+            # Version read and lookup share one threadpool hop
+            key, entry = await self._offload(self._lookup, request, await self.data_version(db))
+
+        if entry is None:
+            headers: Dict[str, str] = {}
+            body = dumps(await build(headers))
+            etag = f'"{hashlib.sha1(body.encode()).hexdigest()}"'
+            entry = {"body": body, "etag": etag, "headers": headers}
+            cache_status = "MISS"
+            if self.enabled:
+                await self._offload(self.backend.set, key, entry, ttl=ttl or self.ttl_seconds)
+        else:
+            cache_status = "HIT"
+
+        headers = {**entry["headers"], "ETag": entry["etag"], "X-Cache": cache_status}
+        if entry["etag"] in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+            return Response(status_code=304, headers=headers)
+        return Response(content=entry["body"], media_type="application/json", headers=headers)
+
+def get_cache_backend():
+    if settings.RESPONSE_CACHE_REDIS_URL:
+        try:
+            import redis
+            return RedisCacheBackend(redis.Redis.from_url(settings.RESPONSE_CACHE_REDIS_URL))
+        except ImportError:
+            logger.warning("RESPONSE_CACHE_REDIS_URL is set but redis is not installed; using the in-process cache")
+    return MemoryCacheBackend(max_entries=settings.RESPONSE_CACHE_MAX_ENTRIES)
+
+response_cache = ResponseCache(
+    backend=get_cache_backend(),
+    ttl_seconds=settings.RESPONSE_CACHE_TTL_SECONDS,
+    enabled=settings.RESPONSE_CACHE_ENABLED,
+    version_ttl_seconds=settings.RESPONSE_CACHE_VERSION_TTL_SECONDS
+)
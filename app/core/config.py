@@ -1,6 +1,6 @@
 from pydantic_settings import BaseSettings
 from pydantic import ConfigDict
-from typing import Optional
+from typing import Dict, Optional
 
 class Settings(BaseSettings):
     PROJECT_NAME: str = "Kasparro Backend & ETL"
@@ -29,13 +29,113 @@ class Settings(BaseSettings):
         db = self.POSTGRES_DB or "kasparro"
         
         return f"postgresql://{user}:{password}@{server}:{port}/{db}"
+
+    def get_async_database_url(self) -> str:
+        url = self.get_database_url()
+        for prefix, driver in (("postgresql://", "postgresql+asyncpg://"), ("sqlite://", "sqlite+aiosqlite://")):
+            if url.startswith(prefix):
+                return url.replace(prefix, driver, 1)
+        return url
     
+    # Connection pools (sync and async engines); pool size does not apply to SQLite
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT_SECONDS: float = 30.0
+    DB_POOL_PRE_PING: bool = True
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    # Serve read endpoints from an async engine (asyncpg / aiosqlite)
+    DB_ASYNC: bool = True
+
     # Security: Use environment variables for these
     # Do NOT hardcode actual keys here
     API_KEY: Optional[str] = None
     COINPAPRIKA_API_KEY: Optional[str] = None
     DEBUG: bool = False
 
+    # ETL loading: write each batch with a single INSERT ... ON CONFLICT
+    ETL_BULK_LOAD: bool = True
+    ETL_BATCH_SIZE: int = 500
+
+    # Overlap extract, transform and load on threads joined by queues of this many batches,
+    # for sources that declare `pipeline_safe`
+    ETL_PIPELINED: bool = True
+    ETL_PIPELINE_QUEUE_SIZE: int = 4
+
+    # Runner: execute sources in parallel, each on its own session
+    ETL_CONCURRENT: bool = True
+    ETL_MAX_WORKERS: int = 4
+
+    # Partitioned runs (sources with a partition stager, i.e. CSV): stage batches in
+    # this many processes (0 = off) and load them over ETL_LOAD_WORKERS connections
+    ETL_PARTITION_WORKERS: int = 0
+    ETL_LOAD_WORKERS: int = 4
+
+    # Per-source run lease shared by every process: one run of a source at a time
+    # cluster-wide. Holders renew every heartbeat; a lease not renewed within the TTL
+    # can be taken over.
+    ETL_LEASES_ENABLED: bool = True
+    ETL_LEASE_TTL_SECONDS: float = 300.0
+    ETL_LEASE_HEARTBEAT_SECONDS: float = 60.0
+
+    # Resident scheduler: seconds between runs per source label (0 disables a source).
+    # The API process only runs the periodic schedule when ETL_SCHEDULER_ENABLED is set.
+    ETL_SCHEDULER_ENABLED: bool = False
+    ETL_SOURCE_INTERVALS: Dict[str, float] = {"CSV": 3600, "CoinPaprika": 60, "CoinGecko": 60, "RSS": 900}
+
+    # Outbound HTTP for API sources
+    HTTP_TIMEOUT_SECONDS: float = 10.0
+    HTTP_MAX_RETRIES: int = 3
+    HTTP_BACKOFF_BASE_SECONDS: float = 0.5
+    # Upper bound on any single retry wait, including a server's Retry-After
+    HTTP_MAX_BACKOFF_SECONDS: float = 30.0
+    HTTP_MAX_CONNECTIONS: int = 20
+    HTTP_PER_HOST_CONCURRENCY: int = 4
+
+    # API coverage: how many top assets to ingest, and how CoinGecko pages are fetched
+    API_TOP_N: int = 50
+    COINGECKO_PAGE_SIZE: int = 250
+    COINGECKO_RATE_PER_SECOND: float = 0.5
+
+    # Rows per pandas chunk when streaming CSV files
+    CSV_CHUNK_SIZE: int = 50000
+    # Transform whole CSV chunks column-wise instead of record by record
+    CSV_VECTORIZED_TRANSFORM: bool = True
+    # Re-validate every transformed row through pydantic before loading
+    ETL_STRICT_VALIDATION: bool = False
+
+    # Background jobs (CSV uploads): worker threads, and finished jobs kept for polling
+    JOB_WORKERS: int = 2
+    JOB_HISTORY: int = 100
+    # Bytes read from an upload per chunk while it is written to disk
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024
+    # How long an upload waits for the CSV source's lease (held by a scheduled run), and how often it retries
+    UPLOAD_LEASE_WAIT_SECONDS: float = 900.0
+    UPLOAD_LEASE_RETRY_SECONDS: float = 5.0
+
+    # Upper bound on cached (source, external_id) / symbol -> canonical_id entries
+    IDENTITY_CACHE_SIZE: int = 50000
+
+    # Response cache for read endpoints; invalidated whenever an ETL run commits
+    RESPONSE_CACHE_ENABLED: bool = True
+    RESPONSE_CACHE_TTL_SECONDS: float = 60.0
+    RESPONSE_CACHE_MAX_ENTRIES: int = 1024
+    # How often each API worker re-reads the data version (runs committed by any process)
+    RESPONSE_CACHE_VERSION_TTL_SECONDS: float = 1.0
+    # Set to share the cache between API workers (requires the `redis` package)
+    RESPONSE_CACHE_REDIS_URL: Optional[str] = None
+
+    # Finished runs per source behind the success rate and p50/p95 in /stats
+    ETL_STATUS_WINDOW: int = 20
+
+    # How long GET /health/ready reuses its full scan of etl_runs
+    HEALTH_DEEP_CACHE_SECONDS: float = 10.0
+
+    # API rate limit per client IP (sliding window)
+    RATE_LIMIT_REQUESTS: int = 60
+    RATE_LIMIT_WINDOW_SECONDS: int = 60
+    # Set to enforce the limit across API workers (requires the `redis` package)
+    RATE_LIMIT_REDIS_URL: Optional[str] = None
+
     model_config = ConfigDict(case_sensitive=True, env_file=".env")
 
 settings = Settings()
@@ -1,10 +1,43 @@
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from starlette.concurrency import run_in_threadpool
+from typing import Any, Callable, Dict
 from app.core.config import settings
+import logging
 
-engine = create_engine(settings.get_database_url())
+logger = logging.getLogger(__name__)
+
+def engine_options(url: str) -> Dict[str, Any]:
+    """Pool settings shared by the sync and async engines."""
+    options = {
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+    }
+    if not url.startswith("sqlite"):
+        options["pool_size"] = settings.DB_POOL_SIZE
+        options["max_overflow"] = settings.DB_MAX_OVERFLOW
+        options["pool_timeout"] = settings.DB_POOL_TIMEOUT_SECONDS
+    return options
+
+# Sync engine: ETL, writes and anything still running on the threadpool
+engine = create_engine(settings.get_database_url(), **engine_options(settings.get_database_url()))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+def create_async_session_factory():
+    """Async engine for the read endpoints, or None when disabled or the driver is missing."""
+    if not settings.DB_ASYNC:
+        return None
+    url = settings.get_async_database_url()
+    try:
+        async_engine = create_async_engine(url, **engine_options(url))
+    except ImportError as e:
+        logger.warning(f"Async database driver unavailable ({e}); read endpoints use the sync engine")
+        return None
+    return async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+AsyncSessionLocal = create_async_session_factory()
+
 Base = declarative_base()
 
 def get_db():
@@ -13,3 +46,30 @@ def get_db():
         yield db
     finally:
         db.close()
+
+def get_session_factory() -> Callable:
+    """Session factory for work that outlives the request, such as background jobs."""
+    return SessionLocal
+
+async def get_read_db():
+    """Session for read-only endpoints: async when available, sync otherwise."""
+    if AsyncSessionLocal is None:
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+        return
+
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def run_db(db, fn: Callable, *args):
+    """
+    Runs `fn(session, *args)` without tying up a threadpool worker on async
+    sessions: the sync ORM code runs on the async connection via `run_sync`.
+    Sync sessions fall back to the threadpool.
+    """
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args)
+    return await run_in_threadpool(fn, db, *args)
@@ -0,0 +1,14 @@
+from typing import Any, Dict
+import hashlib
+import json
+
+# UnifiedData columns that make up a record's content; updated_at/created_at are bookkeeping
+UNIFIED_HASH_FIELDS = ("canonical_id", "title", "description", "data")
+
+def content_hash(value: Any) -> str:
+    """Stable SHA-256 of a JSON-like value: key order and whitespace do not matter."""
+    payload = json.dumps(value, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def unified_content_hash(row: Dict[str, Any]) -> str:
+    return content_hash({field: row.get(field) for field in UNIFIED_HASH_FIELDS})
@@ -1,6 +1,19 @@
+from sqlalchemy import event
 from sqlalchemy.orm import Session
+from app.core.config import settings
 from app.core.models import CanonicalAsset, AssetMapping
-from typing import Optional
+from app.core.upsert import bulk_upsert, supports_upsert
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Session.info key holding identities seen by a session but not yet committed
+_PENDING_KEY = "identity_pending"
+# Keep IN (...) lists and multi-row inserts well under driver parameter limits
+_IN_CLAUSE_SIZE = 500
 
 def normalize_symbol(symbol: str) -> str:
     """Normalize symbol to uppercase and trim whitespace."""
@@ -8,51 +21,235 @@ def normalize_symbol(symbol: str) -> str:
         return "UNKNOWN"
     return symbol.strip().upper()
 
+class IdentityCache:
+    """
+    Bounded, process-wide LRU cache of canonical ids keyed by
+    (source, external_id) and by normalized symbol.
+
+    Only committed identities live here. Rows a session creates or reads are
+    parked in `Session.info` and promoted when that session commits, so a
+    rolled-back run can never leak a canonical id that does not exist.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._by_mapping: "OrderedDict[Tuple[str, str], int]" = OrderedDict()
+        self._by_symbol: "OrderedDict[str, int]" = OrderedDict()
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def _get(self, store: OrderedDict, key) -> Optional[int]:
+        with self._lock:
+            value = store.get(key)
+            if value is not None:
+                store.move_to_end(key)
+            return value
+
+    def _put(self, store: OrderedDict, key, value: int):
+        store[key] = value
+        store.move_to_end(key)
+        while len(store) > self.max_size:
+            store.popitem(last=False)
+
+    def get_mapping(self, source: str, external_id: str) -> Optional[int]:
+        return self._get(self._by_mapping, (source, external_id))
+
+    def get_symbol(self, symbol: str) -> Optional[int]:
+        return self._get(self._by_symbol, symbol)
+
+    def put(self, mappings: Dict[Tuple[str, str], int], symbols: Dict[str, int]):
+        with self._lock:
+            for key, canonical_id in mappings.items():
+                self._put(self._by_mapping, key, canonical_id)
+            for symbol, canonical_id in symbols.items():
+                self._put(self._by_symbol, symbol, canonical_id)
+
+    def preload(self, db: Session):
+        """
+        Replaces the cache contents with the known assets and mappings, read
+        in one query. `BaseExtractor.run` calls it at the start of every run,
+        so a long-lived process also sees identities other processes created.
+        """
+        rows = db.query(
+            CanonicalAsset.id,
+            CanonicalAsset.symbol,
+            AssetMapping.source,
+            AssetMapping.external_id
+        ).outerjoin(AssetMapping, AssetMapping.canonical_id == CanonicalAsset.id).order_by(
+            CanonicalAsset.id, AssetMapping.id
+        ).limit(self.max_size + 1).all()
+        if len(rows) > self.max_size:
+            # The rest still resolve, through one query per batch instead of the cache
+            logger.warning(
+                f"Identity cache preloaded only the first {self.max_size} asset mappings; "
+                f"raise IDENTITY_CACHE_SIZE to cache them all"
+            )
+            rows = rows[:self.max_size]
+
+        mappings = {}
+        symbols = {}
+        for canonical_id, symbol, source, external_id in rows:
+            symbols[symbol] = canonical_id
+            if source is not None:
+                mappings[(source, external_id)] = canonical_id
+
+        with self._lock:
+            self._by_mapping.clear()
+            self._by_symbol.clear()
+            for key, canonical_id in mappings.items():
+                self._put(self._by_mapping, key, canonical_id)
+            for symbol, canonical_id in symbols.items():
+                self._put(self._by_symbol, symbol, canonical_id)
+            self._loaded = True
+
+    def ensure_loaded(self, db: Session):
+        if not self._loaded:
+            self.preload(db)
+
+    def invalidate(self):
+        with self._lock:
+            self._by_mapping.clear()
+            self._by_symbol.clear()
+            self._loaded = False
+
+identity_cache = IdentityCache(max_size=settings.IDENTITY_CACHE_SIZE)
+
+def _slices(items: list, size: int = _IN_CLAUSE_SIZE):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+def _pending(db: Session) -> Dict[str, dict]:
+    return db.info.setdefault(_PENDING_KEY, {"mappings": {}, "symbols": {}})
+
+@event.listens_for(Session, "after_commit")
+def _promote_pending_identities(session: Session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending:
+        identity_cache.put(pending["mappings"], pending["symbols"])
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_pending_identities(session: Session, previous_transaction):
+    # Anything created inside the rolled-back transaction may no longer exist
+    session.info.pop(_PENDING_KEY, None)
+
+def _create_canonical_assets(db: Session, assets: Dict[str, str]) -> Dict[str, int]:
+    """
+    Creates canonical assets for the given symbol -> name pairs and returns their IDs.
+
+    Concurrent runs of different sources can race to create the same symbol, so
+    where the dialect allows it we insert with ON CONFLICT DO NOTHING (in symbol
+    order, to keep lock acquisition consistent) and read the IDs back.
+    """
+    if supports_upsert(db):
+        rows = [{"symbol": symbol, "name": name} for symbol, name in sorted(assets.items())]
+        created = {}
+        for part in _slices(rows):
+            bulk_upsert(db, CanonicalAsset, part, index_elements=["symbol"])
+            created.update(db.query(CanonicalAsset.symbol, CanonicalAsset.id).filter(
+                CanonicalAsset.symbol.in_([row["symbol"] for row in part])
+            ).all())
+        return created
+
+    new_assets = {symbol: CanonicalAsset(symbol=symbol, name=name) for symbol, name in assets.items()}
+    db.add_all(new_assets.values())
+    db.flush()  # Get the IDs
+    return {symbol: asset.id for symbol, asset in new_assets.items()}
+
+def resolve_canonical_ids(
+    db: Session,
+    source: str,
+    identities: Iterable[Tuple[str, str, str]]
+) -> List[int]:
+    """
+    Resolves a batch of (external_id, symbol, name) tuples for one source to
+    canonical IDs, in input order.
+    1. Serve what we can from the session and process caches.
+    2. Look up the remaining mappings, then canonical assets by symbol, in one query each.
+    3. Create missing canonical assets and mappings with one flush each.
+    """
+    identities = [(str(external_id), normalize_symbol(symbol), name) for external_id, symbol, name in identities]
+    identity_cache.ensure_loaded(db)
+    pending = _pending(db)
+
+    def cached_mapping(external_id: str) -> Optional[int]:
+        key = (source, external_id)
+        return pending["mappings"].get(key) or identity_cache.get_mapping(source, external_id)
+
+    def cached_symbol(symbol: str) -> Optional[int]:
+        return pending["symbols"].get(symbol) or identity_cache.get_symbol(symbol)
+
+    # 1. Check for existing mappings
+    resolved: Dict[str, int] = {}
+    missing: Dict[str, Tuple[str, str]] = {}
+    for external_id, symbol, name in identities:
+        canonical_id = cached_mapping(external_id)
+        if canonical_id is None:
+            missing.setdefault(external_id, (symbol, name))
+        else:
+            resolved[external_id] = canonical_id
+
+    if missing:
+        rows = []
+        for part in _slices(list(missing)):
+            rows += db.query(AssetMapping.external_id, AssetMapping.canonical_id).filter(
+                AssetMapping.source == source,
+                AssetMapping.external_id.in_(part)
+            ).all()
+        for external_id, canonical_id in rows:
+            pending["mappings"][(source, external_id)] = canonical_id
+            resolved[external_id] = canonical_id
+            missing.pop(external_id, None)
+
+    if missing:
+        # 2. Find or create canonical assets by symbol
+        # In a real system, we might use more complex matching logic (name similarity, etc.)
+        symbol_ids: Dict[str, int] = {}
+        unknown_symbols = set()
+        for symbol, _ in missing.values():
+            canonical_id = cached_symbol(symbol)
+            if canonical_id is None:
+                unknown_symbols.add(symbol)
+            else:
+                symbol_ids[symbol] = canonical_id
+
+        if unknown_symbols:
+            rows = []
+            for part in _slices(list(unknown_symbols)):
+                rows += db.query(CanonicalAsset.symbol, CanonicalAsset.id).filter(
+                    CanonicalAsset.symbol.in_(part)
+                ).all()
+            for symbol, canonical_id in rows:
+                pending["symbols"][symbol] = canonical_id
+                symbol_ids[symbol] = canonical_id
+                unknown_symbols.discard(symbol)
+
+        if unknown_symbols:
+            new_assets = {}
+            for symbol, name in missing.values():
+                if symbol in unknown_symbols:
+                    new_assets.setdefault(symbol, name)
+            for symbol, canonical_id in _create_canonical_assets(db, new_assets).items():
+                pending["symbols"][symbol] = canonical_id
+                symbol_ids[symbol] = canonical_id
+
+        # 3. Create mappings
+        new_mappings = []
+        for external_id, (symbol, _) in missing.items():
+            canonical_id = symbol_ids[symbol]
+            new_mappings.append(AssetMapping(source=source, external_id=external_id, canonical_id=canonical_id))
+            pending["mappings"][(source, external_id)] = canonical_id
+            resolved[external_id] = canonical_id
+        db.add_all(new_mappings)
+        db.flush()
+
+    return [resolved[external_id] for external_id, _, _ in identities]
+
 def resolve_canonical_id(
-    db: Session, 
-    source: str, 
-    external_id: str, 
-    symbol: str, 
+    db: Session,
+    source: str,
+    external_id: str,
+    symbol: str,
     name: str
 ) -> int:
-    """
-    Resolves a source-specific asset to a canonical ID.
-    1. Check for existing mapping.
-    2. If not found, find or create canonical asset.
-    3. Create mapping if missing.
-    """
-    normalized_symbol = normalize_symbol(symbol)
-    
-    # 1. Check for existing mapping
-    mapping = db.query(AssetMapping).filter(
-        AssetMapping.source == source,
-        AssetMapping.external_id == external_id
-    ).first()
-    
-    if mapping:
-        return mapping.canonical_id
-    
-    # 2. Find or create canonical asset by symbol
-    # In a real system, we might use more complex matching logic (name similarity, etc.)
-    canonical_asset = db.query(CanonicalAsset).filter(
-        CanonicalAsset.symbol == normalized_symbol
-    ).first()
-    
-    if not canonical_asset:
-        canonical_asset = CanonicalAsset(
-            symbol=normalized_symbol,
-            name=name
-        )
-        db.add(canonical_asset)
-        db.flush()  # Get the ID
-    
-    # 3. Create mapping
-    new_mapping = AssetMapping(
-        source=source,
-        external_id=external_id,
-        canonical_id=canonical_asset.id
-    )
-    db.add(new_mapping)
-    db.flush()
-    
-    return canonical_asset.id
+    """Resolves a single source-specific asset to a canonical ID."""
+    return resolve_canonical_ids(db, source, [(external_id, symbol, name)])[0]
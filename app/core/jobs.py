@@ -0,0 +1,94 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+from app.core.config import settings
+import logging
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class Job:
+    id: str
+    kind: str
+    status: str = "queued"  # queued -> running -> success | failure
+    rows_read: int = 0
+    rows_written: int = 0
+    created_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    error: Optional[str] = None
+    result: Optional[Dict[str, Any]] = None
+    future: Optional[Future] = field(default=None, repr=False)
+    _started: Optional[float] = field(default=None, repr=False)
+    _finished: Optional[float] = field(default=None, repr=False)
+
+    def progress(self, rows_read: int, rows_written: int):
+        """Adds one batch's counts (rows read, rows inserted or updated); matches `BaseExtractor.progress`."""
+        self.rows_read += rows_read
+        self.rows_written += rows_written
+
+    @property
+    def elapsed_seconds(self) -> float:
+        if self._started is None:
+            return 0.0
+        return (self._finished or time.monotonic()) - self._started
+
+    @property
+    def rows_per_second(self) -> Optional[float]:
+        elapsed = self.elapsed_seconds
+        return self.rows_written / elapsed if elapsed > 0 else None
+
+class JobQueue:
+    """
+    Background work for the API, run on a small resident thread pool so slow
+    ingestion never blocks the event loop. Jobs report progress as they go
+    and the most recent `max_jobs` are kept for polling via `GET /jobs/{id}`.
+    """
+
+    def __init__(self, max_workers: int, max_jobs: int):
+        self.max_jobs = max_jobs
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, fn: Callable[[Job], Optional[Dict[str, Any]]]) -> Job:
+        """Queues `fn(job)`; its return value becomes the job's `result`."""
+        job = Job(id=uuid.uuid4().hex, kind=kind)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._trim()
+        job.future = self._executor.submit(self._run, job, fn)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _trim(self):
+        # Forget the oldest finished jobs first; running ones stay pollable
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.finished_at]:
+            if len(self._jobs) <= self.max_jobs:
+                break
+            del self._jobs[job_id]
+
+    def _run(self, job: Job, fn: Callable[[Job], Optional[Dict[str, Any]]]):
+        job.status = "running"
+        job.started_at = datetime.now(timezone.utc)
+        job._started = time.monotonic()
+        try:
+            job.result = fn(job)
+            job.status = "success"
+        except Exception as e:
+            logger.error(f"Job {job.id} ({job.kind}) failed: {e}")
+            job.status = "failure"
+            job.error = str(e)
+        finally:
+            job._finished = time.monotonic()
+            job.finished_at = datetime.now(timezone.utc)
+
+job_queue = JobQueue(max_workers=settings.JOB_WORKERS, max_jobs=settings.JOB_HISTORY)
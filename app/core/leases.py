@@ -0,0 +1,155 @@
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional
+from app.core.models import ETLLease
+from app.core.upsert import dialect_insert, supports_upsert
+import logging
+import os
+import socket
+import threading
+
+logger = logging.getLogger(__name__)
+
+class LeaseLost(Exception):
+    """The lease expired and another process took it over."""
+
+def holder_id(run_id: str) -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{run_id}"
+
+def try_acquire(db: Session, source: str, holder: str, ttl_seconds: float) -> bool:
+    """
+    Takes `source`'s lease if it is free, released or expired (work stealing).
+    A single conditional UPDATE decides, so two processes can never both win.
+    """
+    if db.get(ETLLease, source) is None:
+        # Another process may create the row first; the UPDATE below still arbitrates
+        if supports_upsert(db):
+            db.execute(dialect_insert(db, ETLLease).values(source=source).on_conflict_do_nothing(index_elements=["source"]))
+        else:
+            try:
+                with db.begin_nested():
+                    db.add(ETLLease(source=source))
+            except IntegrityError:
+                pass
+
+    now = datetime.now(timezone.utc)
+    taken = db.query(ETLLease).filter(
+        ETLLease.source == source,
+        or_(ETLLease.holder.is_(None), ETLLease.holder == holder, ETLLease.expires_at < now)
+    ).update({
+        ETLLease.holder: holder,
+        ETLLease.acquired_at: now,
+        ETLLease.heartbeat_at: now,
+        ETLLease.expires_at: now + timedelta(seconds=ttl_seconds),
+    }, synchronize_session=False)
+    return taken == 1
+
+def renew(db: Session, source: str, holder: str, ttl_seconds: float) -> bool:
+    """Extends the lease; False if `holder` no longer owns it."""
+    now = datetime.now(timezone.utc)
+    renewed = db.query(ETLLease).filter(ETLLease.source == source, ETLLease.holder == holder).update({
+        ETLLease.heartbeat_at: now,
+        ETLLease.expires_at: now + timedelta(seconds=ttl_seconds),
+    }, synchronize_session=False)
+    return renewed == 1
+
+def release(db: Session, source: str, holder: str):
+    db.query(ETLLease).filter(ETLLease.source == source, ETLLease.holder == holder).update({
+        ETLLease.holder: None,
+        ETLLease.expires_at: datetime.now(timezone.utc),
+    }, synchronize_session=False)
+
+class RunLease:
+    """
+    The lease held by one extractor run. A timer thread renews it every
+    `heartbeat_seconds` on its own short-lived sessions, so other processes
+    see the renewal while the run's transaction is still open, and a long
+    extract or transform cannot outlive the TTL. The run calls `check()`
+    between steps to stop once the lease has been taken over.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        source: str,
+        holder: str,
+        ttl_seconds: float,
+        heartbeat_seconds: float
+    ):
+        self.session_factory = session_factory
+        self.source = source
+        self.holder = holder
+        self.ttl_seconds = ttl_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        self.held = False
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _execute(self, fn: Callable, *args):
+        db = self.session_factory()
+        try:
+            result = fn(db, self.source, self.holder, *args)
+            db.commit()
+            return result
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def acquire(self) -> bool:
+        self.held = self._execute(try_acquire, self.ttl_seconds)
+        if self.held:
+            self._thread = threading.Thread(target=self._beat, name=f"lease-{self.source}", daemon=True)
+            self._thread.start()
+        return self.held
+
+    def _beat(self):
+        while not self._stop.wait(self.heartbeat_seconds):
+            try:
+                renewed = self._execute(renew, self.ttl_seconds)
+            except Exception as e:
+                # e.g. a busy database: try again next beat, the TTL leaves room for that
+                logger.warning(f"Failed to renew lease on {self.source}: {e}")
+                continue
+            if not renewed:
+                logger.error(f"Lease on {self.source} was taken over by another process")
+                self.lost = True
+                return
+
+    def check(self):
+        """Raises LeaseLost once the heartbeat found the lease taken over."""
+        if self.lost:
+            raise LeaseLost(f"Lease on {self.source} was taken over by another process")
+
+    def fence(self, db: Session):
+        """
+        Renews the lease inside `db`'s transaction, raising LeaseLost if it was
+        taken over. Called right before a run commits: the lease row stays
+        locked until the commit, so the lease cannot change hands in between.
+        """
+        self.check()
+        if not renew(db, self.source, self.holder, self.ttl_seconds):
+            self.lost = True
+            self.check()
+
+    def _stop_heartbeat(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def release(self):
+        self._stop_heartbeat()
+        if not self.held:
+            return
+        if not self.lost:
+            try:
+                self._execute(release)
+            except Exception as e:
+                # It will simply expire after ttl_seconds
+                logger.error(f"Failed to release lease on {self.source}: {e}")
+        self.held = False
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, JSON, ForeignKey, Float
+from sqlalchemy import Column, Integer, String, DateTime, JSON, ForeignKey, Float, UniqueConstraint, Index, PrimaryKeyConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
@@ -11,24 +11,75 @@ class ETLCheckpoint(Base):
     last_run_id = Column(String)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
+class ETLLease(Base):
+    """Per-source run lease shared by every ETL process; a run holds it until release or expiry."""
+    __tablename__ = "etl_leases"
+    source = Column(String, primary_key=True)
+    holder = Column(String)  # NULL once released
+    acquired_at = Column(DateTime(timezone=True))
+    heartbeat_at = Column(DateTime(timezone=True))
+    expires_at = Column(DateTime(timezone=True))
+
 class ETLRun(Base):
     __tablename__ = "etl_runs"
+    __table_args__ = (
+        # Recent runs of one source: /stats history and the etl_source_status window
+        Index("ix_etl_runs_source_started_at", "source", "started_at"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     run_id = Column(String, unique=True, index=True)
+    batch_id = Column(String, index=True, nullable=True)  # shared by all sources of one runner invocation
     source = Column(String, index=True)
     status = Column(String)  # success, failure
     records_processed = Column(Integer, default=0)
+    # How the run's UnifiedData rows were written
+    records_inserted = Column(Integer, default=0)
+    records_updated = Column(Integer, default=0)
+    records_unchanged = Column(Integer, default=0)
     duration_ms = Column(Float)
     error_message = Column(String, nullable=True)
     started_at = Column(DateTime(timezone=True), server_default=func.now())
     ended_at = Column(DateTime(timezone=True))
 
+class ETLRunSummary(Base):
+    """Single-row running totals over etl_runs, maintained by BaseExtractor.run."""
+    __tablename__ = "etl_run_summary"
+    id = Column(Integer, primary_key=True)  # always SUMMARY_ID
+    total_runs = Column(Integer, nullable=False, default=0)
+    success_runs = Column(Integer, nullable=False, default=0)
+    failure_runs = Column(Integer, nullable=False, default=0)
+    last_run_at = Column(DateTime(timezone=True))
+    last_status = Column(String)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class ETLSourceStatus(Base):
+    """Per-source projection of etl_runs, upserted by BaseExtractor.run; backs GET /stats."""
+    __tablename__ = "etl_source_status"
+    source = Column(String, primary_key=True)
+    last_run_id = Column(String)
+    last_status = Column(String)
+    last_records_processed = Column(Integer, default=0)
+    last_records_inserted = Column(Integer, default=0)
+    last_records_updated = Column(Integer, default=0)
+    last_records_unchanged = Column(Integer, default=0)
+    last_duration_ms = Column(Float)
+    last_error_message = Column(String, nullable=True)
+    last_started_at = Column(DateTime(timezone=True))
+    last_ended_at = Column(DateTime(timezone=True))
+    # Over the last ETL_STATUS_WINDOW finished runs
+    success_rate = Column(Float)
+    p50_duration_ms = Column(Float)
+    p95_duration_ms = Column(Float)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
 class RawData(Base):
     __tablename__ = "raw_data"
+    __table_args__ = (UniqueConstraint("source", "external_id", name="uq_raw_data_source_external_id"),)
     id = Column(Integer, primary_key=True, index=True)
     source = Column(String, index=True)
     external_id = Column(String, index=True)
     content = Column(JSON)
+    content_hash = Column(String(64), nullable=True)
     ingested_at = Column(DateTime(timezone=True), server_default=func.now())
 
 class CanonicalAsset(Base):
@@ -52,6 +103,19 @@ class AssetMapping(Base):
 
 class UnifiedData(Base):
     __tablename__ = "unified_data"
+    __table_args__ = (
+        UniqueConstraint("source", "external_id", name="uq_unified_data_source_external_id"),
+        # Keyset pagination for GET /data: (created_at, id) plus each equality filter
+        Index("ix_unified_data_created_at_id", "created_at", "id"),
+        Index("ix_unified_data_source_created_at_id", "source", "created_at", "id"),
+        Index("ix_unified_data_canonical_id_created_at_id", "canonical_id", "created_at", "id"),
+        # GET /data sort=price|market_cap|rank, with id as the keyset tie-breaker
+        Index("ix_unified_data_price_usd_id", "price_usd", "id"),
+        Index("ix_unified_data_market_cap_id", "market_cap", "id"),
+        Index("ix_unified_data_rank_id", "rank", "id"),
+        # GET /data/export?updated_since: range on updated_at, ordered by (updated_at, id)
+        Index("ix_unified_data_updated_at_id", "updated_at", "id"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     source = Column(String, index=True)
     external_id = Column(String, index=True)
@@ -59,7 +123,57 @@ class UnifiedData(Base):
     title = Column(String, index=True)
     description = Column(String, nullable=True)
     data = Column(JSON)  # Store normalized extra fields like price, etc.
+    content_hash = Column(String(64), nullable=True)  # unified_content_hash of the fields above
+    # Promoted from `data` by the loader for filtering and sorting
+    price_usd = Column(Float, nullable=True)
+    market_cap = Column(Float, nullable=True)
+    rank = Column(Integer, nullable=True)
+    symbol = Column(String, index=True, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
     canonical_asset = relationship("CanonicalAsset", back_populates="unified_data")
+
+class PriceObservation(Base):
+    """Append-only price points, one per (source, asset, timestamp)."""
+    __tablename__ = "price_observations"
+    __table_args__ = (
+        UniqueConstraint("source", "canonical_id", "ts", name="uq_price_observations_source_canonical_id_ts"),
+        Index("ix_price_observations_canonical_id_ts", "canonical_id", "ts"),
+    )
+    id = Column(Integer, primary_key=True)
+    canonical_id = Column(Integer, ForeignKey("canonical_assets.id"), nullable=False)
+    source = Column(String, nullable=False)
+    ts = Column(DateTime(timezone=True), nullable=False)
+    price = Column(Float, nullable=False)
+    market_cap = Column(Float, nullable=True)
+
+class PriceRollup(Base):
+    """OHLC per asset and time bucket across all sources, maintained as observations load."""
+    __tablename__ = "price_rollups"
+    __table_args__ = (PrimaryKeyConstraint("canonical_id", "interval", "bucket_start"),)
+    canonical_id = Column(Integer, ForeignKey("canonical_assets.id"), nullable=False)
+    interval = Column(String(4), nullable=False)  # 1m, 1h, 1d
+    bucket_start = Column(DateTime(timezone=True), nullable=False)
+    open = Column(Float, nullable=False)
+    high = Column(Float, nullable=False)
+    low = Column(Float, nullable=False)
+    close = Column(Float, nullable=False)
+    # Timestamps of the open/close observations, so late points merge in order
+    open_ts = Column(DateTime(timezone=True), nullable=False)
+    close_ts = Column(DateTime(timezone=True), nullable=False)
+    samples = Column(Integer, nullable=False, default=0)
+
+class AssetSnapshot(Base):
+    """Cross-source view of one canonical asset, recomputed for the assets each run touches."""
+    __tablename__ = "asset_snapshots"
+    canonical_id = Column(Integer, ForeignKey("canonical_assets.id"), primary_key=True)
+    prices = Column(JSON)  # {source: {"price": float, "ts": iso timestamp}}, latest per source
+    source_count = Column(Integer, nullable=False, default=0)
+    median_price = Column(Float)
+    min_price = Column(Float)
+    max_price = Column(Float)
+    spread_pct = Column(Float)  # (max - min) / median * 100
+    freshest_at = Column(DateTime(timezone=True))
+    stalest_at = Column(DateTime(timezone=True))
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -0,0 +1,136 @@
+from sqlalchemy import case
+from sqlalchemy.orm import Session
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
+from app.core.models import PriceObservation, PriceRollup
+from app.core.upsert import dialect_insert, in_key_order, supports_upsert
+
+# Rollup interval name -> bucket width in seconds
+ROLLUP_INTERVALS = {"1m": 60, "1h": 3600, "1d": 86400}
+# Conflict keys of the observation and rollup tables
+OBSERVATION_KEY = ["source", "canonical_id", "ts"]
+ROLLUP_KEY = ["canonical_id", "interval", "bucket_start"]
+
+def as_utc(ts: datetime) -> datetime:
+    # SQLite hands timestamps back naive; they were written as UTC
+    return ts.replace(tzinfo=timezone.utc) if ts.tzinfo is None else ts.astimezone(timezone.utc)
+
+def bucket_start(ts: datetime, seconds: int) -> datetime:
+    epoch = int(as_utc(ts).timestamp()) // seconds * seconds
+    return datetime.fromtimestamp(epoch, tz=timezone.utc)
+
+def build_rollups(observations: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """OHLC rows for every (asset, interval, bucket) touched by `observations`."""
+    buckets: Dict[tuple, Dict[str, Any]] = {}
+    for obs in sorted(observations, key=lambda o: as_utc(o["ts"])):
+        ts = as_utc(obs["ts"])
+        price = obs["price"]
+        for interval, seconds in ROLLUP_INTERVALS.items():
+            key = (obs["canonical_id"], interval, bucket_start(ts, seconds))
+            bucket = buckets.get(key)
+            if bucket is None:
+                buckets[key] = {
+                    "canonical_id": key[0],
+                    "interval": interval,
+                    "bucket_start": key[2],
+                    "open": price, "high": price, "low": price, "close": price,
+                    "open_ts": ts, "close_ts": ts,
+                    "samples": 1
+                }
+            else:
+                bucket["high"] = max(bucket["high"], price)
+                bucket["low"] = min(bucket["low"], price)
+                bucket["close"] = price
+                bucket["close_ts"] = ts
+                bucket["samples"] += 1
+    return list(buckets.values())
+
+def _merge_rollup(existing: PriceRollup, rollup: Dict[str, Any]):
+    """ORM counterpart of the ON CONFLICT merge in `_upsert_rollups`."""
+    existing.high = max(existing.high, rollup["high"])
+    existing.low = min(existing.low, rollup["low"])
+    if rollup["open_ts"] < as_utc(existing.open_ts):
+        existing.open, existing.open_ts = rollup["open"], rollup["open_ts"]
+    if rollup["close_ts"] >= as_utc(existing.close_ts):
+        existing.close, existing.close_ts = rollup["close"], rollup["close_ts"]
+    existing.samples += rollup["samples"]
+
+def _upsert_rollups(db: Session, rollups: List[Dict[str, Any]]):
+    # Parallel partition loads upsert overlapping buckets: lock them in key order
+    stmt = dialect_insert(db, PriceRollup).values(in_key_order(rollups, ROLLUP_KEY))
+    current, new = PriceRollup.__table__.c, stmt.excluded
+    earlier = new.open_ts < current.open_ts
+    later = new.close_ts >= current.close_ts
+    stmt = stmt.on_conflict_do_update(
+        index_elements=ROLLUP_KEY,
+        set_={
+            "high": case((new.high > current.high, new.high), else_=current.high),
+            "low": case((new.low < current.low, new.low), else_=current.low),
+            "open": case((earlier, new.open), else_=current.open),
+            "open_ts": case((earlier, new.open_ts), else_=current.open_ts),
+            "close": case((later, new.close), else_=current.close),
+            "close_ts": case((later, new.close_ts), else_=current.close_ts),
+            "samples": current.samples + new.samples,
+        }
+    )
+    db.execute(stmt)
+
+def record_observations(db: Session, observations: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Appends price observations and folds the newly stored ones into the
+    1m/1h/1d rollups. Re-observing a known (source, asset, ts) point is a
+    no-op, so rollups never count a point twice. Returns the stored points.
+    """
+    unique: Dict[tuple, Dict[str, Any]] = {}
+    for obs in observations:
+        obs = {**obs, "ts": as_utc(obs["ts"])}
+        unique[(obs["source"], obs["canonical_id"], obs["ts"])] = obs
+    if not unique:
+        return []
+
+    if supports_upsert(db):
+        stmt = dialect_insert(db, PriceObservation).values(in_key_order(unique.values(), OBSERVATION_KEY)).on_conflict_do_nothing(
+            index_elements=OBSERVATION_KEY
+        ).returning(PriceObservation.canonical_id, PriceObservation.ts, PriceObservation.price)
+        stored = [{"canonical_id": c, "ts": ts, "price": p} for c, ts, p in db.execute(stmt)]
+        rollups = build_rollups(stored)
+        if rollups:
+            _upsert_rollups(db, rollups)
+        return stored
+
+    stored = []
+    for obs in unique.values():
+        exists = db.query(PriceObservation.id).filter(
+            PriceObservation.source == obs["source"],
+            PriceObservation.canonical_id == obs["canonical_id"],
+            PriceObservation.ts == obs["ts"]
+        ).first()
+        if not exists:
+            db.add(PriceObservation(**obs))
+            stored.append(obs)
+    for rollup in build_rollups(stored):
+        existing = db.get(PriceRollup, (rollup["canonical_id"], rollup["interval"], rollup["bucket_start"]))
+        if existing:
+            _merge_rollup(existing, rollup)
+        else:
+            db.add(PriceRollup(**rollup))
+    db.flush()
+    return stored
+
+def get_price_series(
+    db: Session,
+    canonical_id: int,
+    interval: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+) -> List[PriceRollup]:
+    """Rollup buckets of one asset in [start, end), oldest first, via the primary key."""
+    query = db.query(PriceRollup).filter(
+        PriceRollup.canonical_id == canonical_id,
+        PriceRollup.interval == interval
+    )
+    if start:
+        query = query.filter(PriceRollup.bucket_start >= bucket_start(start, ROLLUP_INTERVALS[interval]))
+    if end:
+        query = query.filter(PriceRollup.bucket_start < as_utc(end))
+    return query.order_by(PriceRollup.bucket_start).all()
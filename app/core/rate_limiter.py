@@ -1,32 +1,186 @@
 from fastapi import HTTPException, Request
-from typing import Callable
+from starlette.concurrency import run_in_threadpool
+from typing import Callable, Dict, List, Optional, Tuple
+from app.core.config import settings
+import logging
+import math
+import threading
 import time
-from collections import defaultdict
+
+logger = logging.getLogger(__name__)
+
+class MemoryRateLimitBackend:
+    """
+    Per-process counters: one fixed-size [window, current, previous] entry per
+    client, whatever its request rate. Idle clients are dropped by `evict`.
+    """
+
+    def __init__(self):
+        self._counters: Dict[str, List[int]] = {}
+        self._lock = threading.Lock()
+
+    def _roll(self, key: str, window: int) -> List[int]:
+        entry = self._counters.get(key)
+        if entry is None:
+            entry = self._counters[key] = [window, 0, 0]
+        elif entry[0] != window:
+            # Carry the current count over only if it belongs to the window just before
+            entry[2] = entry[1] if entry[0] == window - 1 else 0
+            entry[1] = 0
+            entry[0] = window
+        return entry
+
+    def acquire(self, key: str, window: int, window_seconds: int) -> Tuple[int, int]:
+        """
+        Counts a request for `key` and returns (previous window count, current
+        window count including it) in one step.
+        """
+        with self._lock:
+            entry = self._roll(key, window)
+            entry[1] += 1
+            return entry[2], entry[1]
+
+    def release(self, key: str, window: int):
+        """Takes back a request `acquire` counted but the limiter rejected."""
+        with self._lock:
+            entry = self._counters.get(key)
+            if entry is not None and entry[0] == window and entry[1] > 0:
+                entry[1] -= 1
+
+    def evict(self, window: int) -> int:
+        """Drops clients with no requests in `window` or the one before it."""
+        with self._lock:
+            idle = [key for key, entry in self._counters.items() if entry[0] < window - 1]
+            for key in idle:
+                del self._counters[key]
+            return len(idle)
+
+    def __len__(self) -> int:
+        return len(self._counters)
+
+class RedisRateLimitBackend:
+    """
+    Counters shared by every API worker in a Redis-compatible store. Each
+    (client, window) counter is its own key and expires on its own, so no
+    eviction pass is needed.
+    """
+
+    # Every call is a network round trip: keep it off the event loop
+    blocking = True
+
+    def __init__(self, client, prefix: str = "kasparro:ratelimit:"):
+        self.client = client
+        self.prefix = prefix
+
+    def _key(self, key: str, window: int) -> str:
+        return f"{self.prefix}{key}:{window}"
+
+    def acquire(self, key: str, window: int, window_seconds: int) -> Tuple[int, int]:
+        # One MULTI/EXEC round trip: concurrent workers each see a distinct count,
+        # so between them they can never let more than the limit through
+        counter = self._key(key, window)
+        pipe = self.client.pipeline(transaction=True)
+        pipe.incr(counter)
+        # Still needed as the "previous" window during the next one
+        pipe.expire(counter, window_seconds * 2)
+        pipe.get(self._key(key, window - 1))
+        current, _, previous = pipe.execute()
+        return int(previous or 0), int(current)
+
+    def release(self, key: str, window: int):
+        self.client.decr(self._key(key, window))
+
+    def evict(self, window: int) -> int:
+        return 0
 
 class RateLimiter:
-    def __init__(self, requests_limit: int, window_seconds: int):
+    """
+    Sliding-window counter: the request rate is estimated from the count in
+    the current fixed window plus the previous window's count weighted by how
+    much of it still overlaps the sliding window. Memory per client is
+    constant, and with a shared backend the limit holds across workers.
+    """
+
+    def __init__(
+        self,
+        requests_limit: int,
+        window_seconds: int,
+        backend=None,
+        sweep_interval_seconds: Optional[float] = None,
+        clock: Callable[[], float] = time.time
+    ):
         self.requests_limit = requests_limit
         self.window_seconds = window_seconds
-        self.client_requests = defaultdict(list)
+        self.backend = backend if backend is not None else MemoryRateLimitBackend()
+        self.sweep_interval_seconds = sweep_interval_seconds or window_seconds
+        self.clock = clock
+        self._next_sweep = clock() + self.sweep_interval_seconds
+
+    def check(self, key: str) -> Tuple[bool, Dict[str, str]]:
+        """Counts a request for `key`; returns (allowed, RateLimit-* headers)."""
+        now = self.clock()
+        window = int(now // self.window_seconds)
+        elapsed = now - window * self.window_seconds
+
+        if now >= self._next_sweep:
+            self._next_sweep = now + self.sweep_interval_seconds
+            evicted = self.backend.evict(window)
+            if evicted:
+                logger.info(f"Rate limiter evicted {evicted} idle clients")
+
+        # Count first, then compare: the check and the increment cannot interleave
+        # with another worker's, and a rejected request gives its slot back
+        previous, current = self.backend.acquire(key, window, self.window_seconds)
+        weight = (self.window_seconds - elapsed) / self.window_seconds
+        estimated = previous * weight + current
+        allowed = estimated <= self.requests_limit
+        if not allowed:
+            self.backend.release(key, window)
+            estimated -= 1
+            current -= 1
+
+        reset = math.ceil(self.window_seconds - elapsed)
+        headers = {
+            "RateLimit-Limit": str(self.requests_limit),
+            "RateLimit-Remaining": str(max(0, int(self.requests_limit - estimated))),
+            "RateLimit-Reset": str(reset),
+        }
+        if not allowed:
+            retry_after = self.window_seconds - elapsed
+            if previous and current + 1 <= self.requests_limit:
+                # Enough of the previous window's weight decays before this window ends
+                retry_after -= (self.requests_limit - current - 1) * self.window_seconds / previous
+            headers["Retry-After"] = str(max(1, math.ceil(retry_after)))
+        return allowed, headers
 
     async def __call__(self, request: Request):
         # Use client IP as identifier
-        client_ip = request.client.host
-        now = time.time()
-        
-        # Filter out requests outside the window
-        self.client_requests[client_ip] = [
-            t for t in self.client_requests[client_ip]
-            if now - t < self.window_seconds
-        ]
-        
-        if len(self.client_requests[client_ip]) >= self.requests_limit:
+        if getattr(self.backend, "blocking", False):
+            # A shared backend (Redis) would stall every other request on the loop
+            allowed, headers = await run_in_threadpool(self.check, request.client.host)
+        else:
+            allowed, headers = self.check(request.client.host)
+        # Picked up by the HTTP middleware, as endpoints may return their own Response
+        request.state.rate_limit_headers = headers
+
+        if not allowed:
             raise HTTPException(
                 status_code=429,
-                detail="Too many requests. Please try again later."
+                detail="Too many requests. Please try again later.",
+                headers=headers
             )
-        
-        self.client_requests[client_ip].append(now)
 
-# Example: 60 requests per minute
-rate_limiter = RateLimiter(requests_limit=60, window_seconds=60)
+def get_rate_limit_backend():
+    if settings.RATE_LIMIT_REDIS_URL:
+        try:
+            import redis
+            return RedisRateLimitBackend(redis.Redis.from_url(settings.RATE_LIMIT_REDIS_URL))
+        except ImportError:
+            logger.warning("RATE_LIMIT_REDIS_URL is set but redis is not installed; limits are per process")
+    return MemoryRateLimitBackend()
+
+rate_limiter = RateLimiter(
+    requests_limit=settings.RATE_LIMIT_REQUESTS,
+    window_seconds=settings.RATE_LIMIT_WINDOW_SECONDS,
+    backend=get_rate_limit_backend()
+)
@@ -0,0 +1,97 @@
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from typing import List, Optional, Sequence
+from app.core.config import settings
+from app.core.models import ETLRun, ETLRunSummary, ETLSourceStatus
+from app.core.upsert import bulk_upsert, supports_upsert
+import math
+
+# Primary key of the single etl_run_summary row
+SUMMARY_ID = 1
+
+def _ensure_summary(db: Session):
+    if supports_upsert(db):
+        # Concurrent first runs may race to create the row
+        bulk_upsert(
+            db, ETLRunSummary,
+            [{"id": SUMMARY_ID, "total_runs": 0, "success_runs": 0, "failure_runs": 0}],
+            index_elements=["id"]
+        )
+    elif db.get(ETLRunSummary, SUMMARY_ID) is None:
+        db.add(ETLRunSummary(id=SUMMARY_ID, total_runs=0, success_runs=0, failure_runs=0))
+        db.flush()
+
+def percentile(values: Sequence[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile (q in 0..100) of `values`."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+def recent_runs(db: Session, source: str, limit: int) -> List[ETLRun]:
+    """Newest runs of `source` first, served by the (source, started_at) index."""
+    return db.query(ETLRun).filter(ETLRun.source == source).order_by(
+        ETLRun.started_at.desc(), ETLRun.id.desc()
+    ).limit(limit).all()
+
+def update_source_status(db: Session, etl_run: ETLRun):
+    """Upserts the etl_source_status row of `etl_run`'s source."""
+    window = [
+        run for run in recent_runs(db, etl_run.source, settings.ETL_STATUS_WINDOW)
+        if run.status in ("success", "failure")
+    ]
+    durations = [run.duration_ms for run in window if run.duration_ms is not None]
+    row = {
+        "source": etl_run.source,
+        "last_run_id": etl_run.run_id,
+        "last_status": etl_run.status,
+        "last_records_processed": etl_run.records_processed or 0,
+        "last_records_inserted": etl_run.records_inserted or 0,
+        "last_records_updated": etl_run.records_updated or 0,
+        "last_records_unchanged": etl_run.records_unchanged or 0,
+        "last_duration_ms": etl_run.duration_ms,
+        "last_error_message": etl_run.error_message,
+        "last_started_at": etl_run.started_at,
+        "last_ended_at": etl_run.ended_at,
+        "success_rate": sum(run.status == "success" for run in window) / len(window) if window else None,
+        "p50_duration_ms": percentile(durations, 50),
+        "p95_duration_ms": percentile(durations, 95),
+    }
+
+    if supports_upsert(db):
+        bulk_upsert(db, ETLSourceStatus, [row], index_elements=["source"], update_columns=[k for k in row if k != "source"])
+    else:
+        db.merge(ETLSourceStatus(**row))
+
+def record_run(db: Session, etl_run: ETLRun):
+    """
+    Folds a finished run into the summary counters and its source's status
+    row, in the caller's transaction. Counters are incremented in SQL so
+    concurrent sources never lose an update.
+    """
+    # The run's final state must be visible to the status window below
+    db.flush()
+    update_source_status(db, etl_run)
+
+    _ensure_summary(db)
+    db.execute(
+        update(ETLRunSummary)
+        .where(ETLRunSummary.id == SUMMARY_ID)
+        .values(
+            total_runs=ETLRunSummary.total_runs + 1,
+            success_runs=ETLRunSummary.success_runs + (1 if etl_run.status == "success" else 0),
+            failure_runs=ETLRunSummary.failure_runs + (1 if etl_run.status == "failure" else 0),
+            last_run_at=etl_run.ended_at,
+            last_status=etl_run.status
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+def committed_runs(db: Session) -> int:
+    """Runs committed so far, across all processes; the response cache keys on it."""
+    return db.query(ETLRunSummary.total_runs).filter(ETLRunSummary.id == SUMMARY_ID).scalar() or 0
+
+def get_summary(db: Session) -> ETLRunSummary:
+    """The summary row, or an empty one if no run has finished yet."""
+    summary = db.get(ETLRunSummary, SUMMARY_ID)
+    return summary or ETLRunSummary(id=SUMMARY_ID, total_runs=0, success_runs=0, failure_runs=0)
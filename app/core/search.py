@@ -0,0 +1,155 @@
+from sqlalchemy import func, literal_column
+from sqlalchemy.orm import Query, Session
+from app.core.models import UnifiedData
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from datetime import timedelta
+from typing import Dict, List, Optional, Set, Tuple
+import re
+import threading
+
+# Title matches count double: they carry the asset name and symbol
+TITLE_WEIGHT = 2
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Lowercase word tokens, matching Postgres' 'simple' text search config."""
+    return re.findall(r"[^\W_]+", (text or "").lower())
+
+class InvertedIndex:
+    """
+    In-process inverted index over UnifiedData.title/description, used where
+    the database has no full-text search (SQLite dev and test runs).
+
+    The index is refreshed lazily: rows past the last seen id, or whose
+    `updated_at` is at or past the last seen watermark, are re-indexed, and a
+    shrinking row count (deletes, rolled-back inserts) triggers a full rebuild.
+    """
+
+    def __init__(self):
+        self._postings: Dict[str, Dict[int, int]] = defaultdict(dict)
+        self._doc_terms: Dict[int, Counter] = {}
+        self._vocabulary: List[str] = []
+        self._watermark = None
+        self._max_id = 0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def clear(self):
+        """Forget everything; the next search rebuilds from the database."""
+        with self._lock:
+            self._postings.clear()
+            self._doc_terms.clear()
+            self._vocabulary = []
+            self._watermark = None
+            self._max_id = 0
+            self._count = 0
+
+    def _remove(self, doc_id: int):
+        for term in self._doc_terms.pop(doc_id, {}):
+            postings = self._postings[term]
+            postings.pop(doc_id, None)
+            if not postings:
+                del self._postings[term]
+
+    def _add(self, doc_id: int, title: Optional[str], description: Optional[str]):
+        terms = Counter()
+        for token in tokenize(title):
+            terms[token] += TITLE_WEIGHT
+        for token in tokenize(description):
+            terms[token] += 1
+        self._doc_terms[doc_id] = terms
+        for term, weight in terms.items():
+            self._postings[term][doc_id] = weight
+
+    def refresh(self, db: Session):
+        count, max_id, watermark = db.query(
+            func.count(UnifiedData.id), func.max(UnifiedData.id), func.max(UnifiedData.updated_at)
+        ).one()
+        if count == self._count and max_id == self._max_id and watermark == self._watermark:
+            return
+
+        rows = db.query(UnifiedData.id, UnifiedData.title, UnifiedData.description)
+        if count >= self._count and self._watermark is not None:
+            # Timestamps may only have one-second resolution (SQLite's CURRENT_TIMESTAMP)
+            rows = rows.filter(
+                (UnifiedData.id > self._max_id) | (UnifiedData.updated_at >= self._watermark - timedelta(seconds=1))
+            )
+        else:
+            self._postings.clear()
+            self._doc_terms.clear()
+
+        for doc_id, title, description in rows.yield_per(1000):
+            self._remove(doc_id)
+            self._add(doc_id, title, description)
+
+        self._vocabulary = sorted(self._postings)
+        self._count = count
+        self._max_id = max_id or 0
+        self._watermark = watermark
+        if len(self._doc_terms) != count:
+            # Drifted (e.g. ids reused after a rollback): rebuild next time
+            self._count = -1
+            self._watermark = None
+
+    def _expand(self, prefix: str) -> List[str]:
+        start = bisect_left(self._vocabulary, prefix)
+        terms = []
+        for term in self._vocabulary[start:]:
+            if not term.startswith(prefix):
+                break
+            terms.append(term)
+        return terms
+
+    def search(self, db: Session, text: str) -> List[Tuple[int, int]]:
+        """
+        Returns (doc_id, score) pairs, best first. Every query token must match
+        a document term by prefix; scores sum the weights of matched terms.
+        """
+        tokens = tokenize(text)
+        if not tokens:
+            return []
+
+        with self._lock:
+            self.refresh(db)
+            scores: Optional[Dict[int, int]] = None
+            for token in tokens:
+                matches: Dict[int, int] = defaultdict(int)
+                for term in self._expand(token):
+                    for doc_id, weight in self._postings[term].items():
+                        matches[doc_id] += weight
+                if scores is None:
+                    scores = dict(matches)
+                else:
+                    scores = {doc_id: score + matches[doc_id] for doc_id, score in scores.items() if doc_id in matches}
+                if not scores:
+                    return []
+
+        return sorted(scores.items(), key=lambda item: (-item[1], -item[0]))
+
+search_index = InvertedIndex()
+
+def supports_full_text(db: Session) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
+def apply_full_text(query: Query, text: str) -> Query:
+    """
+    Postgres: filter on the GIN-indexed `search_vector` column with a prefix
+    tsquery (every token must match) and order by ts_rank.
+    """
+    tokens = tokenize(text)
+    if not tokens:
+        return query.filter(False)
+    tsquery = func.to_tsquery("simple", " & ".join(f"{token}:*" for token in tokens))
+    vector = literal_column("unified_data.search_vector")
+    return query.filter(vector.op("@@")(tsquery)).order_by(func.ts_rank(vector, tsquery).desc())
+
+def ranked_ids(db: Session, query: Query, text: str) -> List[int]:
+    """In-process fallback: ids matching `text`, best first, restricted to `query`'s filters."""
+    ranked = search_index.search(db, text)
+    allowed: Set[int] = set()
+    ids = [doc_id for doc_id, _ in ranked]
+    for i in range(0, len(ids), 500):
+        allowed.update(row_id for (row_id,) in query.with_entities(UnifiedData.id).filter(
+            UnifiedData.id.in_(ids[i:i + 500])
+        ))
+    return [doc_id for doc_id in ids if doc_id in allowed]
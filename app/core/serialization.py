@@ -0,0 +1,35 @@
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+from typing import Any, Dict, Iterable, List, Sequence
+import json
+import logging
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+def _default(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    return jsonable_encoder(value)
+
+def dumps(value: Any) -> str:
+    """
+    Compact JSON for response bodies. Plain dicts/lists of column values are
+    encoded by orjson in one pass; pydantic models and other types still go
+    through FastAPI's encoder. UTC datetimes end in `Z`, as pydantic writes them.
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(value, default=_default, option=orjson.OPT_UTC_Z).decode()
+        except orjson.JSONEncodeError as e:
+            # e.g. integers beyond 64 bits in a JSON column
+            logger.debug(f"orjson could not encode payload, using json: {e}")
+    return json.dumps(jsonable_encoder(value), separators=(",", ":"))
+
+def as_dicts(fields: Sequence[str], rows: Iterable[tuple]) -> List[Dict[str, Any]]:
+    """Selected column tuples as JSON-ready dicts, skipping per-row model validation."""
+    return [dict(zip(fields, row)) for row in rows]
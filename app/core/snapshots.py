@@ -0,0 +1,75 @@
+from sqlalchemy import func, tuple_
+from sqlalchemy.orm import Session
+from statistics import median
+from typing import Any, Dict, Iterable, List
+from app.core.models import AssetSnapshot, PriceObservation
+from app.core.prices import as_utc
+from app.core.upsert import bulk_upsert, supports_upsert
+
+# Canonical ids per IN (...) list
+_IN_CLAUSE_SIZE = 500
+
+def latest_prices(db: Session, canonical_ids: List[int]) -> Dict[int, Dict[str, Dict[str, Any]]]:
+    """{canonical_id: {source: {"price", "ts"}}} from each source's newest observation."""
+    latest = db.query(
+        PriceObservation.canonical_id,
+        PriceObservation.source,
+        func.max(PriceObservation.ts).label("ts")
+    ).filter(PriceObservation.canonical_id.in_(canonical_ids)).group_by(
+        PriceObservation.canonical_id, PriceObservation.source
+    ).subquery()
+
+    rows = db.query(
+        PriceObservation.canonical_id, PriceObservation.source, PriceObservation.ts, PriceObservation.price
+    ).filter(
+        PriceObservation.canonical_id.in_(canonical_ids),
+        tuple_(PriceObservation.canonical_id, PriceObservation.source, PriceObservation.ts).in_(
+            db.query(latest.c.canonical_id, latest.c.source, latest.c.ts)
+        )
+    )
+
+    prices: Dict[int, Dict[str, Dict[str, Any]]] = {}
+    for canonical_id, source, ts, price in rows:
+        prices.setdefault(canonical_id, {})[source] = {"price": price, "ts": as_utc(ts)}
+    return prices
+
+def build_snapshot(canonical_id: int, by_source: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    values = [quote["price"] for quote in by_source.values()]
+    timestamps = [quote["ts"] for quote in by_source.values()]
+    mid = median(values)
+    return {
+        "canonical_id": canonical_id,
+        "prices": {source: {"price": q["price"], "ts": q["ts"].isoformat()} for source, q in sorted(by_source.items())},
+        "source_count": len(values),
+        "median_price": mid,
+        "min_price": min(values),
+        "max_price": max(values),
+        "spread_pct": (max(values) - min(values)) / mid * 100 if mid else None,
+        "freshest_at": max(timestamps),
+        "stalest_at": min(timestamps),
+    }
+
+def refresh_snapshots(db: Session, canonical_ids: Iterable[int]) -> int:
+    """
+    Recomputes the AssetSnapshot rows of `canonical_ids` only, from the newest
+    price observation of every source. Returns the number of snapshots written.
+    """
+    ids = sorted(set(canonical_ids))
+    written = 0
+    for i in range(0, len(ids), _IN_CLAUSE_SIZE):
+        prices = latest_prices(db, ids[i:i + _IN_CLAUSE_SIZE])
+        snapshots = [build_snapshot(canonical_id, by_source) for canonical_id, by_source in prices.items()]
+        if not snapshots:
+            continue
+        if supports_upsert(db):
+            bulk_upsert(
+                db, AssetSnapshot, snapshots,
+                index_elements=["canonical_id"],
+                update_columns=[column for column in snapshots[0] if column != "canonical_id"]
+            )
+        else:
+            for snapshot in snapshots:
+                db.merge(AssetSnapshot(**snapshot))
+            db.flush()
+        written += len(snapshots)
+    return written
@@ -0,0 +1,64 @@
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects import postgresql, sqlite
+
+# Dialects that support INSERT ... ON CONFLICT natively
+_DIALECT_INSERTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+def supports_upsert(db: Session) -> bool:
+    """Return True if the session's bind supports INSERT ... ON CONFLICT."""
+    return db.get_bind().dialect.name in _DIALECT_INSERTS
+
+def dialect_insert(db: Session, model):
+    """The dialect's `insert(model)`, exposing `on_conflict_do_*` and `excluded`."""
+    return _DIALECT_INSERTS[db.get_bind().dialect.name](model)
+
+def in_key_order(rows: Iterable[Dict[str, Any]], index_elements: Iterable[str]) -> List[Dict[str, Any]]:
+    """
+    `rows` sorted by their conflict key. Concurrent transactions that upsert
+    overlapping rows lock them in the same order, so they cannot deadlock.
+    """
+    keys = list(index_elements)
+    return sorted(rows, key=lambda row: tuple(row[key] for key in keys))
+
+def bulk_upsert(
+    db: Session,
+    model,
+    rows: Sequence[Dict[str, Any]],
+    index_elements: Iterable[str],
+    update_columns: Optional[Iterable[str]] = None,
+    unless_equal: Optional[str] = None,
+) -> None:
+    """
+    Writes `rows` into `model`'s table with a single multi-row
+    INSERT ... ON CONFLICT statement, in conflict-key order.
+
+    If `update_columns` is empty the conflicting rows are left untouched
+    (DO NOTHING), otherwise those columns are overwritten with the incoming
+    values. Columns declaring an `onupdate` (e.g. `updated_at`) are bumped too,
+    since SQLAlchemy does not apply them to ON CONFLICT updates. With
+    `unless_equal` (e.g. "content_hash") a conflicting row whose stored value
+    of that column already matches is not rewritten at all.
+    """
+    if not rows:
+        return
+
+    index_elements = list(index_elements)
+    stmt = dialect_insert(db, model).values(in_key_order(rows, index_elements))
+
+    if update_columns:
+        set_ = {col: stmt.excluded[col] for col in update_columns}
+        for column in model.__table__.columns:
+            if column.onupdate is not None and column.name not in set_:
+                set_[column.name] = column.onupdate.arg
+        where = None
+        if unless_equal:
+            where = model.__table__.c[unless_equal].is_distinct_from(stmt.excluded[unless_equal])
+        stmt = stmt.on_conflict_do_update(index_elements=index_elements, set_=set_, where=where)
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=index_elements)
+
+    db.execute(stmt)
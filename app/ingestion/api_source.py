@@ -1,39 +1,82 @@
-import requests
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 from datetime import datetime, timezone
+from itertools import islice
 from app.ingestion.base import BaseExtractor
+from app.ingestion.http_client import FetchResult, http_client
 from app.schemas.data import UnifiedDataCreate
 from app.core.config import settings
 from app.core.identity import resolve_canonical_id
+import logging
 
-class CoinPaprikaExtractor(BaseExtractor):
-    def __init__(self, db, run_id: Optional[str] = None):
-        super().__init__(source_name="coinpaprika_crypto", db=db, run_id=run_id)
+logger = logging.getLogger(__name__)
+
+class APIExtractor(BaseExtractor):
+    """Base for HTTP JSON sources: pooled, retried, conditional GETs via the shared client."""
+
+    # extract() only talks to the HTTP client; `_fetched` is read after the run
+    pipeline_safe = True
+
+    def __init__(self, source_name: str, db, run_id: Optional[str] = None, batch_id: Optional[str] = None):
+        super().__init__(source_name=source_name, db=db, run_id=run_id, batch_id=batch_id)
+        self._fetched: List[FetchResult] = []
+
+    def fetch_json(self, url: str, params: Optional[Dict[str, Any]] = None, headers: Optional[Dict[str, str]] = None) -> Optional[Any]:
+        """Returns the decoded body, or None if the upstream answered 304 Not Modified."""
+        result = http_client.fetch(url, params=params, headers=headers, conditional=True)
+        if result.not_modified:
+            logger.info(f"{self.source_name}: {url} not modified, skipping")
+            return None
+        self._fetched.append(result)
+        return result.data
+
+    def fetch_pages(
+        self,
+        url: str,
+        pages: List[Dict[str, Any]],
+        rate_per_second: Optional[float] = None
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """Fetches every page concurrently, yielding each page's records as it arrives."""
+        requests = [(url, params) for params in pages]
+        for result in http_client.fetch_many(requests, conditional=True, rate_per_second=rate_per_second):
+            if result.not_modified:
+                logger.info(f"{self.source_name}: {result.cache_key} not modified, skipping")
+                continue
+            self._fetched.append(result)
+            yield result.data
+
+    def on_success(self):
+        # Only trust validators once the data behind them has been committed
+        for result in self._fetched:
+            http_client.remember(result)
+        self._fetched = []
+
+class CoinPaprikaExtractor(APIExtractor):
+    def __init__(self, db, run_id: Optional[str] = None, batch_id: Optional[str] = None):
+        super().__init__(source_name="coinpaprika_crypto", db=db, run_id=run_id, batch_id=batch_id)
         self.base_url = "https://api.coinpaprika.com/v1/tickers"
+        self.top_n = settings.API_TOP_N
 
-    def extract(self, last_checkpoint: Optional[datetime]) -> List[Dict[str, Any]]:
+    def extract(self, last_checkpoint: Optional[datetime]) -> Iterator[Dict[str, Any]]:
         headers = {}
         if settings.COINPAPRIKA_API_KEY:
             headers["Authorization"] = settings.COINPAPRIKA_API_KEY
         
-        response = requests.get(self.base_url, headers=headers)
-        response.raise_for_status()
-        
-        data = response.json()
-        # Take top 50 for performance
-        return data[:50]
+        # /tickers takes no limit or paging parameter, so the top N cannot be requested
+        # on their own. One conditional request (usually a 304) returns every coin in
+        # rank order, trimmed to the USD quote; only the first top_n are passed on
+        data = self.fetch_json(self.base_url, params={"quotes": "USD"}, headers=headers)
+        if data is None:
+            return
+        yield from islice(data, self.top_n)
+
+    def asset_identity(self, raw_data: Dict[str, Any]) -> Tuple[str, str, str]:
+        return raw_data['id'], raw_data['symbol'], raw_data['name']
 
     def transform(self, raw_data: Dict[str, Any]) -> UnifiedDataCreate:
         # CoinPaprika format: {id, name, symbol, last_updated, quotes: {USD: {price, ...}}}
         quotes = raw_data.get('quotes', {}).get('USD', {})
         
-        canonical_id = resolve_canonical_id(
-            db=self.db,
-            source=self.source_name,
-            external_id=raw_data['id'],
-            symbol=raw_data['symbol'],
-            name=raw_data['name']
-        )
+        canonical_id = resolve_canonical_id(self.db, self.source_name, *self.asset_identity(raw_data))
         
         return UnifiedDataCreate(
             source=self.source_name,
@@ -45,38 +88,46 @@ class CoinPaprikaExtractor(BaseExtractor):
                 "price_usd": quotes.get('price'),
                 "symbol": raw_data['symbol'],
                 "rank": raw_data['rank'],
+                "market_cap": quotes.get('market_cap'),
                 "last_updated": raw_data['last_updated']
             }
         )
 
-class CoinGeckoExtractor(BaseExtractor):
-    def __init__(self, db, run_id: Optional[str] = None):
-        super().__init__(source_name="coingecko_crypto", db=db, run_id=run_id)
+class CoinGeckoExtractor(APIExtractor):
+    def __init__(self, db, run_id: Optional[str] = None, batch_id: Optional[str] = None):
+        super().__init__(source_name="coingecko_crypto", db=db, run_id=run_id, batch_id=batch_id)
         self.base_url = "https://api.coingecko.com/api/v3/coins/markets"
+        self.top_n = settings.API_TOP_N
+        self.page_size = settings.COINGECKO_PAGE_SIZE
+        self.rate_per_second = settings.COINGECKO_RATE_PER_SECOND
 
-    def extract(self, last_checkpoint: Optional[datetime]) -> List[Dict[str, Any]]:
-        params = {
-            "vs_currency": "usd",
-            "order": "market_cap_desc",
-            "per_page": 50,
-            "page": 1,
-            "sparkline": False
-        }
-        
-        response = requests.get(self.base_url, params=params)
-        response.raise_for_status()
-        
-        return response.json()
+    def extract(self, last_checkpoint: Optional[datetime]) -> Iterator[Dict[str, Any]]:
+        per_page = min(self.page_size, self.top_n)
+        page_count = -(-self.top_n // per_page)
+        pages = [
+            {
+                "vs_currency": "usd",
+                "order": "market_cap_desc",
+                "per_page": per_page,
+                "page": page,
+                "sparkline": False
+            }
+            for page in range(1, page_count + 1)
+        ]
+
+        # Pages arrive in completion order; stream each one straight to the loader
+        for records in self.fetch_pages(self.base_url, pages, rate_per_second=self.rate_per_second):
+            for record in records:
+                rank = record.get('market_cap_rank')
+                if rank is None or rank <= self.top_n:
+                    yield record
+
+    def asset_identity(self, raw_data: Dict[str, Any]) -> Tuple[str, str, str]:
+        return raw_data['id'], raw_data['symbol'], raw_data['name']
 
     def transform(self, raw_data: Dict[str, Any]) -> UnifiedDataCreate:
         # CoinGecko format: {id, symbol, name, current_price, market_cap, last_updated, ...}
-        canonical_id = resolve_canonical_id(
-            db=self.db,
-            source=self.source_name,
-            external_id=raw_data['id'],
-            symbol=raw_data['symbol'],
-            name=raw_data['name']
-        )
+        canonical_id = resolve_canonical_id(self.db, self.source_name, *self.asset_identity(raw_data))
         
         return UnifiedDataCreate(
             source=self.source_name,
@@ -88,6 +139,7 @@ class CoinGeckoExtractor(BaseExtractor):
                 "price_usd": raw_data['current_price'],
                 "symbol": raw_data['symbol'].upper(),
                 "market_cap": raw_data['market_cap'],
+                "rank": raw_data.get('market_cap_rank'),
                 "last_updated": raw_data['last_updated']
             }
         )
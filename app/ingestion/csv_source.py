@@ -1,55 +1,212 @@
 import pandas as pd
-from typing import List, Dict, Any, Optional
-from datetime import datetime
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
+from datetime import datetime, timezone
 from app.ingestion.base import BaseExtractor
 from app.schemas.data import UnifiedDataCreate
-from app.core.identity import resolve_canonical_id
+from app.core.config import settings
+from app.core.identity import resolve_canonical_id, resolve_canonical_ids
 import os
+import uuid
+
+# Declared up front so pandas skips type inference on the known columns;
+# created_at is parsed explicitly per chunk
+CSV_DTYPES = {
+    'id': str,
+    'symbol': str,
+    'name': str,
+    'price': 'float64',
+    'created_at': str,
+}
+
+def unified_frame(df: pd.DataFrame, source_name: str) -> Tuple[pd.DataFrame, List[Tuple[str, str, str]]]:
+    """
+    Column-wise version of `CSVExtractor.transform`, minus the database:
+    UnifiedData columns without canonical ids, plus each row's
+    (external_id, symbol, name).
+    """
+    default = lambda value: pd.Series(value, index=df.index)
+    symbol = df['symbol'] if 'symbol' in df.columns else default('UNKNOWN')
+    name = df['name'] if 'name' in df.columns else symbol
+    external_id = df['id'].astype(str) if 'id' in df.columns else symbol.astype(str)
+    price = df['price'] if 'price' in df.columns else default(0)
+    created_at = df['created_at'].astype(str) if 'created_at' in df.columns else default('')
+
+    data = [
+        {"price": p, "symbol": s, "original_created_at": c}
+        for p, s, c in zip(price.astype('float64').tolist(), symbol.tolist(), created_at.tolist())
+    ]
+
+    unified = pd.DataFrame({
+        "source": source_name,
+        "external_id": "csv_" + external_id,
+        "title": name.astype(str) + " (" + symbol.astype(str) + ")",
+        "description": "CSV Price: " + price.astype(str),
+        "data": data
+    }, index=df.index)
+    return unified, list(zip(external_id, symbol, name))
+
+def stage_chunk(
+    df: pd.DataFrame,
+    source_name: str,
+    strict: bool = False
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], List[Tuple[str, str, str]], Optional[datetime], Optional[datetime]]:
+    """
+    Stages one CSV chunk without touching the database: (raw_rows,
+    unified_rows, identities, earliest, latest created_at). Unified rows lack
+    `canonical_id`; `identities` lines up with them for resolution.
+    """
+    unified, identities = unified_frame(df, source_name)
+    unified["identity"] = identities
+    # Last copy of a duplicated id wins, as in the per-record path
+    unified = unified.drop_duplicates(subset="external_id", keep="last")
+    identities = unified.pop("identity").tolist()
+    unified_rows = unified.to_dict('records')
+    if strict:
+        unified_rows = [UnifiedDataCreate(**row).model_dump(exclude={"canonical_id"}) for row in unified_rows]
+
+    if 'id' in df.columns:
+        raw_ids = df['id'].astype(str).tolist()
+    else:
+        raw_ids = [str(uuid.uuid4()) for _ in range(len(df))]
+    raw_batch: Dict[str, Dict[str, Any]] = {}
+    for external_id, content in zip(raw_ids, df.to_dict('records')):
+        raw_batch.setdefault(external_id, {
+            "source": source_name,
+            "external_id": external_id,
+            "content": content
+        })
+
+    earliest_timestamp = latest_timestamp = None
+    if 'created_at' in df.columns:
+        created_at = pd.to_datetime(df['created_at'], utc=True, errors='coerce')
+        if not pd.isna(created_at.max()):
+            earliest_timestamp = created_at.min().to_pydatetime()
+            latest_timestamp = created_at.max().to_pydatetime()
+
+    return list(raw_batch.values()), unified_rows, identities, earliest_timestamp, latest_timestamp
+
+class PreparedChunk:
+    """A CSV chunk already run through `stage_chunk`, waiting for canonical ids."""
+
+    def __init__(self, rows: int, staged: Tuple):
+        self.rows = rows
+        self.staged = staged
+
+    def __len__(self) -> int:
+        return self.rows
+
+class CSVChunkReader:
+    """
+    Lazy result of `CSVExtractor.extract`: iterates as plain records, and also
+    exposes the underlying pandas chunks for the vectorized path.
+    """
+
+    def __init__(self, extractor: "CSVExtractor", last_checkpoint: Optional[datetime]):
+        self.extractor = extractor
+        self.last_checkpoint = last_checkpoint
+
+    def frames(self) -> Iterator[pd.DataFrame]:
+        return self.extractor.read_chunks(self.last_checkpoint)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        frames = self.frames()
+        try:
+            for chunk in frames:
+                yield from chunk.to_dict('records')
+        finally:
+            frames.close()
 
 class CSVExtractor(BaseExtractor):
-    def __init__(self, db, file_path: str, run_id: Optional[str] = None):
-        super().__init__(source_name="csv_crypto", db=db, run_id=run_id)
+    # extract() only reads the file; the pandas staging in prepare_batch is database-free too
+    pipeline_safe = True
+
+    def __init__(self, db, file_path: str, run_id: Optional[str] = None, batch_id: Optional[str] = None):
+        super().__init__(source_name="csv_crypto", db=db, run_id=run_id, batch_id=batch_id)
         self.file_path = file_path
+        self.chunk_size = settings.CSV_CHUNK_SIZE
+        self.vectorized = settings.CSV_VECTORIZED_TRANSFORM
+        self.strict = settings.ETL_STRICT_VALIDATION
 
-    def extract(self, last_checkpoint: Optional[datetime]) -> List[Dict[str, Any]]:
+    def read_chunks(self, last_checkpoint: Optional[datetime]) -> Iterator[pd.DataFrame]:
+        """
+        Reads the file `chunk_size` rows at a time with explicit dtypes, keeping
+        only rows newer than the checkpoint, so memory stays flat with file size.
+        """
         if not os.path.exists(self.file_path):
-            return []
-        
-        df = pd.read_csv(self.file_path)
-        # Convert created_at to datetime (aware) for filtering
-        if 'created_at' in df.columns:
-            df['created_at'] = pd.to_datetime(df['created_at'], utc=True)
-            
-            if last_checkpoint:
-                from datetime import timezone
-                if last_checkpoint.tzinfo is None:
-                    last_checkpoint = last_checkpoint.replace(tzinfo=timezone.utc)
-                
-                # Convert to pandas Timestamp for reliable comparison with datetime64[ns, UTC]
-                ts_checkpoint = pd.Timestamp(last_checkpoint)
-                # Filter for records newer than the checkpoint
-                df = df[df['created_at'] > ts_checkpoint]
-        
-        # Convert all timestamps to ISO strings before to_dict
-        for col in df.columns:
-            if pd.api.types.is_datetime64_any_dtype(df[col]):
-                df[col] = df[col].dt.strftime('%Y-%m-%dT%H:%M:%SZ')
-        
-        return df.to_dict('records')
+            return
 
-    def transform(self, raw_data: Dict[str, Any]) -> UnifiedDataCreate:
+        ts_checkpoint = None
+        if last_checkpoint:
+            if last_checkpoint.tzinfo is None:
+                last_checkpoint = last_checkpoint.replace(tzinfo=timezone.utc)
+            # Convert to pandas Timestamp for reliable comparison with datetime64[ns, UTC]
+            ts_checkpoint = pd.Timestamp(last_checkpoint)
+
+        # Closing the generator early (a failed run) closes the file with it
+        with pd.read_csv(self.file_path, dtype=CSV_DTYPES, chunksize=self.chunk_size) as reader:
+            for chunk in reader:
+                # Convert created_at to datetime (aware) for filtering
+                if 'created_at' in chunk.columns:
+                    created_at = pd.to_datetime(chunk['created_at'], utc=True)
+                    if ts_checkpoint is not None:
+                        # Filter for records newer than the checkpoint
+                        keep = created_at > ts_checkpoint
+                        chunk = chunk[keep]
+                        created_at = created_at[keep]
+                    # Normalise to ISO strings so records stay JSON-serialisable
+                    chunk = chunk.assign(created_at=created_at.dt.strftime('%Y-%m-%dT%H:%M:%SZ'))
+
+                if not chunk.empty:
+                    yield chunk
+
+    def extract(self, last_checkpoint: Optional[datetime]) -> "CSVChunkReader":
+        return CSVChunkReader(self, last_checkpoint)
+
+    def extract_batches(self, raw_records: Iterable[Any]) -> Iterator[Any]:
+        # Keep whole pandas chunks together so they can be transformed column-wise
+        if self.vectorized and isinstance(raw_records, CSVChunkReader):
+            return raw_records.frames()
+        return super().extract_batches(raw_records)
+
+    def prepare_batch(self, batch):
+        # The pandas work needs no database, so it runs on the pipeline's transform thread
+        if isinstance(batch, pd.DataFrame):
+            return PreparedChunk(len(batch), stage_chunk(batch, self.source_name, self.strict))
+        return batch
+
+    def stage_batch(self, batch):
+        if isinstance(batch, PreparedChunk):
+            return self.resolve_chunk(batch.staged)
+        if isinstance(batch, pd.DataFrame):
+            return self.stage_frame(batch)
+        return super().stage_batch(batch)
+
+    def stage_frame(self, df: pd.DataFrame) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], Optional[datetime]]:
+        """Vectorized counterpart of `BaseExtractor.stage_batch` for one CSV chunk."""
+        return self.resolve_chunk(stage_chunk(df, self.source_name, self.strict))
+
+    def resolve_chunk(self, staged: Tuple) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], Optional[datetime]]:
+        """Adds canonical ids to a `stage_chunk` result; the only step that needs the database."""
+        raw_rows, unified_rows, identities, _, latest_timestamp = staged
+        canonical_ids = resolve_canonical_ids(self.db, self.source_name, identities)
+        for row, canonical_id in zip(unified_rows, canonical_ids):
+            row["canonical_id"] = canonical_id
+        return raw_rows, unified_rows, latest_timestamp
+
+    def partition_stager(self):
+        # Whole chunks are pure pandas work, so they can be staged in worker processes
+        return (stage_chunk, (self.source_name, self.strict)) if self.vectorized else None
+
+    def asset_identity(self, raw_data: Dict[str, Any]) -> Tuple[str, str, str]:
         # Expected CSV columns: id, symbol, name, price, created_at
         symbol = raw_data.get('symbol', 'UNKNOWN')
         name = raw_data.get('name', symbol)
         external_id = str(raw_data.get('id', symbol))
-        
-        canonical_id = resolve_canonical_id(
-            db=self.db,
-            source=self.source_name,
-            external_id=external_id,
-            symbol=symbol,
-            name=name
-        )
+        return external_id, symbol, name
+
+    def transform(self, raw_data: Dict[str, Any]) -> UnifiedDataCreate:
+        external_id, symbol, name = self.asset_identity(raw_data)
+        canonical_id = resolve_canonical_id(self.db, self.source_name, external_id, symbol, name)
         
         return UnifiedDataCreate(
             source=self.source_name,
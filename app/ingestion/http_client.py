@@ -0,0 +1,200 @@
+import asyncio
+import concurrent.futures
+import logging
+import random
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlencode, urlsplit
+import httpx
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Statuses worth retrying: throttling and transient upstream failures
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+@dataclass
+class FetchResult:
+    status_code: int
+    data: Any = None
+    cache_key: Optional[str] = None
+    validators: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def not_modified(self) -> bool:
+        return self.status_code == 304
+
+class AsyncHTTPClient:
+    """
+    Shared HTTP client for API sources.
+
+    A single `httpx.AsyncClient` (keep-alive pool) lives on a dedicated event
+    loop thread, so every extractor and every run reuses the same connections
+    and the per-host concurrency cap holds across concurrently running sources.
+    Sync callers use `fetch()`; async callers can `await get_json()` on `loop`.
+    """
+
+    def __init__(
+        self,
+        timeout: float,
+        max_retries: int,
+        backoff_base: float,
+        max_connections: int,
+        per_host_limit: int,
+        max_backoff: float = 30.0
+    ):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.max_backoff = max_backoff
+        self.max_connections = max_connections
+        self.per_host_limit = per_host_limit
+        # Conditional GET validators (ETag / Last-Modified) per request key
+        self.validators: Dict[str, Dict[str, str]] = {}
+        self._client: Optional[httpx.AsyncClient] = None
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+        self._next_slot: Dict[str, float] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="http-client", daemon=True).start()
+            return self._loop
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections
+                )
+            )
+        return self._client
+
+    def _host_limit(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc
+        if host not in self._host_limits:
+            self._host_limits[host] = asyncio.Semaphore(self.per_host_limit)
+        return self._host_limits[host]
+
+    async def _pace(self, url: str, rate_per_second: Optional[float]):
+        """Space requests to one host at most `rate_per_second` apart."""
+        if not rate_per_second:
+            return
+        host = urlsplit(url).netloc
+        now = asyncio.get_running_loop().time()
+        slot = max(now, self._next_slot.get(host, now))
+        self._next_slot[host] = slot + 1 / rate_per_second
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    @staticmethod
+    def cache_key(url: str, params: Optional[Dict[str, Any]] = None) -> str:
+        return f"{url}?{urlencode(sorted((params or {}).items()))}"
+
+    def _backoff(self, attempt: int, response: Optional[httpx.Response]) -> float:
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            # A misbehaving upstream must not park a run for hours
+            return min(float(retry_after), self.max_backoff)
+        # Full jitter keeps concurrent callers from retrying in lockstep
+        return random.uniform(0, min(self.backoff_base * (2 ** attempt), self.max_backoff))
+
+    async def get_json(
+        self,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        conditional: bool = False,
+        rate_per_second: Optional[float] = None
+    ) -> FetchResult:
+        """
+        GET `url` and decode the JSON body, retrying transient failures.
+
+        With `conditional=True` the stored validators are sent as
+        If-None-Match / If-Modified-Since; a 304 comes back as a FetchResult
+        with `not_modified` set and no data. New validators are returned on the
+        result but only stored once the caller calls `remember()`.
+        `rate_per_second` paces every attempt against the host's request budget.
+        """
+        key = self.cache_key(url, params)
+        headers = dict(headers or {})
+        if conditional:
+            known = self.validators.get(key, {})
+            if "etag" in known:
+                headers["If-None-Match"] = known["etag"]
+            if "last_modified" in known:
+                headers["If-Modified-Since"] = known["last_modified"]
+
+        client = self._get_client()
+        attempt = 0
+        while True:
+            response = None
+            try:
+                await self._pace(url, rate_per_second)
+                async with self._host_limit(url):
+                    response = await client.get(url, params=params, headers=headers)
+                if response.status_code not in RETRY_STATUSES:
+                    break
+            except httpx.TransportError:
+                if attempt >= self.max_retries:
+                    raise
+            if attempt >= self.max_retries:
+                break
+            delay = self._backoff(attempt, response)
+            logger.warning(f"Retrying {url} in {delay:.2f}s (attempt {attempt + 1}/{self.max_retries})")
+            await asyncio.sleep(delay)
+            attempt += 1
+
+        if response.status_code == 304:
+            return FetchResult(status_code=304, cache_key=key, validators=self.validators.get(key, {}))
+
+        response.raise_for_status()
+
+        validators = {}
+        if response.headers.get("ETag"):
+            validators["etag"] = response.headers["ETag"]
+        if response.headers.get("Last-Modified"):
+            validators["last_modified"] = response.headers["Last-Modified"]
+
+        return FetchResult(status_code=response.status_code, data=response.json(), cache_key=key, validators=validators)
+
+    def fetch(self, url: str, **kwargs) -> FetchResult:
+        """Blocking wrapper around `get_json` for synchronous extractors."""
+        return asyncio.run_coroutine_threadsafe(self.get_json(url, **kwargs), self.loop).result()
+
+    def fetch_many(self, requests: List[Tuple[str, Optional[Dict[str, Any]]]], **kwargs) -> Iterator[FetchResult]:
+        """
+        Issue every (url, params) request concurrently and yield results as they
+        complete, so callers can process early pages while later ones are in flight.
+        """
+        futures = [
+            asyncio.run_coroutine_threadsafe(self.get_json(url, params=params, **kwargs), self.loop)
+            for url, params in requests
+        ]
+        try:
+            for future in concurrent.futures.as_completed(futures):
+                yield future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def remember(self, result: FetchResult):
+        """Store a response's validators so the next conditional GET can return 304."""
+        if result.cache_key and result.validators:
+            self.validators[result.cache_key] = result.validators
+
+http_client = AsyncHTTPClient(
+    timeout=settings.HTTP_TIMEOUT_SECONDS,
+    max_retries=settings.HTTP_MAX_RETRIES,
+    backoff_base=settings.HTTP_BACKOFF_BASE_SECONDS,
+    max_connections=settings.HTTP_MAX_CONNECTIONS,
+    per_host_limit=settings.HTTP_PER_HOST_CONCURRENCY,
+    max_backoff=settings.HTTP_MAX_BACKOFF_SECONDS
+)
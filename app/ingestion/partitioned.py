@@ -0,0 +1,199 @@
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set, Tuple
+from sqlalchemy.orm import sessionmaker
+from app.core.config import settings
+from app.core.identity import resolve_canonical_ids
+from app.core.prices import as_utc
+from app.core.snapshots import refresh_snapshots
+from app.core.upsert import supports_upsert
+from app.ingestion.pipeline import as_iterable
+import copy
+import logging
+import multiprocessing
+
+logger = logging.getLogger(__name__)
+
+class PartitionError(Exception):
+    """Some partitions of a run failed; the others stay committed."""
+
+@dataclass
+class StagedPartition:
+    index: int
+    rows_read: int
+    raw_rows: List[Dict[str, Any]]
+    unified_rows: List[Dict[str, Any]]
+    earliest: Optional[datetime]
+    latest: Optional[datetime]
+
+@dataclass
+class PartitionResult:
+    index: int
+    rows_read: int = 0
+    earliest: Optional[datetime] = None
+    latest: Optional[datetime] = None
+    counts: Tuple[int, int, int] = (0, 0, 0)
+    touched_canonical_ids: Set[int] = field(default_factory=set)
+    error: Optional[str] = None
+
+@dataclass
+class PartitionedRun:
+    results: List[PartitionResult] = field(default_factory=list)
+    watermark: Optional[datetime] = None
+
+    @property
+    def committed(self) -> List[PartitionResult]:
+        return [result for result in self.results if result.error is None]
+
+    @property
+    def failed(self) -> List[PartitionResult]:
+        return [result for result in self.results if result.error is not None]
+
+    @property
+    def records_processed(self) -> int:
+        return sum(result.rows_read for result in self.committed)
+
+    def counts(self) -> Tuple[int, int, int]:
+        """(inserted, updated, unchanged) over committed partitions."""
+        return tuple(sum(result.counts[i] for result in self.committed) for i in range(3))
+
+    def raise_for_failures(self):
+        failed = sorted(self.failed, key=lambda result: result.index)
+        if failed:
+            raise PartitionError(
+                f"{len(failed)} of {len(self.results)} partitions failed "
+                f"(first: partition {failed[0].index}: {failed[0].error})"
+            )
+
+def committed_watermark(results: List[PartitionResult], previous: Optional[datetime]) -> Optional[datetime]:
+    """
+    The checkpoint a partitioned run may advance to: the newest committed
+    timestamp, but kept below the earliest timestamp of any failed partition
+    so its rows are read again next run. Never moves backwards.
+    """
+    failed = [result for result in results if result.error is not None]
+    if any(result.earliest is None for result in failed):
+        # Nothing is known about what the failed partition held
+        return previous
+
+    candidate = max((result.latest for result in results if result.error is None and result.latest), default=None)
+    if candidate and failed:
+        candidate = min(candidate, min(result.earliest for result in failed) - timedelta(microseconds=1))
+    if candidate is None or (previous is not None and candidate <= previous):
+        return previous
+    return candidate
+
+def load_partition(extractor, session_factory, partition: StagedPartition, bulk_load: bool) -> PartitionResult:
+    """Loads and commits one staged partition on its own connection."""
+    result = PartitionResult(partition.index, partition.rows_read, partition.earliest, partition.latest)
+    db = session_factory()
+    # Same loader methods and settings, bound to this partition's session
+    loader = copy.copy(extractor)
+    loader.db = db
+    loader.touched_canonical_ids = set()
+    try:
+        if bulk_load:
+            result.counts = loader.load_batch(partition.raw_rows, partition.unified_rows)
+        else:
+            result.counts = loader.load_rows(partition.raw_rows, partition.unified_rows)
+        loader.load_prices(partition.unified_rows)
+        if extractor.lease:
+            # Each partition commits on its own: fence every commit, not just the run's last
+            extractor.lease.fence(db)
+        db.commit()
+        result.touched_canonical_ids = loader.touched_canonical_ids
+    except Exception as e:
+        db.rollback()
+        logger.error(f"{extractor.source_name} partition {partition.index} failed to load: {e}")
+        result.error = str(e)
+    finally:
+        db.close()
+    return result
+
+def run_partitions(extractor, run_id: str) -> PartitionedRun:
+    """
+    Partitioned mode of `BaseExtractor.run` for sources with a
+    `partition_stager`. Every batch from `extract_batches` is one partition:
+
+    1. staged (transformed) in a pool of `ETL_PARTITION_WORKERS` processes;
+    2. given canonical ids on the run's session, which is the only writer of
+       new assets, and committed;
+    3. loaded and committed on one of `ETL_LOAD_WORKERS` connections.
+
+    At most twice the worker count of partitions is in flight per stage, so
+    memory stays bounded. Partitions commit independently. The checkpoint
+    then advances once, to `committed_watermark`.
+    """
+    db = extractor.db
+    previous = extractor.get_checkpoint()
+    previous = as_utc(previous) if previous else None
+    stager, stager_args = extractor.partition_stager()
+    bulk_load = extractor.bulk_load and supports_upsert(db)
+    session_factory = sessionmaker(bind=db.get_bind())
+    transform_workers = settings.ETL_PARTITION_WORKERS
+    load_workers = settings.ETL_LOAD_WORKERS
+
+    run = PartitionedRun()
+    staging: deque = deque()
+    loading: deque = deque()
+
+    def check_lease():
+        # Raises LeaseLost once the heartbeat or a partition's fence found the lease taken over
+        if extractor.lease:
+            extractor.lease.check()
+
+    def finish_load(future: Future):
+        result = future.result()
+        run.results.append(result)
+        check_lease()
+        if result.error is None:
+            extractor.touched_canonical_ids.update(result.touched_canonical_ids)
+            if extractor.progress:
+                extractor.progress(result.rows_read, result.counts[0] + result.counts[1])
+
+    def dispatch(index: int, rows_read: int, future: Future):
+        check_lease()
+        try:
+            raw_rows, unified_rows, identities, earliest, latest = future.result()
+            canonical_ids = resolve_canonical_ids(db, extractor.source_name, identities)
+            # Loaders reference the new assets from other connections
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"{extractor.source_name} partition {index} failed to stage: {e}")
+            run.results.append(PartitionResult(index, rows_read, error=str(e)))
+            return
+        for row, canonical_id in zip(unified_rows, canonical_ids):
+            row["canonical_id"] = canonical_id
+
+        partition = StagedPartition(index, rows_read, raw_rows, unified_rows, earliest, latest)
+        loading.append(load_pool.submit(load_partition, extractor, session_factory, partition, bulk_load))
+        while len(loading) > load_workers * 2:
+            finish_load(loading.popleft())
+
+    # Spawned workers: forking a process that runs threads can inherit held locks
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=transform_workers, mp_context=context) as transform_pool, \
+            ThreadPoolExecutor(max_workers=load_workers, thread_name_prefix=f"load-{extractor.source_name}") as load_pool:
+        raw_records = as_iterable(extractor.extract(previous))
+        for index, batch in enumerate(extractor.extract_batches(raw_records)):
+            staging.append((index, len(batch), transform_pool.submit(stager, batch, *stager_args)))
+            while len(staging) > transform_workers * 2:
+                dispatch(*staging.popleft())
+            check_lease()
+        while staging:
+            dispatch(*staging.popleft())
+        while loading:
+            finish_load(loading.popleft())
+
+    run.results.sort(key=lambda result: result.index)
+    refresh_snapshots(db, extractor.touched_canonical_ids)
+    run.watermark = committed_watermark(run.results, previous)
+    if run.watermark and run.watermark != previous:
+        extractor.update_checkpoint_internal(run.watermark, run_id)
+    if extractor.lease:
+        extractor.lease.fence(db)
+    db.commit()
+    return run
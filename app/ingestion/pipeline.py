@@ -0,0 +1,198 @@
+from dataclasses import dataclass
+from typing import Any, AsyncIterable, Callable, Dict, Iterable, Iterator, Optional
+from prometheus_client import Gauge, Histogram
+import asyncio
+import logging
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+STAGE_SECONDS = Histogram(
+    "etl_stage_seconds",
+    "Time spent on one batch in an ETL pipeline stage",
+    ["source", "stage"]
+)
+QUEUE_DEPTH = Gauge(
+    "etl_pipeline_queue_depth",
+    "Batches waiting in front of an ETL pipeline stage",
+    ["source", "stage"]
+)
+
+# End-of-stream marker passed down the queues
+_DONE = object()
+
+def iterate_async(records: AsyncIterable[Any]) -> Iterator[Any]:
+    """Drains an async iterator from sync code, on a private event loop in the calling thread."""
+    loop = asyncio.new_event_loop()
+    iterator = records.__aiter__()
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(iterator.__anext__())
+            except StopAsyncIteration:
+                return
+    finally:
+        try:
+            if hasattr(iterator, "aclose"):
+                # Abandoned early: run the async generator's cleanup on its own loop
+                loop.run_until_complete(iterator.aclose())
+        finally:
+            loop.close()
+
+def close_iterator(iterator: Any):
+    """
+    Closes a partly consumed generator right away, so its `finally` blocks
+    (open files, in-flight requests) run now rather than whenever it is
+    garbage collected. Anything without `close()` is left alone.
+    """
+    close = getattr(iterator, "close", None)
+    if close is not None:
+        close()
+
+def as_iterable(records: Any) -> Iterable[Any]:
+    """Accepts whatever `extract()` returned: a list, a generator or an async iterator."""
+    return iterate_async(records) if hasattr(records, "__aiter__") else records
+
+@dataclass
+class StageStats:
+    items: int = 0
+    busy_seconds: float = 0.0  # doing the stage's own work
+    wait_seconds: float = 0.0  # blocked on an empty input or a full output queue
+    max_queue_depth: int = 0  # deepest its input queue got
+
+class _Stopped(Exception):
+    pass
+
+class Pipeline:
+    """
+    Runs extract -> transform -> load as three stages joined by queues of
+    `queue_size` batches. Extract and transform each get a thread; load runs
+    in the calling thread, which owns the database session, so neither of
+    the other stages may touch it. A full queue
+    blocks the stage before it, so a fast source cannot run ahead of the
+    database by more than a few batches, and network or file I/O overlaps
+    with writes.
+
+    The first error in any stage stops the others and is re-raised here;
+    the batch iterator is closed either way.
+    """
+
+    def __init__(self, source: str, queue_size: int):
+        self.source = source
+        self.queue_size = max(1, queue_size)
+        self.stats: Dict[str, StageStats] = {name: StageStats() for name in ("extract", "transform", "load")}
+        self._stop = threading.Event()
+        self._error: Optional[BaseException] = None
+
+    def _put(self, stage: str, out: queue.Queue, item: Any):
+        start = time.perf_counter()
+        while True:
+            if self._stop.is_set():
+                raise _Stopped()
+            try:
+                out.put(item, timeout=0.1)
+                break
+            except queue.Full:
+                continue
+        self.stats[stage].wait_seconds += time.perf_counter() - start
+
+    def _get(self, stage: str, inbox: queue.Queue) -> Any:
+        start = time.perf_counter()
+        stats = self.stats[stage]
+        depth = inbox.qsize()
+        stats.max_queue_depth = max(stats.max_queue_depth, depth)
+        QUEUE_DEPTH.labels(source=self.source, stage=stage).set(depth)
+        while True:
+            if self._stop.is_set():
+                raise _Stopped()
+            try:
+                item = inbox.get(timeout=0.1)
+                break
+            except queue.Empty:
+                continue
+        stats.wait_seconds += time.perf_counter() - start
+        return item
+
+    def _record(self, stage: str, elapsed: float):
+        self.stats[stage].busy_seconds += elapsed
+        self.stats[stage].items += 1
+        STAGE_SECONDS.labels(source=self.source, stage=stage).observe(elapsed)
+
+    def _timed(self, stage: str, fn: Callable, batch: Any) -> Any:
+        start = time.perf_counter()
+        result = fn(batch)
+        self._record(stage, time.perf_counter() - start)
+        return result
+
+    def _fail(self, error: BaseException):
+        if self._error is None:
+            self._error = error
+        self._stop.set()
+
+    def _extract(self, iterator: Iterator[Any], out: queue.Queue):
+        try:
+            while True:
+                # Pulling the next batch is where the source does its I/O
+                start = time.perf_counter()
+                batch = next(iterator, _DONE)
+                if batch is _DONE:
+                    break
+                self._record("extract", time.perf_counter() - start)
+                self._put("extract", out, batch)
+            self._put("extract", out, _DONE)
+        except _Stopped:
+            pass
+        except BaseException as e:
+            self._fail(e)
+
+    def _transform(self, transform: Callable, inbox: queue.Queue, out: queue.Queue):
+        try:
+            while True:
+                batch = self._get("transform", inbox)
+                if batch is _DONE:
+                    break
+                self._put("transform", out, self._timed("transform", transform, batch))
+            self._put("transform", out, _DONE)
+        except _Stopped:
+            pass
+        except BaseException as e:
+            self._fail(e)
+
+    def run(self, batches: Iterable[Any], transform: Callable[[Any], Any], load: Callable[[Any], None]) -> Dict[str, StageStats]:
+        extracted: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        transformed: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        iterator = iter(batches)
+        threads = [
+            threading.Thread(target=self._extract, args=(iterator, extracted), name=f"extract-{self.source}", daemon=True),
+            threading.Thread(target=self._transform, args=(transform, extracted, transformed), name=f"transform-{self.source}", daemon=True),
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            while True:
+                batch = self._get("load", transformed)
+                if batch is _DONE:
+                    break
+                self._timed("load", load, batch)
+        except _Stopped:
+            pass
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            self._stop.set()
+            for thread in threads:
+                thread.join()
+            # The extract thread has let go of it; a stopped run leaves it half consumed
+            close_iterator(iterator)
+            for stage in self.stats:
+                QUEUE_DEPTH.labels(source=self.source, stage=stage).set(0)
+
+        if self._error is not None:
+            raise self._error
+        logger.info(f"{self.source} pipeline: " + ", ".join(
+            f"{stage} {stats.items} batches {stats.busy_seconds * 1000:.0f}ms busy {stats.wait_seconds * 1000:.0f}ms waiting"
+            for stage, stats in self.stats.items()
+        ))
+        return self.stats
@@ -6,8 +6,8 @@ from app.schemas.data import UnifiedDataCreate
 import time
 
 class RSSExtractor(BaseExtractor):
-    def __init__(self, db, feed_url: str, run_id: Optional[str] = None):
-        super().__init__(source_name="rss_news", db=db, run_id=run_id)
+    def __init__(self, db, feed_url: str, run_id: Optional[str] = None, batch_id: Optional[str] = None):
+        super().__init__(source_name="rss_news", db=db, run_id=run_id, batch_id=batch_id)
         self.feed_url = feed_url
 
     def extract(self, last_checkpoint: Optional[datetime]) -> List[Dict[str, Any]]:
@@ -1,43 +1,86 @@
+from app.core.config import settings
 from app.core.database import SessionLocal
 from app.ingestion.csv_source import CSVExtractor
 from app.ingestion.api_source import CoinPaprikaExtractor, CoinGeckoExtractor
 from app.ingestion.rss_source import RSSExtractor
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, List, Optional, Tuple
 import uuid
 import logging
 import os
+import time
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def run_etl():
+RSS_URL = "https://news.google.com/rss?hl=en-US&gl=US&ceid=US:en"
+
+def get_sources() -> List[Tuple[str, Callable]]:
+    """
+    Returns (label, factory) pairs for every active source. Each factory builds
+    an extractor from a session and the batch id shared by this invocation.
+    """
+    csv_path = os.path.join("data", "products.csv")
+    return [
+        ("CSV", lambda db, batch_run_id: CSVExtractor(db, csv_path, run_id=f"{batch_run_id}_csv", batch_id=batch_run_id)),
+        ("CoinPaprika", lambda db, batch_run_id: CoinPaprikaExtractor(db, run_id=f"{batch_run_id}_cp", batch_id=batch_run_id)),
+        ("CoinGecko", lambda db, batch_run_id: CoinGeckoExtractor(db, run_id=f"{batch_run_id}_cg", batch_id=batch_run_id)),
+        ("RSS", lambda db, batch_run_id: RSSExtractor(db, RSS_URL, run_id=f"{batch_run_id}_rss", batch_id=batch_run_id)),
+    ]
+
+def run_source(label: str, factory: Callable, batch_run_id: str, session_factory: Callable = SessionLocal):
+    """Runs one source on its own session so it can execute alongside the others."""
+    db = session_factory()
+    try:
+        logger.info(f"Starting {label} Ingestion (Run: {batch_run_id})...")
+        factory(db, batch_run_id).run()
+        logger.info(f"{label} Ingestion completed.")
+    finally:
+        db.close()
+
+def run_etl_concurrent(
+    sources: Optional[List[Tuple[str, Callable]]] = None,
+    max_workers: Optional[int] = None,
+    session_factory: Callable = SessionLocal,
+    batch_run_id: Optional[str] = None
+) -> str:
+    """
+    Runs every source concurrently on a thread pool, one session per source.
+    A failing source is logged and does not stop the others.
+    """
+    sources = sources if sources is not None else get_sources()
+    max_workers = max_workers or settings.ETL_MAX_WORKERS
+    batch_run_id = batch_run_id or str(uuid.uuid4())
+    start_time = time.time()
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="etl") as pool:
+        futures = {
+            pool.submit(run_source, label, factory, batch_run_id, session_factory): label
+            for label, factory in sources
+        }
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                logger.error(f"{futures[future]} Ingestion failed: {e}")
+
+    logger.info(f"ETL batch {batch_run_id} finished in {(time.time() - start_time) * 1000:.0f}ms")
+    return batch_run_id
+
+def run_etl(concurrent: Optional[bool] = None):
+    if concurrent is None:
+        concurrent = settings.ETL_CONCURRENT
+    if concurrent:
+        run_etl_concurrent()
+        return
+
     db = SessionLocal()
     batch_run_id = str(uuid.uuid4())
     try:
-        # 1. CSV Extraction
-        logger.info(f"Starting CSV Ingestion (Run: {batch_run_id})...")
-        csv_path = os.path.join("data", "products.csv")
-        csv_extractor = CSVExtractor(db, csv_path, run_id=f"{batch_run_id}_csv")
-        csv_extractor.run()
-        logger.info("CSV Ingestion completed.")
-
-        # 2. CoinPaprika Extraction
-        logger.info(f"Starting CoinPaprika Ingestion (Run: {batch_run_id})...")
-        cp_extractor = CoinPaprikaExtractor(db, run_id=f"{batch_run_id}_cp")
-        cp_extractor.run()
-        logger.info("CoinPaprika Ingestion completed.")
-
-        # 3. CoinGecko Extraction
-        logger.info(f"Starting CoinGecko Ingestion (Run: {batch_run_id})...")
-        cg_extractor = CoinGeckoExtractor(db, run_id=f"{batch_run_id}_cg")
-        cg_extractor.run()
-        logger.info("CoinGecko Ingestion completed.")
-
-        # 4. RSS Extraction
-        logger.info(f"Starting RSS Ingestion (Run: {batch_run_id})...")
-        rss_url = "https://news.google.com/rss?hl=en-US&gl=US&ceid=US:en"
-        rss_extractor = RSSExtractor(db, rss_url, run_id=f"{batch_run_id}_rss")
-        rss_extractor.run()
-        logger.info("RSS Ingestion completed.")
+        for label, factory in get_sources():
+            logger.info(f"Starting {label} Ingestion (Run: {batch_run_id})...")
+            factory(db, batch_run_id).run()
+            logger.info(f"{label} Ingestion completed.")
 
     except Exception as e:
         logger.error(f"ETL failed: {e}")
@@ -0,0 +1,147 @@
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.ingestion.runner import get_sources, run_source
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import logging
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+class ETLScheduler:
+    """
+    Resident ETL scheduler: runs sources on a persistent worker pool, so runs
+    reuse the process's imports, HTTP client and database pool instead of
+    starting a new interpreter each time.
+
+    Each source runs at most once at a time. Triggering a source that is
+    already queued or running is coalesced into that run. When started, a
+    ticker thread also triggers every source on its own interval.
+    """
+
+    def __init__(
+        self,
+        sources: Optional[List[Tuple[str, Callable]]] = None,
+        intervals: Optional[Dict[str, float]] = None,
+        max_workers: Optional[int] = None,
+        session_factory: Callable = SessionLocal,
+        tick_seconds: float = 1.0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.sources = dict(sources if sources is not None else get_sources())
+        self.intervals = intervals if intervals is not None else settings.ETL_SOURCE_INTERVALS
+        self.max_workers = max_workers or settings.ETL_MAX_WORKERS
+        self.session_factory = session_factory
+        self.tick_seconds = tick_seconds
+        self.clock = clock
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._inflight: Dict[str, Future] = {}
+        self._source_locks = {label: threading.Lock() for label in self.sources}
+        self._next_due: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        # Created on first use, so importing the API never spawns threads
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="etl")
+        return self._executor
+
+    def trigger(self, labels: Optional[Iterable[str]] = None) -> Dict[str, str]:
+        """
+        Queues a run of each source in `labels` (default: all). Returns each
+        source's outcome: "queued", or "coalesced" into a run already pending.
+        """
+        labels = list(labels) if labels is not None else list(self.sources)
+        unknown = [label for label in labels if label not in self.sources]
+        if unknown:
+            raise KeyError(f"Unknown sources: {', '.join(unknown)}")
+
+        batch_run_id = str(uuid.uuid4())
+        outcome = {}
+        with self._lock:
+            for label in labels:
+                if label in self._inflight:
+                    outcome[label] = "coalesced"
+                    continue
+                self._inflight[label] = self.executor.submit(self._run, label, batch_run_id)
+                outcome[label] = "queued"
+        return outcome
+
+    def _run(self, label: str, batch_run_id: str):
+        lock = self._source_locks[label]
+        if not lock.acquire(blocking=False):
+            logger.info(f"{label} is already running; skipping")
+            return
+        try:
+            run_source(label, self.sources[label], batch_run_id, self.session_factory)
+        except Exception as e:
+            logger.error(f"{label} Ingestion failed: {e}")
+        finally:
+            lock.release()
+            with self._lock:
+                self._inflight.pop(label, None)
+
+    def running(self) -> List[str]:
+        with self._lock:
+            return sorted(self._inflight)
+
+    def wait(self, timeout: Optional[float] = None):
+        """Blocks until every queued or running source has finished."""
+        with self._lock:
+            futures = list(self._inflight.values())
+        for future in futures:
+            future.result(timeout=timeout)
+
+    def tick(self) -> List[str]:
+        """Triggers the sources whose interval has elapsed; returns their labels."""
+        now = self.clock()
+        due = [
+            label for label, interval in self.intervals.items()
+            if label in self.sources and interval and now >= self._next_due.get(label, 0)
+        ]
+        for label in due:
+            self._next_due[label] = now + self.intervals[label]
+        if due:
+            self.trigger(due)
+        return due
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="etl-scheduler", daemon=True)
+        self._thread.start()
+        logger.info(f"ETL scheduler started with intervals {self.intervals}")
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.tick()
+            except Exception as e:
+                logger.error(f"ETL scheduler tick failed: {e}")
+            self._stop.wait(self.tick_seconds)
+
+    def stop(self, wait: bool = False):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+etl_scheduler = ETLScheduler()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    etl_scheduler.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        etl_scheduler.stop(wait=True)
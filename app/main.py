@@ -3,6 +3,8 @@ from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse, Response
 from app.core.config import settings
 from app.api.endpoints import router as api_router
+from app.ingestion.scheduler import etl_scheduler
+from contextlib import asynccontextmanager
 import os
 import time
 from prometheus_client import Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST, REGISTRY
@@ -44,10 +46,19 @@ def get_metrics():
 
 REQUEST_COUNT, REQUEST_LATENCY = get_metrics()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Periodic runs are opt-in here: with several uvicorn workers, prefer the etl service
+    if settings.ETL_SCHEDULER_ENABLED:
+        etl_scheduler.start()
+    yield
+    etl_scheduler.stop()
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
     version=settings.VERSION,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    lifespan=lifespan,
 )
 
 # Mount static files
@@ -71,6 +82,10 @@ async def prometheus_middleware(request: Request, call_next):
     # Add latency metadata to response headers as required in P0.2
     response.headers["X-Request-ID"] = request.headers.get("X-Request-ID", "unknown")
     response.headers["X-API-Latency-MS"] = str(int(duration * 1000))
+
+    # RateLimit-* headers recorded by the rate limiter dependency
+    for name, value in getattr(request.state, "rate_limit_headers", {}).items():
+        response.headers.setdefault(name, value)
     
     return response
 
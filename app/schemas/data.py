@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, ConfigDict
-from typing import Optional, Any, Dict
+from typing import Optional, Any, Dict, List
 from datetime import datetime
 
 class RawDataCreate(BaseModel):
@@ -18,8 +18,30 @@ class UnifiedDataCreate(BaseModel):
 class UnifiedDataRead(UnifiedDataCreate):
     id: int
     canonical_id: Optional[int] = None
+    price_usd: Optional[float] = None
+    market_cap: Optional[float] = None
+    rank: Optional[int] = None
+    symbol: Optional[str] = None
     created_at: datetime
     updated_at: datetime
+    # GET /data: pass back as `cursor` to continue after this row
+    cursor: Optional[str] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+class SourcePrice(BaseModel):
+    price: float
+    ts: datetime
+
+class AssetSnapshotRead(BaseModel):
+    prices: Dict[str, SourcePrice]
+    source_count: int
+    median_price: Optional[float] = None
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    spread_pct: Optional[float] = None
+    freshest_at: Optional[datetime] = None
+    stalest_at: Optional[datetime] = None
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -28,6 +50,30 @@ class CanonicalAssetRead(BaseModel):
     symbol: str
     name: str
     created_at: datetime
+    snapshot: Optional[AssetSnapshotRead] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+class PricePoint(BaseModel):
+    bucket_start: datetime
+    open: float
+    high: float
+    low: float
+    close: float
+    samples: int
+
+    model_config = ConfigDict(from_attributes=True)
+
+class ETLRunHistory(BaseModel):
+    run_id: str
+    status: str
+    records_processed: Optional[int] = None
+    records_inserted: Optional[int] = None
+    records_updated: Optional[int] = None
+    records_unchanged: Optional[int] = None
+    duration_ms: Optional[float] = None
+    started_at: Optional[datetime] = None
+    ended_at: Optional[datetime] = None
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -38,6 +84,13 @@ class ETLStats(BaseModel):
     duration_ms: float
     last_run_at: Optional[datetime]
     error_message: Optional[str] = None
+    records_inserted: Optional[int] = None
+    records_updated: Optional[int] = None
+    records_unchanged: Optional[int] = None
+    success_rate: Optional[float] = None
+    p50_duration_ms: Optional[float] = None
+    p95_duration_ms: Optional[float] = None
+    history: Optional[List[ETLRunHistory]] = None
 
 class HealthStatus(BaseModel):
     db_connected: bool
@@ -45,3 +98,19 @@ class HealthStatus(BaseModel):
     total_runs: int
     success_runs: int
     status: str
+
+class JobStatus(BaseModel):
+    id: str
+    kind: str
+    status: str
+    rows_read: int
+    rows_written: int
+    rows_per_second: Optional[float] = None
+    elapsed_seconds: float
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    error: Optional[str] = None
+    result: Optional[Dict[str, Any]] = None
+
+    model_config = ConfigDict(from_attributes=True)
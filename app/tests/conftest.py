@@ -1,10 +1,15 @@
 import pytest
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
-from app.core.database import Base, get_db
+from app.core.database import Base, get_db, get_read_db
+from app.core.cache import response_cache
+from app.core.identity import identity_cache
+from app.core.search import search_index
 from app.main import app
 from fastapi.testclient import TestClient
 import os
+import threading
+import time
 
 # Use a separate test database or an in-memory one
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
@@ -12,6 +17,66 @@ SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
 engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+class FakeRedis:
+    """Minimal stand-in for a redis-py client."""
+
+    def __init__(self):
+        self.store = {}
+        self.lock = threading.RLock()
+
+    def get(self, key):
+        value = self.store.get(key)
+        if value is None:
+            return None
+        data, expires_at = value
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self.store[key]
+            return None
+        return data
+
+    def set(self, key, value, ex=None):
+        self.store[key] = (value.encode() if isinstance(value, str) else value, time.monotonic() + ex if ex else None)
+
+    def incr(self, key, amount=1):
+        # Redis runs one command at a time
+        with self.lock:
+            value = int(self.get(key) or 0) + amount
+            expires_at = self.store[key][1] if key in self.store else None
+            self.store[key] = (str(value).encode(), expires_at)
+            return value
+
+    def decr(self, key):
+        return self.incr(key, -1)
+
+    def expire(self, key, seconds):
+        if key in self.store:
+            self.store[key] = (self.store[key][0], time.monotonic() + seconds)
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+class FakePipeline:
+    """Queues commands and runs them back to back on `execute()`, like MULTI/EXEC."""
+
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.commands.append((getattr(self.client, name), args, kwargs))
+            return self
+        return queue
+
+    def execute(self):
+        commands, self.commands = self.commands, []
+        with self.client.lock:
+            return [command(*args, **kwargs) for command, args, kwargs in commands]
+
+@pytest.fixture
+def fake_redis():
+    return FakeRedis()
+
 @pytest.fixture(scope="session", autouse=True)
 def setup_test_db():
     Base.metadata.create_all(bind=engine)
@@ -35,6 +100,10 @@ def db():
     session.close()
     transaction.rollback()
     connection.close()
+    # Committed identities were rolled back with the outer transaction
+    identity_cache.invalidate()
+    response_cache.clear()
+    search_index.clear()
 
 @pytest.fixture
 def client(db):
@@ -45,6 +114,7 @@ def client(db):
             pass
     
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
     with TestClient(app) as c:
         yield c
     app.dependency_overrides.clear()
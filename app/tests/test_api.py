@@ -1,5 +1,17 @@
-from app.core.models import UnifiedData, ETLRun
-from datetime import datetime, timezone
+import csv
+import io
+import json
+import os
+from app.core.cache import response_cache
+from app.core.config import settings
+from app.core.models import UnifiedData, ETLRun, CanonicalAsset, AssetSnapshot, ETLLease
+from app.ingestion.csv_source import CSVExtractor
+from datetime import datetime, timedelta, timezone
+from app.core.run_stats import record_run
+from app.schemas.data import CanonicalAssetRead, UnifiedDataRead
+from app.core.database import get_session_factory
+from app.core.jobs import job_queue
+from app.main import app
 
 def test_health_endpoint(client):
     response = client.get("/api/v1/health")
@@ -32,14 +44,16 @@ def test_data_endpoint_pagination(client, db):
 
 def test_stats_endpoint(client, db):
     # Seed some ETL run stats
-    db.add(ETLRun(
+    run = ETLRun(
         run_id="run_1",
         source="api_source",
         status="success",
         records_processed=100,
         duration_ms=500.0,
         started_at=datetime.now(timezone.utc)
-    ))
+    )
+    db.add(run)
+    record_run(db, run)
     db.commit()
     
     response = client.get("/api/v1/stats")
@@ -49,7 +63,365 @@ def test_stats_endpoint(client, db):
     assert data[0]["source"] == "api_source"
     assert data[0]["records_processed"] == 100
 
+def test_stats_rolling_window_and_history(client, db):
+    base = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    durations = [100.0, 200.0, 300.0, 400.0, 1000.0]
+    for i, duration in enumerate(durations):
+        run = ETLRun(
+            run_id=f"hist_{i}",
+            source="hist_source",
+            status="failure" if i == 1 else "success",
+            records_processed=i,
+            duration_ms=duration,
+            started_at=base + timedelta(minutes=i),
+            ended_at=base + timedelta(minutes=i, seconds=1)
+        )
+        db.add(run)
+        record_run(db, run)
+    db.commit()
+
+    stats = client.get("/api/v1/stats").json()
+    assert len(stats) == 1
+    assert stats[0]["records_processed"] == 4
+    assert stats[0]["success_rate"] == 0.8
+    assert stats[0]["p50_duration_ms"] == 300.0
+    assert stats[0]["p95_duration_ms"] == 1000.0
+    assert stats[0]["history"] is None
+
+    history = client.get("/api/v1/stats?history=2").json()[0]["history"]
+    assert [run["run_id"] for run in history] == ["hist_4", "hist_3"]
+
+def test_health_reads_run_summary(client, db, tmp_path):
+    assert client.get("/api/v1/health/live").json() == {"status": "alive"}
+    assert client.get("/api/v1/health").json()["total_runs"] == 0
+
+    csv_path = tmp_path / "health.csv"
+    csv_path.write_text("id,symbol,name,price,created_at\n1,BTC,Bitcoin,1.0,2023-01-01T00:00:00Z\n")
+    extractor = CSVExtractor(db, str(csv_path))
+    extractor.run()
+    extractor.extract = lambda last_checkpoint: (_ for _ in ()).throw(RuntimeError("boom"))
+    try:
+        extractor.run()
+    except RuntimeError:
+        pass
+
+    health = client.get("/api/v1/health").json()
+    assert health["total_runs"] == 2
+    assert health["success_runs"] == 1
+    assert health["last_etl_run"] is not None
+
+    # The deep check recomputes the same numbers from etl_runs
+    ready = client.get("/api/v1/health/ready")
+    assert ready.status_code == 200
+    assert ready.json()["total_runs"] == 2
+    assert ready.json()["success_runs"] == 1
+
 def test_api_latency_headers(client):
     response = client.get("/api/v1/health")
     assert "X-API-Latency-MS" in response.headers
     assert "X-Request-ID" in response.headers
+
+def test_data_endpoint_cursor_pagination(client, db):
+    for i in range(25):
+        db.add(UnifiedData(
+            source="cursor_test",
+            external_id=f"cur_{i}",
+            title=f"Title {i}",
+            data={}
+        ))
+    db.commit()
+
+    seen, pages = [], []
+    url = "/api/v1/data?source=cursor_test&limit=10"
+    while True:
+        response = client.get(url)
+        assert response.status_code == 200
+        page = response.json()
+        pages.append(len(page))
+        if not page:
+            break
+        seen += [row["id"] for row in page]
+        # The next cursor comes with the results, short pages included
+        assert response.headers["X-Next-Cursor"] == page[-1]["cursor"]
+        url = f"/api/v1/data?source=cursor_test&limit=10&cursor={page[-1]['cursor']}"
+
+    # Every row exactly once, newest (highest id for equal created_at) first
+    assert pages == [10, 10, 5, 0]
+    assert len(seen) == 25
+    assert seen == sorted(seen, reverse=True)
+    # The empty page hands the cursor back, so a client can poll from the same place
+    assert response.headers["X-Next-Cursor"] in url
+
+    # A cursor only resumes the ordering it was issued for
+    first = client.get("/api/v1/data?source=cursor_test&limit=10").json()[-1]["cursor"]
+    assert client.get(f"/api/v1/data?source=cursor_test&order=asc&cursor={first}").status_code == 400
+    assert client.get(f"/api/v1/data?source=cursor_test&sort=rank&cursor={first}").status_code == 400
+
+def test_data_endpoint_rejects_bad_cursor(client):
+    response = client.get("/api/v1/data?cursor=not-a-cursor")
+    assert response.status_code == 400
+
+def test_data_endpoint_ranked_prefix_search(client, db):
+    db.add_all([
+        UnifiedData(source="search_test", external_id="s1", title="Bitcoin (BTC)", description="Market Cap Rank: 1", data={}),
+        UnifiedData(source="search_test", external_id="s2", title="Wrapped Bitcoin (WBTC)", description="Tracks bitcoin", data={}),
+        UnifiedData(source="search_test", external_id="s3", title="Ethereum (ETH)", description="Not about bitcoin", data={}),
+        UnifiedData(source="other", external_id="s4", title="Bitcoin Cash (BCH)", description=None, data={}),
+    ])
+    db.commit()
+
+    # Prefix match on names; title hits rank above description-only hits
+    response = client.get("/api/v1/data?search=bitc&source=search_test")
+    assert response.status_code == 200
+    titles = [row["title"] for row in response.json()]
+    assert titles[0] == "Wrapped Bitcoin (WBTC)"
+    assert titles[-1] == "Ethereum (ETH)"
+    assert len(titles) == 3
+
+    # Symbol prefix, all words must match
+    response = client.get("/api/v1/data?search=bitcoin btc")
+    assert [row["title"] for row in response.json()] == ["Bitcoin (BTC)"]
+
+    # Index picks up rows written after it was built
+    db.add(UnifiedData(source="search_test", external_id="s5", title="Solana (SOL)", data={}))
+    db.commit()
+    response = client.get("/api/v1/data?search=sol")
+    assert [row["title"] for row in response.json()] == ["Solana (SOL)"]
+
+def test_read_endpoints_cached_until_etl_run(client, db, tmp_path):
+    db.add(UnifiedData(source="cache_test", external_id="c1", title="Cached", data={}))
+    db.commit()
+
+    first = client.get("/api/v1/data?source=cache_test")
+    assert first.headers["X-Cache"] == "MISS"
+    etag = first.headers["ETag"]
+
+    # Same query with params in another order is a hit; a matching ETag gets a 304
+    assert client.get("/api/v1/data?source=cache_test&limit=100").headers["X-Cache"] == "MISS"
+    assert client.get("/api/v1/data?limit=100&source=cache_test").headers["X-Cache"] == "HIT"
+    not_modified = client.get("/api/v1/data?source=cache_test", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+
+    # Writes outside the ETL are served stale until a run commits
+    db.add(UnifiedData(source="cache_test", external_id="c2", title="Cached too", data={}))
+    db.commit()
+    assert len(client.get("/api/v1/data?source=cache_test").json()) == 1
+
+    csv_path = tmp_path / "cache.csv"
+    csv_path.write_text("id,symbol,name,price,created_at\n1,BTC,Bitcoin,1.0,2023-01-01T00:00:00Z\n")
+    CSVExtractor(db, str(csv_path)).run()
+
+    refreshed = client.get("/api/v1/data?source=cache_test", headers={"If-None-Match": etag})
+    assert refreshed.status_code == 200
+    assert refreshed.headers["X-Cache"] == "MISS"
+    assert len(refreshed.json()) == 2
+    assert [row["symbol"] for row in client.get("/api/v1/assets").json()] == ["BTC"]
+
+def test_cache_sees_runs_committed_by_other_processes(client, db, monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(response_cache, "clock", lambda: now[0])
+    db.add(UnifiedData(source="remote_etl", external_id="r1", title="Remote", data={}))
+    db.commit()
+    assert len(client.get("/api/v1/data?source=remote_etl").json()) == 1
+
+    # The etl service commits a run; this worker's own cache backend is never bumped
+    db.add(UnifiedData(source="remote_etl", external_id="r2", title="Remote too", data={}))
+    run = ETLRun(run_id="remote_run", source="remote_etl", status="success", records_processed=1, started_at=datetime.now(timezone.utc))
+    db.add(run)
+    record_run(db, run)
+    db.commit()
+    assert len(client.get("/api/v1/data?source=remote_etl").json()) == 1
+
+    # Once the version is re-read from the database the stale entry is no longer addressed
+    now[0] += settings.RESPONSE_CACHE_VERSION_TTL_SECONDS
+    response = client.get("/api/v1/data?source=remote_etl")
+    assert response.headers["X-Cache"] == "MISS"
+    assert len(response.json()) == 2
+
+def test_asset_price_history_from_rollups(client, db, tmp_path):
+    csv_path = tmp_path / "prices.csv"
+    csv_path.write_text(
+        "id,symbol,name,price,created_at\n"
+        "1,BTC,Bitcoin,10.0,2024-01-01T10:00:10Z\n"
+        "2,BTC,Bitcoin,12.0,2024-01-01T10:00:50Z\n"
+        "3,BTC,Bitcoin,9.0,2024-01-01T10:30:00Z\n"
+        "4,BTC,Bitcoin,11.0,2024-01-01T11:05:00Z\n"
+    )
+    CSVExtractor(db, str(csv_path)).run()
+    asset_id = client.get("/api/v1/assets").json()[0]["id"]
+
+    hourly = client.get(f"/api/v1/assets/{asset_id}/prices?interval=1h").json()
+    assert [(p["open"], p["high"], p["low"], p["close"], p["samples"]) for p in hourly] == [
+        (10.0, 12.0, 9.0, 9.0, 3),
+        (11.0, 11.0, 11.0, 11.0, 1),
+    ]
+
+    minutes = client.get(
+        f"/api/v1/assets/{asset_id}/prices",
+        params={"interval": "1m", "from": "2024-01-01T10:00:30Z", "to": "2024-01-01T11:00:00Z"}
+    ).json()
+    assert [(p["open"], p["close"]) for p in minutes] == [(10.0, 12.0), (9.0, 9.0)]
+
+    assert client.get("/api/v1/assets/999999/prices").status_code == 404
+    assert client.get(f"/api/v1/assets/{asset_id}/prices?interval=5m").status_code == 422
+
+def test_data_sort_and_range_filters_on_promoted_columns(client, db, tmp_path):
+    csv_path = tmp_path / "promoted.csv"
+    csv_path.write_text(
+        "id,symbol,name,price,created_at\n"
+        "1,btc,Bitcoin,50.0,2024-01-01T00:00:00Z\n"
+        "2,eth,Ethereum,30.0,2024-01-01T00:00:00Z\n"
+        "3,sol,Solana,10.0,2024-01-01T00:00:00Z\n"
+        "4,ada,Cardano,1.0,2024-01-01T00:00:00Z\n"
+        "5,dot,Polkadot,5.0,2024-01-01T00:00:00Z\n"
+    )
+    CSVExtractor(db, str(csv_path)).run()
+
+    # The loader copies price and symbol out of `data` into typed columns
+    btc = db.query(UnifiedData).filter(UnifiedData.external_id == "csv_1").one()
+    assert (btc.price_usd, btc.symbol) == (50.0, "BTC")
+
+    prices, url = [], "/api/v1/data?sort=price&limit=2"
+    while page := client.get(url).json():
+        prices += [row["price_usd"] for row in page]
+        url = f"/api/v1/data?sort=price&limit=2&cursor={page[-1]['cursor']}"
+        if len(prices) == 2:
+            # The boundary row's price changes between pages: the seek uses the
+            # price the cursor was issued with, so nothing is skipped or repeated
+            db.query(UnifiedData).filter(UnifiedData.price_usd == 30.0).update({UnifiedData.price_usd: 1000.0})
+            db.commit()
+            response_cache.clear()
+    assert prices == [50.0, 30.0, 10.0, 5.0, 1.0]
+    db.query(UnifiedData).filter(UnifiedData.price_usd == 1000.0).update({UnifiedData.price_usd: 30.0})
+    db.commit()
+    response_cache.clear()
+
+    response = client.get("/api/v1/data?sort=price&order=asc&min_price=2&max_price=30")
+    assert [row["symbol"] for row in response.json()] == ["DOT", "SOL", "ETH"]
+    assert [row["title"] for row in client.get("/api/v1/data?symbol=eth").json()] == ["Ethereum (eth)"]
+
+    db.add_all([
+        UnifiedData(source="ranked", external_id="r1", title="Rank 2", rank=2, data={}),
+        UnifiedData(source="ranked", external_id="r2", title="Rank 1", rank=1, data={}),
+    ])
+    db.commit()
+    response = client.get("/api/v1/data?sort=rank&max_rank=5")
+    assert [row["title"] for row in response.json()] == ["Rank 1", "Rank 2"]
+    assert client.get("/api/v1/data?sort=volume").status_code == 422
+
+def test_assets_embed_cross_source_snapshot(client, db, tmp_path):
+    def run_csv(source_name, rows):
+        csv_path = tmp_path / f"{source_name}.csv"
+        csv_path.write_text("id,symbol,name,price,created_at\n" + "".join(f"{row}\n" for row in rows))
+        extractor = CSVExtractor(db, str(csv_path))
+        extractor.source_name = source_name
+        extractor.run()
+        return extractor
+
+    run_csv("feed_a", ["1,BTC,Bitcoin,100.0,2024-01-01T00:00:00Z", "2,ETH,Ethereum,10.0,2024-01-01T00:00:00Z"])
+    run_csv("feed_b", ["1,BTC,Bitcoin,110.0,2024-01-01T00:05:00Z"])
+    last = run_csv("feed_c", ["1,BTC,Bitcoin,104.0,2024-01-01T00:10:00Z"])
+
+    assets = {a["symbol"]: a for a in client.get("/api/v1/assets?embed=snapshot").json()}
+    btc = assets["BTC"]["snapshot"]
+    assert btc["source_count"] == 3
+    assert btc["median_price"] == 104.0
+    assert (btc["min_price"], btc["max_price"]) == (100.0, 110.0)
+    assert round(btc["spread_pct"], 2) == 9.62
+    assert btc["prices"]["feed_b"]["price"] == 110.0
+    assert btc["freshest_at"].startswith("2024-01-01T00:10:00")
+    assert btc["stalest_at"].startswith("2024-01-01T00:00:00")
+    assert assets["ETH"]["snapshot"]["source_count"] == 1
+
+    # Only assets with new prices are recomputed
+    assert last.touched_canonical_ids == {assets["BTC"]["id"]}
+    assert client.get("/api/v1/assets").json()[0]["snapshot"] is None
+
+def test_data_export_streams_ndjson_and_csv(client, db):
+    for i in range(5):
+        db.add(UnifiedData(
+            source="export" if i < 4 else "other",
+            external_id=f"exp_{i}",
+            title=f"Export {i}",
+            price_usd=float(i),
+            data={"i": i},
+            updated_at=datetime(2024, 1, 1 + i, tzinfo=timezone.utc)
+        ))
+    db.commit()
+
+    response = client.get("/api/v1/data/export?source=export&min_price=1")
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["external_id"] for row in lines] == ["exp_1", "exp_2", "exp_3"]
+    assert lines[0]["data"] == {"i": 1}
+
+    response = client.get("/api/v1/data/export?format=csv&source=export&updated_since=2024-01-03T00:00:00Z")
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [row["external_id"] for row in rows] == ["exp_2", "exp_3"]
+    assert json.loads(rows[0]["data"]) == {"i": 2}
+
+    # Compressed on the fly; the client decodes Content-Encoding transparently
+    response = client.get("/api/v1/data/export?gzip=true")
+    assert response.headers["content-encoding"] == "gzip"
+    assert len(response.text.splitlines()) == 5
+
+def test_fast_serialization_matches_response_models(client, db):
+    asset = CanonicalAsset(symbol="FST", name="Fast")
+    db.add(asset)
+    db.flush()
+    db.add(AssetSnapshot(canonical_id=asset.id, prices={"a": {"price": 1.5, "ts": "2024-01-01T00:00:00+00:00"}}, source_count=1, median_price=1.5))
+    row = UnifiedData(source="fast", external_id="f1", canonical_id=asset.id, title="Fast", price_usd=1.5, rank=3, data={"nested": [1, 2]})
+    db.add(row)
+    db.commit()
+
+    # Tuple rows encoded directly must look exactly like the validated models
+    [fast] = client.get("/api/v1/data?source=fast").json()
+    assert fast["cursor"]
+    assert fast == UnifiedDataRead.model_validate(row).model_dump(mode="json") | {"cursor": fast["cursor"]}
+    embedded = client.get("/api/v1/assets?embed=snapshot").json()[0]
+    assert CanonicalAssetRead.model_validate(embedded).snapshot.median_price == 1.5
+
+    schema = client.get("/api/v1/openapi.json").json()
+    assert schema["paths"]["/api/v1/data"]["get"]["responses"]["200"]["content"]["application/json"]["schema"]["items"]["$ref"].endswith("UnifiedDataRead")
+
+def test_upload_csv_runs_as_background_job(client, db):
+    app.dependency_overrides[get_session_factory] = lambda: lambda: db
+    csv_body = "id,symbol,name,price,created_at\n" + "".join(
+        f"up{i},UP{i},Upload {i},{i}.5,2024-01-01T00:00:0{i}Z\n" for i in range(3)
+    )
+
+    response = client.post("/api/v1/upload-csv", files={"file": ("prices.csv", csv_body, "text/csv")})
+    assert response.status_code == 202
+    job_id = response.json()["job_id"]
+    job_queue.get(job_id).future.result(timeout=10)
+
+    job = client.get(f"/api/v1/jobs/{job_id}").json()
+    assert job["status"] == "success"
+    assert job["rows_read"] == 3 and job["rows_written"] == 3
+    assert job["rows_per_second"] > 0
+    assert job["result"]["records_processed"] == 3
+    assert db.query(UnifiedData).filter(UnifiedData.external_id == "csv_up1").count() == 1
+    # The spooled upload is removed once ingested
+    assert not any(name.endswith("_prices.csv") for name in os.listdir("temp_uploads"))
+
+    assert client.get("/api/v1/jobs/missing").status_code == 404
+    assert client.post("/api/v1/upload-csv", files={"file": ("prices.txt", "x", "text/plain")}).status_code == 400
+
+def test_upload_csv_waits_for_lease_then_fails(client, db, monkeypatch):
+    app.dependency_overrides[get_session_factory] = lambda: lambda: db
+    monkeypatch.setattr(settings, "UPLOAD_LEASE_WAIT_SECONDS", 0.2)
+    monkeypatch.setattr(settings, "UPLOAD_LEASE_RETRY_SECONDS", 0.05)
+    # A scheduled CSV run holds the source's lease for the whole wait
+    now = datetime.now(timezone.utc)
+    db.add(ETLLease(source="csv_crypto", holder="scheduler", acquired_at=now, heartbeat_at=now, expires_at=now + timedelta(minutes=5)))
+    db.commit()
+
+    response = client.post("/api/v1/upload-csv", files={"file": ("locked.csv", "id,symbol,name,price\nl1,L1,Locked,1.0\n", "text/csv")})
+    job_id = response.json()["job_id"]
+    job_queue.get(job_id).future.result(timeout=10)
+
+    job = client.get(f"/api/v1/jobs/{job_id}").json()
+    assert job["status"] == "failure"
+    assert "csv_crypto" in job["error"]
+    assert db.query(UnifiedData).filter(UnifiedData.external_id == "csv_l1").count() == 0
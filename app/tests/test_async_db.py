@@ -0,0 +1,53 @@
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from fastapi.testclient import TestClient
+from app.core.cache import response_cache
+from app.core.database import Base, get_read_db
+from app.core.run_stats import record_run
+from app.core.search import search_index
+from app.core.models import CanonicalAsset, ETLRun, UnifiedData
+from app.main import app
+
+def test_read_endpoints_on_async_engine(tmp_path):
+    url = f"sqlite:///{tmp_path / 'async.db'}"
+    sync_engine = create_engine(url)
+    Base.metadata.create_all(bind=sync_engine)
+    with sessionmaker(bind=sync_engine)() as db:
+        asset = CanonicalAsset(symbol="BTC", name="Bitcoin")
+        db.add(asset)
+        db.flush()
+        db.add_all([
+            UnifiedData(source="async", external_id=f"a{i}", canonical_id=asset.id, title=f"Bitcoin {i}", data={})
+            for i in range(3)
+        ])
+        run = ETLRun(run_id="r1", source="async", status="success", records_processed=3, duration_ms=1.0)
+        db.add(run)
+        record_run(db, run)
+        db.commit()
+
+    async_engine = create_async_engine(url.replace("sqlite://", "sqlite+aiosqlite://"))
+    AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+
+    async def override_get_read_db():
+        async with AsyncSessionLocal() as session:
+            yield session
+
+    app.dependency_overrides[get_read_db] = override_get_read_db
+    try:
+        with TestClient(app) as client:
+            response = client.get("/api/v1/data?limit=2")
+            assert response.status_code == 200
+            assert len(response.json()) == 2
+            assert "X-Next-Cursor" in response.headers
+
+            assert [row["title"] for row in client.get("/api/v1/data?search=bitcoin 1").json()] == ["Bitcoin 1"]
+            assert [row["symbol"] for row in client.get("/api/v1/assets").json()] == ["BTC"]
+            assert client.get("/api/v1/stats").json()[0]["records_processed"] == 3
+            assert client.get("/api/v1/health").json()["db_connected"] is True
+            assert client.get("/api/v1/health/ready").json()["total_runs"] == 1
+    finally:
+        app.dependency_overrides.clear()
+        response_cache.clear()
+        search_index.clear()
+        sync_engine.dispose()
@@ -0,0 +1,58 @@
+from app.core.cache import MemoryCacheBackend, RedisCacheBackend, ResponseCache, response_cache
+import asyncio
+import time
+
+def test_memory_backend_lru_and_ttl():
+    backend = MemoryCacheBackend(max_entries=2)
+    backend.set("a", 1)
+    backend.set("b", 2)
+    backend.get("a")
+    backend.set("c", 3)
+    assert backend.get("b") is None
+    assert backend.get("a") == 1
+
+    backend.set("short", "x", ttl=0.01)
+    time.sleep(0.02)
+    assert backend.get("short") is None
+
+    # The version counter is never evicted by the LRU
+    backend.incr("version")
+    for i in range(5):
+        backend.set(str(i), i)
+    assert backend.get("version") == 1
+
+def test_shared_backend_version_bump(fake_redis):
+    client = fake_redis
+    worker_a = ResponseCache(RedisCacheBackend(client), ttl_seconds=60)
+    worker_b = ResponseCache(RedisCacheBackend(client), ttl_seconds=60)
+
+    worker_a.backend.set("entry", {"body": "[]"}, ttl=60)
+    assert worker_b.backend.get("entry") == {"body": "[]"}
+
+    # An ETL run in one process invalidates responses cached by every worker
+    assert worker_a.version() == worker_b.version() == 0
+    worker_b.bump_version()
+    assert worker_a.version() == 1
+
+def off_loop_calls(client, monkeypatch, *methods):
+    """Records, per call, whether a Redis method ran on the event loop thread."""
+    on_loop = []
+    for name in methods:
+        def probe(*args, _call=getattr(client, name), **kwargs):
+            try:
+                asyncio.get_running_loop()
+                on_loop.append(True)
+            except RuntimeError:
+                on_loop.append(False)
+            return _call(*args, **kwargs)
+        monkeypatch.setattr(client, name, probe)
+    return on_loop
+
+def test_redis_backend_calls_run_off_the_event_loop(client, fake_redis, monkeypatch):
+    on_loop = off_loop_calls(fake_redis, monkeypatch, "get", "set")
+    monkeypatch.setattr(response_cache, "backend", RedisCacheBackend(fake_redis))
+
+    assert client.get("/api/v1/data?limit=1").headers["X-Cache"] == "MISS"
+    assert client.get("/api/v1/data?limit=1").headers["X-Cache"] == "HIT"
+    # Version reads, lookups and stores all went through the threadpool
+    assert on_loop and not any(on_loop)
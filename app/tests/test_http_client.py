@@ -0,0 +1,152 @@
+import inspect
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+import httpx
+import pytest
+from app.core.models import ETLRun, UnifiedData
+from app.ingestion.api_source import CoinGeckoExtractor
+from app.ingestion.http_client import AsyncHTTPClient, http_client
+
+COINS = [{
+    'id': 'bitcoin',
+    'symbol': 'btc',
+    'name': 'Bitcoin',
+    'current_price': 42100.0,
+    'market_cap': 810000000.0,
+    'market_cap_rank': 1,
+    'last_updated': '2023-12-27T10:05:00Z'
+}]
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Serves COINS with an ETag; fails the first `failures` requests with 503."""
+    failures = 0
+    hits = []
+
+    def do_GET(self):
+        StubHandler.hits.append(self.headers.get("If-None-Match"))
+        if StubHandler.failures > 0:
+            StubHandler.failures -= 1
+            self.send_response(503)
+            self.end_headers()
+            return
+        if self.headers.get("If-None-Match") == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = json.dumps(COINS).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("ETag", '"v1"')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def stub_url():
+    StubHandler.failures = 0
+    StubHandler.hits = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/coins"
+    server.shutdown()
+    http_client.validators.clear()
+
+def test_client_retries_transient_failures(stub_url):
+    client = AsyncHTTPClient(timeout=5, max_retries=3, backoff_base=0.01, max_connections=2, per_host_limit=1)
+    StubHandler.failures = 2
+
+    result = client.fetch(stub_url)
+
+    assert result.status_code == 200
+    assert result.data == COINS
+    assert len(StubHandler.hits) == 3
+
+def test_client_gives_up_after_max_retries(stub_url):
+    client = AsyncHTTPClient(timeout=5, max_retries=1, backoff_base=0.01, max_connections=2, per_host_limit=1)
+    StubHandler.failures = 5
+
+    with pytest.raises(httpx.HTTPStatusError):
+        client.fetch(stub_url)
+    assert len(StubHandler.hits) == 2
+
+def test_backoff_caps_retry_after_and_exponential_waits():
+    client = AsyncHTTPClient(timeout=5, max_retries=10, backoff_base=1, max_connections=2, per_host_limit=1, max_backoff=5)
+    response = lambda retry_after: httpx.Response(429, headers={"Retry-After": retry_after})
+
+    assert client._backoff(0, response("2")) == 2
+    # An upstream asking for an hour waits no longer than the configured cap
+    assert client._backoff(0, response("3600")) == 5
+    assert all(0 <= client._backoff(8, None) <= 5 for _ in range(20))
+
+def test_unchanged_upstream_skips_run(db, stub_url):
+    extractor = CoinGeckoExtractor(db)
+    extractor.base_url = stub_url
+    extractor.rate_per_second = None
+
+    extractor.run()
+    assert db.query(UnifiedData).filter(UnifiedData.source == "coingecko_crypto").count() == 1
+
+    # Second run sends the stored ETag, gets a 304 and loads nothing
+    extractor.run()
+    assert StubHandler.hits == [None, '"v1"']
+    runs = db.query(ETLRun).filter(ETLRun.source == "coingecko_crypto").order_by(ETLRun.id).all()
+    assert [r.records_processed for r in runs] == [1, 0]
+    assert runs[1].status == "success"
+
+class PagedHandler(BaseHTTPRequestHandler):
+    """Serves a ranked market list page by page, like /coins/markets."""
+    total = 7
+    pages = []
+
+    def do_GET(self):
+        query = dict(parse_qsl(urlsplit(self.path).query))
+        page, per_page = int(query["page"]), int(query["per_page"])
+        PagedHandler.pages.append(page)
+        start = (page - 1) * per_page
+        coins = [
+            {
+                'id': f'coin-{rank}',
+                'symbol': f'c{rank}',
+                'name': f'Coin {rank}',
+                'current_price': float(rank),
+                'market_cap': 1000.0 / rank,
+                'market_cap_rank': rank,
+                'last_updated': '2023-12-27T10:05:00Z'
+            }
+            for rank in range(start + 1, min(start + per_page, PagedHandler.total) + 1)
+        ]
+        body = json.dumps(coins).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def test_coingecko_fetches_top_n_across_pages(db):
+    PagedHandler.pages = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), PagedHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        extractor = CoinGeckoExtractor(db)
+        extractor.base_url = f"http://127.0.0.1:{server.server_port}/coins/markets"
+        extractor.top_n = 5
+        extractor.page_size = 2
+        extractor.rate_per_second = None
+
+        # extract streams records instead of building a list
+        assert inspect.isgenerator(extractor.extract(None))
+
+        extractor.run()
+
+        assert sorted(PagedHandler.pages) == [1, 2, 3]
+        stored = db.query(UnifiedData).filter(UnifiedData.source == "coingecko_crypto").all()
+        assert sorted(r.external_id for r in stored) == [f"cg_coin-{rank}" for rank in range(1, 6)]
+    finally:
+        server.shutdown()
@@ -1,9 +1,19 @@
+import asyncio
 import pytest
-from datetime import datetime, timedelta
+import time
+from datetime import datetime, timedelta, timezone
+from app.ingestion.base import BaseExtractor
 from app.ingestion.csv_source import CSVExtractor
-from app.core.models import UnifiedData, ETLCheckpoint, ETLRun, RawData
+from app.ingestion.pipeline import Pipeline
+from app.schemas.data import UnifiedDataCreate
+from app.core.models import UnifiedData, ETLCheckpoint, ETLLease, ETLRun, RawData, CanonicalAsset, PriceObservation, PriceRollup
+from app.core.cache import response_cache
+from app.core.leases import LeaseLost, RunLease, try_acquire
+from app.core.prices import record_observations
+from app.core.upsert import bulk_upsert
 import os
 import pandas as pd
+from sqlalchemy import event
 
 def test_csv_extraction_incremental(db):
     # Create a temporary CSV file
@@ -90,3 +100,306 @@ def test_extraction_failure_recovery(db):
                 os.remove(csv_path)
             except PermissionError:
                 pass # Ignore if still locked, though not ideal
+
+def test_bulk_load_batches_and_upserts(db):
+    csv_path = "bulk_test.csv"
+    try:
+        pd.DataFrame({
+            'id': [1, 2, 3, 3, 4],
+            'symbol': ['BTC', 'ETH', 'SOL', 'SOL', 'ADA'],
+            'name': ['Bitcoin', 'Ethereum', 'Solana', 'Solana', 'Cardano'],
+            'price': [1.0, 2.0, 3.0, 3.5, 4.0],
+            'created_at': ['2023-01-01T10:00:00Z'] * 5
+        }).to_csv(csv_path, index=False)
+
+        extractor = CSVExtractor(db, csv_path)
+        extractor.batch_size = 2
+        extractor.run()
+
+        # Duplicate ids collapse onto one row, the last copy wins
+        assert db.query(RawData).filter(RawData.source == "csv_crypto").count() == 4
+        assert db.query(UnifiedData).count() == 4
+        sol = db.query(UnifiedData).filter(UnifiedData.external_id == "csv_3").one()
+        assert sol.data["price"] == 3.5
+
+        # Every staged record is still counted
+        run = db.query(ETLRun).filter(ETLRun.source == "csv_crypto").one()
+        assert run.records_processed == 5
+        assert run.status == "success"
+    finally:
+        if os.path.exists(csv_path):
+            os.remove(csv_path)
+
+def test_upserts_lock_rows_in_conflict_key_order(db):
+    statements = []
+    listener = lambda conn, cursor, statement, params, context, executemany: statements.append((statement, params))
+    event.listen(db.get_bind(), "before_cursor_execute", listener)
+    try:
+        db.add_all([CanonicalAsset(id=902, symbol="ORDB", name="b"), CanonicalAsset(id=901, symbol="ORDA", name="a")])
+        db.flush()
+        ts = datetime(2024, 1, 1, 10, 0, tzinfo=timezone.utc)
+        record_observations(db, [
+            {"canonical_id": asset_id, "source": "s", "ts": ts, "price": 1.0, "market_cap": None} for asset_id in (902, 901)
+        ])
+        bulk_upsert(db, RawData, [
+            {"source": "order", "external_id": e, "content": {}, "content_hash": e} for e in ("3", "1", "2")
+        ], index_elements=["source", "external_id"])
+    finally:
+        event.remove(db.get_bind(), "before_cursor_execute", listener)
+
+    def params_of(table):
+        return next(params for statement, params in statements if statement.startswith(f"INSERT INTO {table}"))
+    # Parallel partition loads must lock overlapping rows in the same order:
+    # rollup rows lead with canonical_id, raw rows carry external_id second
+    assert list(params_of("price_rollups")[0::10]) == [901] * 3 + [902] * 3
+    assert list(params_of("raw_data")[1::4]) == ["1", "2", "3"]
+
+def test_row_by_row_load_matches_bulk(db):
+    csv_path = "row_test.csv"
+    try:
+        pd.DataFrame({
+            'id': [1, 1, 2],
+            'symbol': ['BTC', 'BTC', 'ETH'],
+            'name': ['Bitcoin', 'Bitcoin', 'Ethereum'],
+            'price': [1.0, 1.5, 2.0],
+            'created_at': ['2023-01-01T10:00:00Z'] * 3
+        }).to_csv(csv_path, index=False)
+
+        extractor = CSVExtractor(db, csv_path)
+        extractor.bulk_load = False
+        extractor.run()
+
+        assert db.query(RawData).filter(RawData.source == "csv_crypto").count() == 2
+        btc = db.query(UnifiedData).filter(UnifiedData.external_id == "csv_1").one()
+        assert btc.data["price"] == 1.5
+    finally:
+        if os.path.exists(csv_path):
+            os.remove(csv_path)
+
+def test_csv_streams_in_chunks(db):
+    csv_path = "stream_test.csv"
+    try:
+        pd.DataFrame({
+            'id': [1, 2, 3, 4, 5],
+            'symbol': ['A', 'B', 'C', 'D', 'E'],
+            'name': ['A', 'B', 'C', 'D', 'E'],
+            'price': [1.0, 2.0, 3.0, 4.0, 5.0],
+            'created_at': [f'2023-01-0{i}T10:00:00Z' for i in range(1, 6)]
+        }).to_csv(csv_path, index=False)
+
+        extractor = CSVExtractor(db, csv_path)
+        extractor.chunk_size = 2
+
+        # Checkpoint filtering applies to every chunk, not just the first
+        chunks = list(extractor.read_chunks(datetime(2023, 1, 2, 10, 0)))
+        assert [len(c) for c in chunks] == [2, 1]
+        records = [r for c in chunks for r in c.to_dict('records')]
+        assert [r['id'] for r in records] == ['3', '4', '5']
+        assert records[0]['created_at'] == '2023-01-03T10:00:00Z'
+
+        extractor.run()
+        assert db.query(UnifiedData).count() == 5
+        checkpoint = db.query(ETLCheckpoint).filter(ETLCheckpoint.source == "csv_crypto").one()
+        assert checkpoint.last_processed_at.day == 5
+    finally:
+        if os.path.exists(csv_path):
+            os.remove(csv_path)
+
+def test_vectorized_csv_transform_matches_per_row(db):
+    from app.ingestion.csv_source import CSV_DTYPES
+    csv_path = "vector_test.csv"
+    try:
+        pd.DataFrame({
+            'id': [1, 2],
+            'symbol': ['BTC', 'ETH'],
+            'name': ['Bitcoin', 'Ethereum'],
+            'price': [45000.0, 15.99],
+            'created_at': ['2023-01-01T10:00:00Z', '2023-01-02T10:00:00Z']
+        }).to_csv(csv_path, index=False)
+        df = pd.read_csv(csv_path, dtype=CSV_DTYPES)
+
+        # The loader's vectorized path: stage_chunk on the transform thread, then canonical ids
+        extractor = CSVExtractor(db, csv_path)
+        _, batch, _ = extractor.stage_batch(extractor.prepare_batch(df))
+        per_row = [extractor.transform(r).model_dump() for r in df.to_dict('records')]
+        assert batch == per_row
+
+        # Both paths load the same rows
+        extractor.strict = True
+        extractor.run()
+        stored = db.query(UnifiedData).order_by(UnifiedData.external_id).all()
+        assert [(r.external_id, r.title, r.description, r.data) for r in stored] == [
+            (row['external_id'], row['title'], row['description'], row['data']) for row in per_row
+        ]
+        run = db.query(ETLRun).filter(ETLRun.source == "csv_crypto").one()
+        assert run.records_processed == 2
+    finally:
+        if os.path.exists(csv_path):
+            os.remove(csv_path)
+
+class StaticExtractor(BaseExtractor):
+    """Serves a fixed list of records and never advances a checkpoint."""
+
+    def __init__(self, db, records):
+        super().__init__(source_name="static", db=db)
+        self.records = records
+
+    def extract(self, last_checkpoint):
+        return list(self.records)
+
+    def transform(self, raw_data):
+        return UnifiedDataCreate(
+            source=self.source_name,
+            external_id=raw_data["id"],
+            title=raw_data["title"],
+            data={"price": raw_data["price"]}
+        )
+
+@pytest.mark.parametrize("bulk_load", [True, False])
+def test_unchanged_records_are_not_rewritten(db, bulk_load):
+    records = [{"id": str(i), "title": f"Asset {i}", "price": float(i)} for i in range(4)]
+    extractor = StaticExtractor(db, records)
+    extractor.bulk_load = bulk_load
+    extractor.run()
+
+    stored = {row.external_id: row.content_hash for row in db.query(UnifiedData).filter(UnifiedData.source == "static")}
+    assert len(stored) == 4 and all(stored.values())
+    assert all(row.content_hash for row in db.query(RawData).filter(RawData.source == "static"))
+
+    # One price moves, one asset is new, the rest are identical
+    extractor.records = records[:3] + [{"id": "3", "title": "Asset 3", "price": 30.0}, {"id": "4", "title": "Asset 4", "price": 4.0}]
+    extractor.run()
+
+    runs = db.query(ETLRun).filter(ETLRun.source == "static").order_by(ETLRun.id).all()
+    assert [(r.records_inserted, r.records_updated, r.records_unchanged) for r in runs] == [(4, 0, 0), (1, 1, 3)]
+    changed = db.query(UnifiedData).filter(UnifiedData.source == "static", UnifiedData.external_id == "3").one()
+    assert changed.data["price"] == 30.0
+    assert changed.content_hash != stored["3"]
+
+def test_price_rollups_merge_late_and_repeated_points(db):
+    asset = CanonicalAsset(symbol="ROLL", name="Rollup")
+    db.add(asset)
+    db.flush()
+    at = lambda minute: datetime(2024, 1, 1, 10, minute, tzinfo=timezone.utc)
+    point = lambda minute, price: {"canonical_id": asset.id, "source": "s", "ts": at(minute), "price": price, "market_cap": None}
+
+    assert len(record_observations(db, [point(20, 5.0), point(40, 7.0)])) == 2
+    # A late point opens the hour earlier; a repeated point is ignored
+    assert len(record_observations(db, [point(10, 4.0), point(40, 7.0)])) == 1
+
+    hour = db.get(PriceRollup, (asset.id, "1h", datetime(2024, 1, 1, 10)))
+    assert (hour.open, hour.high, hour.low, hour.close, hour.samples) == (4.0, 7.0, 4.0, 7.0, 3)
+    assert db.query(PriceObservation).filter(PriceObservation.canonical_id == asset.id).count() == 3
+
+def test_run_lease_skips_live_holders_and_steals_expired_ones(db):
+    records = [{"id": "1", "title": "Asset 1", "price": 1.0}]
+    now = datetime.now(timezone.utc)
+    db.add(ETLLease(source="static", holder="other-pod", acquired_at=now, heartbeat_at=now, expires_at=now + timedelta(minutes=5)))
+    db.commit()
+
+    # Another process is mid-run: nothing is ingested or recorded
+    assert StaticExtractor(db, records).run()["status"] == "skipped"
+    assert db.query(ETLRun).filter(ETLRun.source == "static").count() == 0
+
+    # Its heartbeat stopped: the lease is taken over and released after the run
+    db.query(ETLLease).filter(ETLLease.source == "static").update({ETLLease.expires_at: now - timedelta(seconds=1)})
+    db.commit()
+    assert StaticExtractor(db, records).run()["status"] == "success"
+    lease = db.get(ETLLease, "static")
+    db.refresh(lease)
+    assert lease.holder is None
+
+    # The old holder's fence refuses to commit over the new holder
+    stale = RunLease(lambda: db, "static", "old-holder", ttl_seconds=60, heartbeat_seconds=60)
+    assert try_acquire(db, "static", "new-holder", 60)
+    with pytest.raises(LeaseLost):
+        stale.fence(db)
+
+def test_progress_counts_only_rows_written(db):
+    records = [{"id": str(i), "title": f"Asset {i}", "price": float(i)} for i in range(4)]
+    seen = []
+    for _ in range(2):
+        extractor = StaticExtractor(db, records)
+        extractor.progress = lambda read, written: seen.append((read, written))
+        extractor.run()
+    # The second run reads every row again but the content hashes skip all of them
+    assert seen == [(4, 4), (4, 0)]
+
+class AsyncStaticExtractor(StaticExtractor):
+    """StaticExtractor whose extract is an async generator."""
+
+    async def extract(self, last_checkpoint):
+        for record in self.records:
+            await asyncio.sleep(0)
+            yield record
+
+@pytest.mark.parametrize("pipelined", [True, False])
+@pytest.mark.parametrize("extractor_class", [StaticExtractor, AsyncStaticExtractor])
+def test_list_and_async_extractors_run_with_or_without_pipeline(db, extractor_class, pipelined):
+    records = [{"id": str(i), "title": f"Asset {i}", "price": float(i)} for i in range(7)]
+    extractor = extractor_class(db, records)
+    extractor.batch_size = 3
+    extractor.pipelined = pipelined
+    result = extractor.run()
+
+    assert result["records_processed"] == 7
+    assert db.query(UnifiedData).filter(UnifiedData.source == "static").count() == 7
+    if pipelined:
+        assert {stage: stats["items"] for stage, stats in result["stages"].items()} == {"extract": 3, "transform": 3, "load": 3}
+    else:
+        assert result["stages"] is None
+
+def test_pipeline_extract_failure_rolls_back_the_run(db):
+    def records():
+        yield {"id": "1", "title": "Asset 1", "price": 1.0}
+        raise ConnectionError("upstream reset")
+
+    cache_version = response_cache.version()
+    with pytest.raises(ConnectionError):
+        StaticExtractor(db, records()).run()
+    assert db.query(UnifiedData).filter(UnifiedData.source == "static").count() == 0
+    # Nothing was loaded, so cached responses stay valid
+    assert response_cache.version() == cache_version
+    assert db.query(ETLRun).filter(ETLRun.source == "static").one().status == "failure"
+
+def test_pipeline_is_opt_in_and_closes_abandoned_sources(db):
+    # Extract may only run on its own thread when the source says it is safe
+    assert not StaticExtractor(db, []).pipelined
+    assert CSVExtractor(db, "unused.csv").pipelined
+
+    closed = []
+
+    def batches():
+        try:
+            for i in range(100):
+                yield [i]
+        finally:
+            closed.append(True)
+
+    def load(batch):
+        raise RuntimeError("database gone")
+
+    with pytest.raises(RuntimeError):
+        Pipeline("closing", queue_size=2).run(batches(), lambda batch: batch, load)
+    # The half-read source is cleaned up when the run stops, not by the GC later
+    assert closed == [True]
+
+def test_pipeline_backpressure_bounds_how_far_extract_runs_ahead():
+    produced = []
+    ahead = []
+
+    def batches():
+        for i in range(20):
+            produced.append(i)
+            yield [i]
+
+    def load(batch):
+        # Extracted-but-unloaded batches: at most the two queues plus one in each stage
+        ahead.append(len(produced) - batch[0])
+        time.sleep(0.005)
+
+    stats = Pipeline("test", queue_size=1).run(batches(), lambda batch: batch, load)
+    assert stats["load"].items == 20
+    assert max(ahead) <= 5
+    assert stats["transform"].max_queue_depth <= 1 and stats["load"].max_queue_depth <= 1
+    assert stats["load"].busy_seconds >= 0.1
@@ -94,3 +94,80 @@ def test_normalization_logic(db):
     assert normalize_symbol(" btc ") == "BTC"
     assert normalize_symbol("Eth") == "ETH"
     assert normalize_symbol(None) == "UNKNOWN"
+
+def test_batch_identity_resolution_uses_cache(db):
+    from app.core.identity import resolve_canonical_ids, identity_cache
+    from sqlalchemy import event
+
+    ids = resolve_canonical_ids(db, "coingecko_crypto", [
+        ("bitcoin", "btc", "Bitcoin"),
+        ("ethereum", "eth", "Ethereum"),
+        ("bitcoin", "btc", "Bitcoin"),
+    ])
+    assert ids[0] == ids[2] != ids[1]
+    db.commit()
+
+    # Committed identities are served without touching the database
+    assert identity_cache.get_mapping("coingecko_crypto", "bitcoin") == ids[0]
+    statements = []
+    listener = lambda *args: statements.append(args)
+    event.listen(db.get_bind(), "before_cursor_execute", listener)
+    try:
+        assert resolve_canonical_ids(db, "coingecko_crypto", [("ethereum", "ETH", "Ethereum")]) == [ids[1]]
+    finally:
+        event.remove(db.get_bind(), "before_cursor_execute", listener)
+    assert statements == []
+
+    # A new source for a known symbol reuses the canonical asset
+    assert resolve_canonical_ids(db, "coinpaprika_crypto", [("btc-bitcoin", "BTC", "Bitcoin")]) == [ids[0]]
+    assert db.query(CanonicalAsset).count() == 2
+
+def test_identity_cache_discards_rolled_back_rows(db):
+    from app.core.identity import resolve_canonical_id, identity_cache
+
+    try:
+        with db.begin_nested():
+            resolve_canonical_id(db, "csv_crypto", "DOGE", "DOGE", "Dogecoin")
+            raise RuntimeError("abort")
+    except RuntimeError:
+        pass
+    db.commit()
+
+    assert identity_cache.get_symbol("DOGE") is None
+    assert db.query(CanonicalAsset).filter(CanonicalAsset.symbol == "DOGE").count() == 0
+
+def test_identity_cache_lru_eviction():
+    from app.core.identity import IdentityCache
+
+    cache = IdentityCache(max_size=2)
+    cache.put({("s", "a"): 1, ("s", "b"): 2}, {})
+    cache.get_mapping("s", "a")
+    cache.put({("s", "c"): 3}, {})
+    assert cache.get_mapping("s", "b") is None
+    assert cache.get_mapping("s", "a") == 1
+    assert cache.get_mapping("s", "c") == 3
+
+def test_identity_cache_reloads_each_run_and_reports_truncation(db, caplog):
+    from app.core.identity import IdentityCache, identity_cache
+    from app.core.models import AssetMapping
+    from app.ingestion.csv_source import CSVExtractor
+
+    identity_cache.preload(db)
+    # Another process (e.g. the etl service) maps a new asset after this one loaded
+    asset = CanonicalAsset(symbol="RLD", name="Reload")
+    db.add(asset)
+    db.flush()
+    db.add(AssetMapping(source="coingecko_crypto", external_id="reload", canonical_id=asset.id))
+    db.commit()
+    assert identity_cache.get_mapping("coingecko_crypto", "reload") is None
+
+    # The next run starts from a fresh preload
+    CSVExtractor(db, "missing.csv").run()
+    assert identity_cache.get_mapping("coingecko_crypto", "reload") == asset.id
+
+    db.add(AssetMapping(source="coinpaprika_crypto", external_id="rld-reload", canonical_id=asset.id))
+    db.commit()
+    small = IdentityCache(max_size=1)
+    with caplog.at_level("WARNING", logger="app.core.identity"):
+        small.preload(db)
+    assert "IDENTITY_CACHE_SIZE" in caplog.text
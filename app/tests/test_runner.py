@@ -0,0 +1,223 @@
+import time
+import pytest
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from app.core.database import Base
+from app.core.config import settings
+from app.core.leases import LeaseLost, RunLease
+from app.core.models import ETLCheckpoint, ETLLease, ETLRun, UnifiedData
+from app.ingestion.base import BaseExtractor
+from app.ingestion.csv_source import CSVExtractor
+from app.ingestion.partitioned import PartitionError, PartitionResult, committed_watermark
+from app.ingestion.runner import run_etl_concurrent
+from app.ingestion.scheduler import ETLScheduler
+
+class SlowExtractor(BaseExtractor):
+    def __init__(self, db, source_name, fail=False, batch_id=None):
+        super().__init__(source_name=source_name, db=db, batch_id=batch_id)
+        self.fail = fail
+
+    def extract(self, last_checkpoint):
+        if self.fail:
+            raise Exception("upstream down")
+        return []
+
+    def transform(self, raw_data):
+        raise NotImplementedError
+
+@pytest.fixture
+def runner_session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'runner.db'}", connect_args={"check_same_thread": False, "timeout": 30})
+
+    # SQLite allows a single writer: take the write lock up front so concurrent
+    # sessions queue on the busy timeout instead of failing to upgrade a read lock
+    @event.listens_for(engine, "connect")
+    def disable_pysqlite_begin(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def begin_immediate(conn):
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine.dispose()
+
+def slow_source(name, delay, fail=False):
+    def factory(db, batch_run_id):
+        # Simulate upstream latency outside the database transaction
+        time.sleep(delay)
+        return SlowExtractor(db, name, fail=fail, batch_id=batch_run_id)
+    return name, factory
+
+def test_concurrent_runner_records_one_run_per_source(runner_session_factory):
+    sources = [slow_source(f"slow_{i}", 0.3) for i in range(3)]
+    sources.append(slow_source("broken", 0.1, fail=True))
+
+    start = time.time()
+    batch_run_id = run_etl_concurrent(sources, max_workers=4, session_factory=runner_session_factory)
+    elapsed = time.time() - start
+
+    # Wall time tracks the slowest source, not the sum (~1.0s sequentially)
+    assert elapsed < 0.8
+
+    db = runner_session_factory()
+    try:
+        runs = db.query(ETLRun).filter(ETLRun.batch_id == batch_run_id).all()
+        assert sorted(r.source for r in runs) == ["broken", "slow_0", "slow_1", "slow_2"]
+        assert {r.source: r.status for r in runs}["broken"] == "failure"
+        assert all(r.status == "success" for r in runs if r.source != "broken")
+    finally:
+        db.close()
+
+def test_scheduler_coalesces_triggers_and_runs_one_source_at_a_time(runner_session_factory):
+    started = []
+
+    def counting_source(name, delay):
+        label, factory = slow_source(name, delay)
+        def counted(db, batch_run_id):
+            started.append(name)
+            return factory(db, batch_run_id)
+        return label, counted
+
+    scheduler = ETLScheduler(
+        sources=[counting_source("prices", 0.3), counting_source("news", 0.0)],
+        intervals={"prices": 60, "news": 0},
+        max_workers=2,
+        session_factory=runner_session_factory
+    )
+    try:
+        assert scheduler.trigger(["prices"]) == {"prices": "queued"}
+        # Duplicate while the first is still in flight: folded into it
+        assert scheduler.trigger() == {"prices": "coalesced", "news": "queued"}
+        scheduler.wait(timeout=10)
+        assert sorted(started) == ["news", "prices"]
+
+        # Interval scheduling: due once, then not again until the interval passes
+        assert scheduler.tick() == ["prices"]
+        assert scheduler.tick() == []
+        scheduler.wait(timeout=10)
+        assert started.count("prices") == 2
+    finally:
+        scheduler.stop(wait=True)
+
+    with pytest.raises(KeyError):
+        ETLScheduler(sources=[], intervals={}).trigger(["missing"])
+
+class FlakyCSVExtractor(CSVExtractor):
+    """Fails to load any partition containing the `bad` row."""
+
+    def load_batch(self, raw_rows, unified_rows):
+        if any(row["external_id"] == "csv_bad" for row in unified_rows):
+            raise RuntimeError("disk full")
+        return super().load_batch(raw_rows, unified_rows)
+
+def write_partitioned_csv(path, bad_day=None):
+    lines = ["id,symbol,name,price,created_at"]
+    for day in range(1, 7):
+        row_id = "bad" if day == bad_day else f"p{day}"
+        lines.append(f"{row_id},S{day},Asset {day},{day}.0,2024-01-0{day}T00:00:00Z")
+    path.write_text("\n".join(lines) + "\n")
+
+def test_partitioned_run_advances_checkpoint_to_committed_watermark(runner_session_factory, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "ETL_PARTITION_WORKERS", 2)
+    monkeypatch.setattr(settings, "ETL_LOAD_WORKERS", 2)
+    csv_path = tmp_path / "backfill.csv"
+
+    # Partition 2 (rows dated Jan 3-4) fails; the others commit
+    write_partitioned_csv(csv_path, bad_day=3)
+    db = runner_session_factory()
+    try:
+        extractor = FlakyCSVExtractor(db, str(csv_path))
+        extractor.chunk_size = 2
+        with pytest.raises(PartitionError):
+            extractor.run()
+
+        stored = {row.external_id for row in db.query(UnifiedData)}
+        assert stored == {"csv_p1", "csv_p2", "csv_p5", "csv_p6"}
+        checkpoint = db.query(ETLCheckpoint).one().last_processed_at.replace(tzinfo=timezone.utc)
+        # Just below the failed partition, so it is read again next run
+        assert datetime(2024, 1, 2, tzinfo=timezone.utc) < checkpoint < datetime(2024, 1, 3, tzinfo=timezone.utc)
+        run = db.query(ETLRun).one()
+        assert run.status == "failure" and run.records_processed == 4
+        # Release this session's read (write-locked under BEGIN IMMEDIATE) before the next run
+        db.rollback()
+
+        # Fixed input: the retry picks up from the watermark and completes
+        write_partitioned_csv(csv_path)
+        extractor = CSVExtractor(db, str(csv_path))
+        extractor.chunk_size = 2
+        assert extractor.run()["status"] == "success"
+        assert {row.external_id for row in db.query(UnifiedData)} == {f"csv_p{day}" for day in range(1, 7)}
+        checkpoint = db.query(ETLCheckpoint).one().last_processed_at.replace(tzinfo=timezone.utc)
+        assert checkpoint == datetime(2024, 1, 6, tzinfo=timezone.utc)
+    finally:
+        db.close()
+
+class StolenLeaseCSVExtractor(CSVExtractor):
+    """Another process takes over the lease while the first partition loads."""
+
+    def load_batch(self, raw_rows, unified_rows):
+        if not self.stolen:
+            self.stolen.append(True)
+            thief = self.thief_sessions()
+            thief.query(ETLLease).filter(ETLLease.source == self.source_name).update({ETLLease.holder: "thief"})
+            thief.commit()
+            thief.close()
+        return super().load_batch(raw_rows, unified_rows)
+
+def test_partitioned_run_stops_committing_once_its_lease_is_lost(runner_session_factory, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "ETL_PARTITION_WORKERS", 2)
+    monkeypatch.setattr(settings, "ETL_LOAD_WORKERS", 1)
+    csv_path = tmp_path / "stolen.csv"
+    write_partitioned_csv(csv_path)
+    db = runner_session_factory()
+    try:
+        extractor = StolenLeaseCSVExtractor(db, str(csv_path))
+        extractor.chunk_size = 2
+        extractor.thief_sessions, extractor.stolen = runner_session_factory, []
+        with pytest.raises(LeaseLost):
+            extractor.run()
+
+        # Every partition's commit was fenced: nothing landed next to the new holder
+        assert db.query(UnifiedData).count() == 0
+        assert db.query(ETLRun).one().status == "failure"
+        assert db.get(ETLLease, "csv_crypto").holder == "thief"
+    finally:
+        db.close()
+
+def test_committed_watermark_never_passes_a_failed_partition():
+    day = lambda d: datetime(2024, 1, d, tzinfo=timezone.utc)
+    ok = lambda i, a, b: PartitionResult(i, earliest=day(a), latest=day(b))
+    failed = lambda i, a, b: PartitionResult(i, earliest=day(a) if a else None, latest=day(b) if b else None, error="boom")
+
+    assert committed_watermark([ok(0, 1, 2), ok(1, 3, 9)], day(1)) == day(9)
+    assert committed_watermark([ok(0, 1, 2), failed(1, 5, 6), ok(2, 7, 9)], day(1)) == day(5) - timedelta(microseconds=1)
+    # Never backwards, and unknown contents block any advance
+    assert committed_watermark([failed(0, 1, 2), ok(1, 3, 9)], day(4)) == day(4)
+    assert committed_watermark([failed(0, None, None), ok(1, 3, 9)], day(2)) == day(2)
+
+def test_run_lease_heartbeat_thread_renews_and_detects_takeover(runner_session_factory):
+    lease = RunLease(runner_session_factory, "slow_lease", "me", ttl_seconds=60, heartbeat_seconds=0.05)
+    assert lease.acquire()
+    db = runner_session_factory()
+    first_expiry = db.get(ETLLease, "slow_lease").expires_at
+    db.rollback()
+
+    # Renewed in the background while the run is busy elsewhere
+    time.sleep(0.3)
+    assert db.get(ETLLease, "slow_lease").expires_at > first_expiry
+    lease.check()
+
+    # Another process takes over: the next beat notices and the run stops at its next check
+    db.query(ETLLease).filter(ETLLease.source == "slow_lease").update({ETLLease.holder: "thief"})
+    db.commit()
+    time.sleep(0.3)
+    with pytest.raises(LeaseLost):
+        lease.check()
+
+    # Releasing a lost lease leaves the new holder alone
+    lease.release()
+    assert db.get(ETLLease, "slow_lease").holder == "thief"
+    db.close()
@@ -0,0 +1,36 @@
+"""Add (source, external_id) unique constraints for bulk upserts
+
+Revision ID: 3b8d1f2a9c47
+Revises: 2e7577e62a66
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '3b8d1f2a9c47'
+down_revision = '2e7577e62a66'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    # 1. Drop duplicate raw rows left by concurrent runs, keeping the oldest copy
+    op.execute(
+        "DELETE FROM raw_data a USING raw_data b "
+        "WHERE a.source = b.source AND a.external_id = b.external_id AND a.id > b.id"
+    )
+
+    # 2. The select-then-insert loader could also duplicate unified rows; keep the newest copy
+    op.execute(
+        "DELETE FROM unified_data a USING unified_data b "
+        "WHERE a.source = b.source AND a.external_id = b.external_id AND a.id < b.id"
+    )
+
+    # 3. ON CONFLICT (source, external_id) needs a matching unique constraint
+    op.create_unique_constraint('uq_raw_data_source_external_id', 'raw_data', ['source', 'external_id'])
+    op.create_unique_constraint('uq_unified_data_source_external_id', 'unified_data', ['source', 'external_id'])
+
+def downgrade() -> None:
+    op.drop_constraint('uq_unified_data_source_external_id', 'unified_data', type_='unique')
+    op.drop_constraint('uq_raw_data_source_external_id', 'raw_data', type_='unique')
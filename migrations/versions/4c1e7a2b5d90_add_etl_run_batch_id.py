@@ -0,0 +1,23 @@
+"""Add batch_id to etl_runs
+
+Revision ID: 4c1e7a2b5d90
+Revises: 3b8d1f2a9c47
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '4c1e7a2b5d90'
+down_revision = '3b8d1f2a9c47'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.add_column('etl_runs', sa.Column('batch_id', sa.String(), nullable=True))
+    op.create_index(op.f('ix_etl_runs_batch_id'), 'etl_runs', ['batch_id'], unique=False)
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_etl_runs_batch_id'), table_name='etl_runs')
+    op.drop_column('etl_runs', 'batch_id')
@@ -0,0 +1,26 @@
+"""Add composite indexes for keyset pagination on unified_data
+
+Revision ID: 5d2f8b3c6e11
+Revises: 4c1e7a2b5d90
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '5d2f8b3c6e11'
+down_revision = '4c1e7a2b5d90'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    # GET /data orders by (created_at, id) and filters by equality on source or canonical_id
+    op.create_index('ix_unified_data_created_at_id', 'unified_data', ['created_at', 'id'], unique=False)
+    op.create_index('ix_unified_data_source_created_at_id', 'unified_data', ['source', 'created_at', 'id'], unique=False)
+    op.create_index('ix_unified_data_canonical_id_created_at_id', 'unified_data', ['canonical_id', 'created_at', 'id'], unique=False)
+
+def downgrade() -> None:
+    op.drop_index('ix_unified_data_canonical_id_created_at_id', table_name='unified_data')
+    op.drop_index('ix_unified_data_source_created_at_id', table_name='unified_data')
+    op.drop_index('ix_unified_data_created_at_id', table_name='unified_data')
@@ -0,0 +1,31 @@
+"""Add full-text search vector to unified_data
+
+Revision ID: 6a9c4e7f2b38
+Revises: 5d2f8b3c6e11
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '6a9c4e7f2b38'
+down_revision = '5d2f8b3c6e11'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    # Generated column: Postgres keeps it in sync with title/description on every write.
+    # 'simple' config (no stemming/stop words) so symbols like BTC and partial names match by prefix.
+    op.execute(
+        "ALTER TABLE unified_data ADD COLUMN search_vector tsvector "
+        "GENERATED ALWAYS AS ("
+        "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector('simple', coalesce(description, '')), 'B')"
+        ") STORED"
+    )
+    op.create_index('ix_unified_data_search_vector', 'unified_data', ['search_vector'], unique=False, postgresql_using='gin')
+
+def downgrade() -> None:
+    op.drop_index('ix_unified_data_search_vector', table_name='unified_data')
+    op.drop_column('unified_data', 'search_vector')
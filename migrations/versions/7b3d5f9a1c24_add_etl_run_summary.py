@@ -0,0 +1,40 @@
+"""Add etl_run_summary counters
+
+Revision ID: 7b3d5f9a1c24
+Revises: 6a9c4e7f2b38
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '7b3d5f9a1c24'
+down_revision = '6a9c4e7f2b38'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_table('etl_run_summary',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('total_runs', sa.Integer(), nullable=False),
+    sa.Column('success_runs', sa.Integer(), nullable=False),
+    sa.Column('failure_runs', sa.Integer(), nullable=False),
+    sa.Column('last_run_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('last_status', sa.String(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    # Backfill from the finished runs recorded so far
+    op.execute(
+        "INSERT INTO etl_run_summary (id, total_runs, success_runs, failure_runs, last_run_at, last_status) "
+        "SELECT 1, count(*), "
+        "count(*) FILTER (WHERE status = 'success'), "
+        "count(*) FILTER (WHERE status = 'failure'), "
+        "(SELECT ended_at FROM etl_runs WHERE ended_at IS NOT NULL ORDER BY ended_at DESC LIMIT 1), "
+        "(SELECT status FROM etl_runs WHERE ended_at IS NOT NULL ORDER BY ended_at DESC LIMIT 1) "
+        "FROM etl_runs WHERE status IN ('success', 'failure')"
+    )
+
+def downgrade() -> None:
+    op.drop_table('etl_run_summary')
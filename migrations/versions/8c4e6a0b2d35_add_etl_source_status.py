@@ -0,0 +1,45 @@
+"""Add etl_source_status projection and (source, started_at) index on etl_runs
+
+Revision ID: 8c4e6a0b2d35
+Revises: 7b3d5f9a1c24
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '8c4e6a0b2d35'
+down_revision = '7b3d5f9a1c24'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_index('ix_etl_runs_source_started_at', 'etl_runs', ['source', 'started_at'], unique=False)
+    op.create_table('etl_source_status',
+    sa.Column('source', sa.String(), nullable=False),
+    sa.Column('last_run_id', sa.String(), nullable=True),
+    sa.Column('last_status', sa.String(), nullable=True),
+    sa.Column('last_records_processed', sa.Integer(), nullable=True),
+    sa.Column('last_duration_ms', sa.Float(), nullable=True),
+    sa.Column('last_error_message', sa.String(), nullable=True),
+    sa.Column('last_started_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('last_ended_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('success_rate', sa.Float(), nullable=True),
+    sa.Column('p50_duration_ms', sa.Float(), nullable=True),
+    sa.Column('p95_duration_ms', sa.Float(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('source')
+    )
+    # Seed each source's latest run; the rolling stats fill in on its next run
+    op.execute(
+        "INSERT INTO etl_source_status (source, last_run_id, last_status, last_records_processed, "
+        "last_duration_ms, last_error_message, last_started_at, last_ended_at) "
+        "SELECT DISTINCT ON (source) source, run_id, status, records_processed, "
+        "duration_ms, error_message, started_at, ended_at "
+        "FROM etl_runs ORDER BY source, started_at DESC, id DESC"
+    )
+
+def downgrade() -> None:
+    op.drop_table('etl_source_status')
+    op.drop_index('ix_etl_runs_source_started_at', table_name='etl_runs')
@@ -0,0 +1,30 @@
+"""Add content hashes and insert/update/unchanged run counts
+
+Revision ID: 9d5f7b1c3e46
+Revises: 8c4e6a0b2d35
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '9d5f7b1c3e46'
+down_revision = '8c4e6a0b2d35'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    # Hashes are computed by the loader; existing rows stay NULL and are rewritten once
+    op.add_column('raw_data', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    op.add_column('unified_data', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    for table, prefix in (('etl_runs', 'records_'), ('etl_source_status', 'last_records_')):
+        for outcome in ('inserted', 'updated', 'unchanged'):
+            op.add_column(table, sa.Column(f'{prefix}{outcome}', sa.Integer(), nullable=True))
+
+def downgrade() -> None:
+    for table, prefix in (('etl_source_status', 'last_records_'), ('etl_runs', 'records_')):
+        for outcome in ('unchanged', 'updated', 'inserted'):
+            op.drop_column(table, f'{prefix}{outcome}')
+    op.drop_column('unified_data', 'content_hash')
+    op.drop_column('raw_data', 'content_hash')
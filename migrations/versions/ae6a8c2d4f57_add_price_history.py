@@ -0,0 +1,48 @@
+"""Add price_observations and price_rollups
+
+Revision ID: ae6a8c2d4f57
+Revises: 9d5f7b1c3e46
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'ae6a8c2d4f57'
+down_revision = '9d5f7b1c3e46'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_table('price_observations',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('canonical_id', sa.Integer(), nullable=False),
+    sa.Column('source', sa.String(), nullable=False),
+    sa.Column('ts', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('price', sa.Float(), nullable=False),
+    sa.Column('market_cap', sa.Float(), nullable=True),
+    sa.ForeignKeyConstraint(['canonical_id'], ['canonical_assets.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('source', 'canonical_id', 'ts', name='uq_price_observations_source_canonical_id_ts')
+    )
+    op.create_index('ix_price_observations_canonical_id_ts', 'price_observations', ['canonical_id', 'ts'], unique=False)
+    op.create_table('price_rollups',
+    sa.Column('canonical_id', sa.Integer(), nullable=False),
+    sa.Column('interval', sa.String(length=4), nullable=False),
+    sa.Column('bucket_start', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('open', sa.Float(), nullable=False),
+    sa.Column('high', sa.Float(), nullable=False),
+    sa.Column('low', sa.Float(), nullable=False),
+    sa.Column('close', sa.Float(), nullable=False),
+    sa.Column('open_ts', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('close_ts', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('samples', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['canonical_id'], ['canonical_assets.id'], ),
+    sa.PrimaryKeyConstraint('canonical_id', 'interval', 'bucket_start')
+    )
+
+def downgrade() -> None:
+    op.drop_table('price_rollups')
+    op.drop_index('ix_price_observations_canonical_id_ts', table_name='price_observations')
+    op.drop_table('price_observations')
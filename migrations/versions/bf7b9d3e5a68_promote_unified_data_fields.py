@@ -0,0 +1,49 @@
+"""Promote price_usd, market_cap, rank and symbol to typed unified_data columns
+
+Revision ID: bf7b9d3e5a68
+Revises: ae6a8c2d4f57
+Create Date: 2026-10-17 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'bf7b9d3e5a68'
+down_revision = 'ae6a8c2d4f57'
+branch_labels = None
+depends_on = None
+
+# Numeric-looking JSON text only, so stray strings do not abort the backfill
+NUMERIC = r"'^-?[0-9]+(\.[0-9]+)?([eE][-+]?[0-9]+)?$'"
+
+def upgrade() -> None:
+    op.add_column('unified_data', sa.Column('price_usd', sa.Float(), nullable=True))
+    op.add_column('unified_data', sa.Column('market_cap', sa.Float(), nullable=True))
+    op.add_column('unified_data', sa.Column('rank', sa.Integer(), nullable=True))
+    op.add_column('unified_data', sa.Column('symbol', sa.String(), nullable=True))
+
+    # Backfill from the JSON blob; the loader keeps them in sync from here on
+    op.execute(
+        "UPDATE unified_data SET "
+        f"price_usd = CASE WHEN coalesce(data->>'price_usd', data->>'price') ~ {NUMERIC} "
+        "THEN coalesce(data->>'price_usd', data->>'price')::float END, "
+        f"market_cap = CASE WHEN data->>'market_cap' ~ {NUMERIC} THEN (data->>'market_cap')::float END, "
+        f"rank = CASE WHEN data->>'rank' ~ {NUMERIC} THEN (data->>'rank')::float::integer END, "
+        "symbol = upper(data->>'symbol')"
+    )
+
+    op.create_index('ix_unified_data_price_usd_id', 'unified_data', ['price_usd', 'id'], unique=False)
+    op.create_index('ix_unified_data_market_cap_id', 'unified_data', ['market_cap', 'id'], unique=False)
+    op.create_index('ix_unified_data_rank_id', 'unified_data', ['rank', 'id'], unique=False)
+    op.create_index(op.f('ix_unified_data_symbol'), 'unified_data', ['symbol'], unique=False)
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_unified_data_symbol'), table_name='unified_data')
+    op.drop_index('ix_unified_data_rank_id', table_name='unified_data')
+    op.drop_index('ix_unified_data_market_cap_id', table_name='unified_data')
+    op.drop_index('ix_unified_data_price_usd_id', table_name='unified_data')
+    op.drop_column('unified_data', 'symbol')
+    op.drop_column('unified_data', 'rank')
+    op.drop_column('unified_data', 'market_cap')
+    op.drop_column('unified_data', 'price_usd')
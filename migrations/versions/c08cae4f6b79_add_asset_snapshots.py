@@ -0,0 +1,35 @@
+"""Add asset_snapshots
+
+Revision ID: c08cae4f6b79
+Revises: bf7b9d3e5a68
+Create Date: 2026-10-17 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'c08cae4f6b79'
+down_revision = 'bf7b9d3e5a68'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    # Filled by the ETL for every asset that receives a new price
+    op.create_table('asset_snapshots',
+    sa.Column('canonical_id', sa.Integer(), nullable=False),
+    sa.Column('prices', sa.JSON(), nullable=True),
+    sa.Column('source_count', sa.Integer(), nullable=False),
+    sa.Column('median_price', sa.Float(), nullable=True),
+    sa.Column('min_price', sa.Float(), nullable=True),
+    sa.Column('max_price', sa.Float(), nullable=True),
+    sa.Column('spread_pct', sa.Float(), nullable=True),
+    sa.Column('freshest_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('stalest_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['canonical_id'], ['canonical_assets.id'], ),
+    sa.PrimaryKeyConstraint('canonical_id')
+    )
+
+def downgrade() -> None:
+    op.drop_table('asset_snapshots')
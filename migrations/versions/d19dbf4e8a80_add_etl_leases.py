@@ -0,0 +1,29 @@
+"""Add etl_leases
+
+Revision ID: d19dbf4e8a80
+Revises: c08cae4f6b79
+Create Date: 2026-10-17 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'd19dbf4e8a80'
+down_revision = 'c08cae4f6b79'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    # One row per source, taken over by other processes once expires_at passes
+    op.create_table('etl_leases',
+    sa.Column('source', sa.String(), nullable=False),
+    sa.Column('holder', sa.String(), nullable=True),
+    sa.Column('acquired_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('heartbeat_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('expires_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('source')
+    )
+
+def downgrade() -> None:
+    op.drop_table('etl_leases')
@@ -0,0 +1,22 @@
+"""Add (updated_at, id) index on unified_data
+
+Revision ID: e4a7c2f91b36
+Revises: d19dbf4e8a80
+Create Date: 2026-10-17 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'e4a7c2f91b36'
+down_revision = 'd19dbf4e8a80'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    # GET /data/export?updated_since filters and orders by (updated_at, id)
+    op.create_index('ix_unified_data_updated_at_id', 'unified_data', ['updated_at', 'id'], unique=False)
+
+def downgrade() -> None:
+    op.drop_index('ix_unified_data_updated_at_id', table_name='unified_data')